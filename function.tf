@@ -2,20 +2,34 @@
 # CREATE LAMBDA FUNCTION USING ZIP FILE 
 # -----------------------------------------------------------------
 
-# make zip
+# make zip of the handler module and its support package
 data "archive_file" "lambda_function" {
   type        = "zip"
-  source_file = "${path.module}/function/sns_cloudwatch_gw.py"
   output_path = "${path.module}/lambda.zip"
+
+  source {
+    content  = file("${path.module}/function/sns_cloudwatch_gw.py")
+    filename = "sns_cloudwatch_gw.py"
+  }
+
+  dynamic "source" {
+    for_each = fileset("${path.module}/function", "lambda_sns_cloudwatch_logs/**/*.py")
+    content {
+      content  = file("${path.module}/function/${source.value}")
+      filename = source.value
+    }
+  }
 }
 
 locals {
   dynamic_description = "Routes SNS topic '${var.sns_topic_name}' to CloudWatch group '${var.log_group_name}'"
+  # Leave time in the invocation for the retries a timed out call gets
+  client_read_timeout = coalesce(var.client_read_timeout, min(10, var.lambda_timeout / 2))
 }
 
-# create lambda using function only zip on top of base layer
+# create lambda using function only zip on top of base layer, and the flusher extension if enabled
 resource "aws_lambda_function" "sns_cloudwatchlog" {
-  layers = [aws_lambda_layer_version.logging_base.arn]
+  layers = concat([aws_lambda_layer_version.logging_base.arn], aws_lambda_layer_version.flusher_extension[*].arn)
 
   function_name = var.lambda_func_name
   description   = length(var.lambda_description) > 0 ? var.lambda_description : local.dynamic_description
@@ -35,8 +49,38 @@ resource "aws_lambda_function" "sns_cloudwatchlog" {
 
   environment {
     variables = {
-      LOG_GROUP         = var.log_group_name
-      LOG_STREAM_FORMAT = var.log_stream_format
+      LOG_GROUP          = var.log_group_name
+      LOG_STREAM_FORMAT  = var.log_stream_format
+      WRITER_MODE        = var.writer_mode
+      EVENT_TIMESTAMP    = var.event_timestamp
+      ROUTING_TABLE      = length(var.routing_table) > 0 ? jsonencode(var.routing_table) : ""
+      FLUSH_CONCURRENCY  = var.flush_concurrency
+      DEAD_LETTER_TARGET = var.dead_letter_target
+      COMPACTION         = var.compaction
+      DEDUPE_CACHE_SIZE  = var.dedupe_cache_size
+      MESSAGE_FORMAT     = var.message_format
+      OVERSIZED_MESSAGES = var.oversized_messages
+      OFFLOAD_BUCKET     = var.offload_bucket
+      OFFLOAD_PREFIX     = var.offload_prefix
+      METRICS_NAMESPACE  = var.metrics_namespace
+      METRICS_DIMENSIONS = join(",", var.metrics_dimensions)
+      PROFILE_SAMPLE     = var.profile_sample
+      PROFILE_MEMORY     = var.profile_memory
+      PREWARM            = var.prewarm
+      STREAM_CACHE_TTL   = var.stream_cache_ttl
+      FILTER_RULES       = length(var.filter_rules) > 0 ? jsonencode(var.filter_rules) : ""
+      CLIENT_POOL_SIZE   = var.client_pool_size
+      CONNECT_TIMEOUT    = var.client_connect_timeout
+      READ_TIMEOUT       = local.client_read_timeout
+      RETRY_MODE         = var.client_retry_mode
+      MAX_ATTEMPTS       = var.client_max_attempts
+      TCP_KEEPALIVE      = var.client_tcp_keepalive
+      STREAM_SHARDING    = var.stream_sharding
+      STREAM_SHARDS      = var.stream_shards
+      SPOOL_MAX_BYTES    = var.spool_max_bytes
+      SPOOL_RETRY_TIME   = var.spool_retry_seconds
+      BACKGROUND_FLUSH   = var.background_flush
+      EXTENSION_PORT     = var.extension_port
     }
   }
 
@@ -49,6 +93,8 @@ resource "aws_lambda_function" "sns_cloudwatchlog" {
 
 # function published - "qualifier" set to function version
 resource "aws_lambda_permission" "sns_cloudwatchlog_multi" {
+  count = var.sqs_batching ? 0 : 1
+
   statement_id  = "AllowExecutionFromSNS"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.sns_cloudwatchlog.function_name
@@ -56,3 +102,8 @@ resource "aws_lambda_permission" "sns_cloudwatchlog_multi" {
   source_arn    = local.sns_topic_arn
   qualifier     = var.lambda_publish_func ? aws_lambda_function.sns_cloudwatchlog.version : null
 }
+
+moved {
+  from = aws_lambda_permission.sns_cloudwatchlog_multi
+  to   = aws_lambda_permission.sns_cloudwatchlog_multi[0]
+}
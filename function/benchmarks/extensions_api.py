@@ -0,0 +1,108 @@
+"""Local stand-in for the Lambda Extensions API.
+
+Runs the flusher extension outside Lambda: the stand-in serves ``register``
+and ``event/next`` on 127.0.0.1 and answers ``event/next`` from a queue of
+INVOKE and SHUTDOWN events, the way Lambda does between invocations. Point
+AWS_LAMBDA_RUNTIME_API at ``address`` and queue the events to send.
+"""
+
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+HOST = "127.0.0.1"
+API_PATH = "/2020-01-01/extension"
+EXTENSION_ID = "standin-extension-id"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "ExtensionsApiStandin"
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path == API_PATH + "/register":
+            self.server.registered(self.headers.get("Lambda-Extension-Name"), body.get("events", []))
+            self._reply({}, {"Lambda-Extension-Identifier": EXTENSION_ID})
+        elif self.path in (API_PATH + "/init/error", API_PATH + "/exit/error"):
+            self.server.errors.append(body)
+            self._reply({"status": "OK"})
+        else:
+            self._reply({"errorMessage": "not found"}, status=404)
+
+    def do_GET(self) -> None:
+        if self.path != API_PATH + "/event/next" or self.headers.get("Lambda-Extension-Identifier") != EXTENSION_ID:
+            self._reply({"errorMessage": "not found"}, status=404)
+            return
+        self._reply(self.server.next_event())
+
+    def _reply(self, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None, status: int = 200) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ExtensionsApiStandin(ThreadingHTTPServer):
+    """Extensions API of one execution environment, with the events it will send."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__((HOST, 0), _Handler)
+        self.name: Optional[str] = None
+        self.events: List[str] = []
+        self.errors: List[Dict[str, Any]] = []
+        # Number of event/next calls, the first of which ends the init phase
+        self.next_calls = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._condition = threading.Condition()
+
+    @property
+    def address(self) -> str:
+        """The value of AWS_LAMBDA_RUNTIME_API for the extension."""
+        return f"{HOST}:{self.server_port}"
+
+    def start(self) -> "ExtensionsApiStandin":
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def registered(self, name: Optional[str], events: List[str]) -> None:
+        self.name, self.events = name, events
+
+    def invoke(self, request_id: str, timeout: float = 3.0) -> None:
+        """Queue an invocation that times out after ``timeout`` seconds."""
+        self._queue.put({
+            "eventType": "INVOKE",
+            "requestId": request_id,
+            "deadlineMs": int((time.time() + timeout) * 1000),
+            "invokedFunctionArn": "arn:aws:lambda:us-east-1:123456789012:function:standin",
+        })
+
+    def shutdown_instance(self, timeout: float = 2.0) -> None:
+        """Queue the SHUTDOWN event that ends the instance."""
+        self._queue.put({
+            "eventType": "SHUTDOWN",
+            "shutdownReason": "spindown",
+            "deadlineMs": int((time.time() + timeout) * 1000),
+        })
+
+    def next_event(self) -> Dict[str, Any]:
+        with self._condition:
+            self.next_calls += 1
+            self._condition.notify_all()
+        return self._queue.get()
+
+    def wait_for_next(self, calls: int, timeout: float = 5.0) -> bool:
+        """Wait until the extension has asked for ``calls`` events, that is finished the ones before."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.next_calls >= calls, timeout)
@@ -0,0 +1,263 @@
+"""Benchmark the handler offline against a CloudWatch Logs stand-in.
+
+Run from the ``function`` directory::
+
+    python -m benchmarks.run --records 1,100,1000 --sizes 200,10240 --spreads 1,8
+
+Every combination of writer mode, records per event, message size and
+stream spread is a scenario. A scenario runs in a fresh process, so its
+first invocation is a real cold start and its peak RSS is its own, and
+invokes the handler ``--invocations`` times with synthetic SNS events. The
+spread is the number of log groups the records of an event are routed to,
+so spreads above 1 only apply to batch mode.
+
+The report is a JSON document on stdout (or ``--output``) with, per
+scenario, records per second and p50/p99 latency of the warm invocations,
+the cold start latency, the CloudWatch Logs API calls made and the peak
+RSS. ``--baseline`` compares the run with an earlier report.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_RECORDS = (1, 10, 100, 1000)
+DEFAULT_SIZES = (200, 10_240)
+DEFAULT_SPREADS = (1, 8)
+DEFAULT_MODES = ("batch", "watchtower")
+DEFAULT_INVOCATIONS = 50
+
+# Settings the handler reads, fixed for every scenario
+_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "LOG_GROUP": "/benchmark/default",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+class _Context:
+    """Lambda context with the 15 minute maximum timeout."""
+
+    function_name = "benchmark"
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 900_000
+
+
+def make_event(records: int, size: int, spread: int, invocation: int = 0) -> Dict[str, Any]:
+    """Return an SNS event of ``records`` messages of ``size`` bytes over ``spread`` topics."""
+    body = "x" * size
+    return {
+        "Records": [
+            {
+                "EventSource": "aws:sns",
+                "EventVersion": "1.0",
+                "EventSubscriptionArn": f"arn:aws:sns:us-east-1:123456789012:bench-{index % spread}:sub",
+                "Sns": {
+                    "Type": "Notification",
+                    "MessageId": f"{invocation}-{index}",
+                    "TopicArn": f"arn:aws:sns:us-east-1:123456789012:bench-{index % spread}",
+                    "Subject": "benchmark",
+                    "Message": body,
+                    "Timestamp": "2023-01-01T00:00:00.000Z",
+                    "SignatureVersion": "1",
+                    "Signature": "EXAMPLE",
+                    "SigningCertUrl": "EXAMPLE",
+                    "UnsubscribeUrl": "EXAMPLE",
+                    "MessageAttributes": {},
+                },
+            }
+            for index in range(records)
+        ]
+    }
+
+
+def routing_table(spread: int) -> str:
+    """Return a routing table sending each benchmark topic to its own log group."""
+    return json.dumps([
+        {"topic_arn": f"arn:aws:sns:*:*:bench-{index}", "log_group": f"/benchmark/{index}"}
+        for index in range(spread)
+    ])
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def scenarios(modes: Iterable[str], records: Iterable[int], sizes: Iterable[int],
+              spreads: Iterable[int]) -> List[Dict[str, Any]]:
+    """Return every combination of the parameters that can run."""
+    return [
+        {"mode": mode, "records": count, "size": size, "spread": spread}
+        for mode in modes
+        for count in records
+        for size in sizes
+        for spread in spreads
+        if spread == 1 or mode == "batch"
+    ]
+
+
+def run_scenario(scenario: Dict[str, Any], invocations: int, latency: float = 0.0,
+                 backend: str = "standin") -> Dict[str, Any]:
+    """Invoke the handler ``invocations`` times for one scenario and return its results.
+
+    The handler and boto3 are set up in this process, so run each scenario in
+    a process of its own to get a cold start and a peak RSS of its own.
+    """
+    import resource
+
+    os.environ.update(_ENV)
+    os.environ["WRITER_MODE"] = scenario["mode"]
+    if scenario["spread"] > 1:
+        os.environ["ROUTING_TABLE"] = routing_table(scenario["spread"])
+    else:
+        os.environ.pop("ROUTING_TABLE", None)
+
+    import boto3
+
+    from benchmarks.standin import CloudWatchLogsStandin, count_calls
+
+    mock: Any = None
+    if backend == "moto":
+        from moto import mock_aws
+
+        mock = mock_aws()
+        mock.start()
+    # Set up after moto, which replaces the default session when it starts
+    boto3.setup_default_session()
+    calls = count_calls(boto3.DEFAULT_SESSION)
+    if mock is None:
+        CloudWatchLogsStandin(latency).install(boto3.DEFAULT_SESSION)
+
+    import sns_cloudwatch_gw
+
+    context = _Context()
+    events = [
+        make_event(scenario["records"], scenario["size"], scenario["spread"], invocation)
+        for invocation in range(invocations + 1)
+    ]
+    latencies = []
+    try:
+        for event in events:
+            started = time.perf_counter()
+            sns_cloudwatch_gw.handler(event, context)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        if mock is not None:
+            mock.stop()
+
+    cold, warm = latencies[0], latencies[1:] or latencies
+    return dict(
+        scenario,
+        invocations=len(warm),
+        records_per_second=round(scenario["records"] * len(warm) / sum(warm), 1),
+        latency_ms={
+            "cold": round(cold * 1000, 3),
+            "p50": round(percentile(warm, 0.50) * 1000, 3),
+            "p99": round(percentile(warm, 0.99) * 1000, 3),
+            "mean": round(sum(warm) / len(warm) * 1000, 3),
+            "max": round(max(warm) * 1000, 3),
+        },
+        api_calls=dict(sorted(calls.items())),
+        # Kilobytes on Linux
+        peak_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    )
+
+
+def _quiet() -> None:
+    """Send the handler's own logging in a scenario process to /dev/null."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+
+def run(scenario_list: List[Dict[str, Any]], invocations: int, latency: float = 0.0,
+        backend: str = "standin") -> List[Dict[str, Any]]:
+    """Run each scenario in a fresh process, one at a time."""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenario_list:
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=context, initializer=_quiet) as pool:
+            results.append(pool.submit(run_scenario, scenario, invocations, latency, backend).result())
+        print(_describe(results[-1]), file=sys.stderr)
+    return results
+
+
+def _key(result: Dict[str, Any]) -> tuple:
+    return result["mode"], result["records"], result["size"], result["spread"]
+
+
+def _describe(result: Dict[str, Any]) -> str:
+    return (
+        "{mode:<10} records={records:<5} size={size:<6} spread={spread:<3} "
+        "{records_per_second:>10} rec/s  p50={p50:.3f}ms p99={p99:.3f}ms  rss={peak_rss_kb}KB"
+    ).format(**result, **result["latency_ms"])
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[str]:
+    """Describe the change in throughput and p99 latency of each scenario also in ``baseline``."""
+    previous = {_key(result): result for result in baseline}
+    lines = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        throughput = result["records_per_second"] / before["records_per_second"] - 1
+        p99 = result["latency_ms"]["p99"] / before["latency_ms"]["p99"] - 1
+        lines.append("{} {:+.1%} rec/s {:+.1%} p99".format(" ".join(map(str, _key(result))), throughput, p99))
+    return lines
+
+
+def _numbers(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES), help="writer modes (default: %(default)s)")
+    parser.add_argument("--records", type=_numbers, default=list(DEFAULT_RECORDS), help="records per event")
+    parser.add_argument("--sizes", type=_numbers, default=list(DEFAULT_SIZES), help="message sizes in bytes")
+    parser.add_argument("--spreads", type=_numbers, default=list(DEFAULT_SPREADS),
+                        help="log groups the records of an event are routed to")
+    parser.add_argument("--invocations", type=int, default=DEFAULT_INVOCATIONS,
+                        help="warm invocations per scenario (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency of each API call")
+    parser.add_argument("--backend", choices=("standin", "moto"), default="standin")
+    parser.add_argument("--output", help="write the report to this file instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare with")
+    args = parser.parse_args(argv)
+
+    scenario_list = scenarios(args.modes.split(","), args.records, args.sizes, args.spreads)
+    results = run(scenario_list, args.invocations, args.latency_ms / 1000, args.backend)
+    report = {
+        "python": sys.version.split()[0],
+        "backend": args.backend,
+        "latency_ms": args.latency_ms,
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as file:
+            for line in compare(results, json.load(file)["results"]):
+                print(line, file=sys.stderr)
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(document + "\n")
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""In-process CloudWatch Logs stand-in for benchmarks.
+
+The stand-in answers CloudWatch Logs requests at the HTTP layer of botocore,
+through a ``before-send`` hook on a boto3 session. Clients created from that
+session, including the ones watchtower creates itself, still serialize
+requests and parse responses as they would against AWS. Only the network is
+left out, optionally replaced by a fixed per-call latency.
+
+PutLogEvents requests are checked against the service limits, so a
+regression that makes batches the service would reject fails the benchmark.
+"""
+
+import collections
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from botocore.awsrequest import AWSResponse
+
+# PutLogEvents limits enforced by the service
+MAX_BATCH_BYTES = 1_048_576
+MAX_BATCH_EVENTS = 10_000
+MAX_EVENT_BYTES = 262_144
+EVENT_OVERHEAD_BYTES = 26
+MAX_BATCH_SPAN_MS = 24 * 60 * 60 * 1000
+
+
+class _Body:
+    """Raw response body in the shape botocore reads it."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def stream(self, **kwargs: Any) -> Iterator[bytes]:
+        yield self.data
+
+
+class StandinError(Exception):
+    def __init__(self, code: str, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+class CloudWatchLogsStandin:
+    """Log groups and streams kept in memory, with call and event counters."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.groups: Dict[str, Set[str]] = {}
+        self.calls: "collections.Counter[str]" = collections.Counter()
+        self.events: "collections.Counter[Tuple[str, str]]" = collections.Counter()
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def install(self, session: Any) -> None:
+        """Answer the CloudWatch Logs requests of clients created from a boto3 session."""
+        session.events.register("before-send.cloudwatch-logs", self._before_send)
+
+    def _before_send(self, request: Any, **kwargs: Any) -> AWSResponse:
+        operation = request.headers["X-Amz-Target"].decode().split(".", 1)[1]
+        body = json.loads(request.body or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[operation] += 1
+            try:
+                handler = getattr(self, f"_{operation}", None)
+                result = handler(body) if handler else {}
+                status, payload = 200, result
+            except StandinError as err:
+                status, payload = err.status, {"__type": err.code, "message": str(err)}
+        return AWSResponse(
+            request.url,
+            status,
+            {"Content-Type": "application/x-amz-json-1.1"},
+            _Body(json.dumps(payload).encode()),
+        )
+
+    def _stream(self, body: Dict[str, Any]) -> Set[str]:
+        streams = self.groups.get(body["logGroupName"])
+        if streams is None:
+            raise StandinError("ResourceNotFoundException", "The specified log group does not exist.")
+        return streams
+
+    def _CreateLogGroup(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if body["logGroupName"] in self.groups:
+            raise StandinError("ResourceAlreadyExistsException", "The specified log group already exists")
+        self.groups[body["logGroupName"]] = set()
+        return {}
+
+    def _CreateLogStream(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        streams = self._stream(body)
+        if body["logStreamName"] in streams:
+            raise StandinError("ResourceAlreadyExistsException", "The specified log stream already exists")
+        streams.add(body["logStreamName"])
+        return {}
+
+    def _DescribeLogGroups(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        prefix = body.get("logGroupNamePrefix", "")
+        return {"logGroups": [{"logGroupName": name} for name in self.groups if name.startswith(prefix)]}
+
+    def _PutLogEvents(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if body["logStreamName"] not in self._stream(body):
+            raise StandinError("ResourceNotFoundException", "The specified log stream does not exist.")
+        events = body["logEvents"]
+        if not events or len(events) > MAX_BATCH_EVENTS:
+            raise StandinError("InvalidParameterException", f"Batch has {len(events)} events")
+        sizes = [len(event["message"].encode("utf-8")) + EVENT_OVERHEAD_BYTES for event in events]
+        if max(sizes) > MAX_EVENT_BYTES:
+            raise StandinError("InvalidParameterException", "Log event too large")
+        if sum(sizes) > MAX_BATCH_BYTES:
+            raise StandinError("InvalidParameterException", "Batch too large")
+        timestamps = [event["timestamp"] for event in events]
+        if timestamps != sorted(timestamps):
+            raise StandinError("InvalidParameterException", "Log events not in chronological order")
+        if timestamps[-1] - timestamps[0] > MAX_BATCH_SPAN_MS:
+            raise StandinError("InvalidParameterException", "Batch spans more than 24 hours")
+        self.events[(body["logGroupName"], body["logStreamName"])] += len(events)
+        self.bytes += sum(sizes)
+        return {"nextSequenceToken": str(sum(self.events.values()))}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "api_calls": dict(sorted(self.calls.items())),
+            "events_stored": sum(self.events.values()),
+            "bytes_stored": self.bytes,
+            "streams": len(self.events),
+        }
+
+
+def count_calls(session: Any, counter: Optional["collections.Counter[str]"] = None) -> "collections.Counter[str]":
+    """Count the CloudWatch Logs API calls made by clients of a session, whatever answers them."""
+    if counter is None:
+        counter = collections.Counter()
+
+    def before_call(model: Any, **kwargs: Any) -> None:
+        counter[model.name] += 1
+
+    session.events.register("before-call.cloudwatch-logs", before_call)
+    return counter
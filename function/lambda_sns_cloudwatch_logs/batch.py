@@ -0,0 +1,82 @@
+"""Pack log events into CloudWatch Logs PutLogEvents batches."""
+
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List
+
+# PutLogEvents service limits
+MAX_BATCH_BYTES = 1_048_576
+MAX_BATCH_EVENTS = 10_000
+MAX_BATCH_SPAN_MS = 24 * 60 * 60 * 1000
+# Every event is billed against MAX_BATCH_BYTES with this fixed overhead
+EVENT_OVERHEAD_BYTES = 26
+# Largest single event, overhead included
+MAX_EVENT_BYTES = 262_144
+MAX_MESSAGE_BYTES = MAX_EVENT_BYTES - EVENT_OVERHEAD_BYTES
+
+LogEvent = Dict[str, Any]
+
+
+class SizedEvent(Dict[str, Any]):
+    """A log event that remembers its size once measured.
+
+    Still a plain mapping to PutLogEvents; the size lives in a slot, so
+    ``OversizeHandler.fit``, ``build_batches`` and the writer's byte count
+    encode the message once between them.
+    """
+
+    __slots__ = ("size",)
+    size: int
+
+
+def message_size(message: str) -> int:
+    """Return the UTF-8 encoded size of a message."""
+    # isascii() is a flag lookup, so most messages are measured without encoding them
+    if message.isascii():
+        return len(message)
+    return len(message.encode("utf-8"))
+
+
+def event_size(event: LogEvent) -> int:
+    """Return the size an event counts for against the batch byte limit.
+
+    A SizedEvent is measured the first time and keeps the result.
+    """
+    if not isinstance(event, SizedEvent):
+        return message_size(event["message"]) + EVENT_OVERHEAD_BYTES
+    try:
+        return event.size
+    except AttributeError:
+        event.size = message_size(event["message"]) + EVENT_OVERHEAD_BYTES
+        return event.size
+
+
+def build_batches(events: Iterable[LogEvent]) -> Iterator[List[LogEvent]]:
+    """Yield timestamp-ordered batches that each fit in one PutLogEvents call.
+
+    Events are ``{"timestamp": <epoch ms>, "message": <str>}`` dicts, as
+    expected by the API. A new batch is started whenever adding the next event
+    would exceed the byte or event count limits, or make the batch span more
+    than 24 hours.
+    """
+    batch: List[LogEvent] = []
+    batch_bytes = 0
+    first_timestamp = 0
+
+    for event in sorted(events, key=itemgetter("timestamp")):
+        size = event_size(event)
+        if batch and (
+            len(batch) >= MAX_BATCH_EVENTS
+            or batch_bytes + size > MAX_BATCH_BYTES
+            or event["timestamp"] - first_timestamp > MAX_BATCH_SPAN_MS
+        ):
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        if not batch:
+            first_timestamp = event["timestamp"]
+        batch.append(event)
+        batch_bytes += size
+
+    if batch:
+        yield batch
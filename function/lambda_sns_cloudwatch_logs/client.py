@@ -0,0 +1,60 @@
+"""The CloudWatch Logs client shared by every writer of an instance.
+
+The function builds one logs client at cold start from an explicit botocore
+configuration and hands it to both writer modes, so warm invocations reuse
+its pooled, kept-alive HTTPS connections:
+
+- CLIENT_POOL_SIZE: connections kept open; 0 (the default) sizes the pool
+  to FLUSH_CONCURRENCY so parallel flushes never wait for a connection.
+- CONNECT_TIMEOUT / READ_TIMEOUT: seconds before a connection attempt or a
+  response is given up on. They are kept well under the Lambda timeout so a
+  slow endpoint fails one attempt, not the invocation.
+- RETRY_MODE / MAX_ATTEMPTS: botocore's own retries. ``adaptive`` (the
+  default) also rate limits the client once CloudWatch Logs throttles it,
+  which all flush threads share. The writer retries failed batches on top
+  of this within the invocation's deadline, so few attempts are needed here.
+- TCP_KEEPALIVE: ``true`` (default) sets SO_KEEPALIVE on the connections,
+  so pooled connections that sat idle between invocations stay usable.
+"""
+
+import dataclasses
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import botocore.config
+
+RETRY_MODES = ("legacy", "standard", "adaptive")
+DEFAULT_RETRY_MODE = "adaptive"
+DEFAULT_MAX_ATTEMPTS = 2
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 2.0
+DEFAULT_READ_TIMEOUT_SECONDS = 10.0
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ClientSettings:
+    """Connection pool, timeout and retry settings of the logs client."""
+
+    pool_size: int
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS
+    read_timeout: float = DEFAULT_READ_TIMEOUT_SECONDS
+    retry_mode: str = DEFAULT_RETRY_MODE
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    tcp_keepalive: bool = True
+
+    def botocore_config(self) -> "botocore.config.Config":
+        from botocore.config import Config
+
+        return Config(
+            max_pool_connections=self.pool_size,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            retries={"mode": self.retry_mode, "max_attempts": self.max_attempts},
+            tcp_keepalive=self.tcp_keepalive,
+        )
+
+
+def make_logs_client(settings: ClientSettings) -> Any:
+    """Create a CloudWatch Logs client with ``settings``."""
+    import boto3
+
+    return boto3.client("logs", config=settings.botocore_config())
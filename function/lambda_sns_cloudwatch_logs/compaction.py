@@ -0,0 +1,107 @@
+"""Collapse repeated SNS messages before they are written.
+
+COMPACTION selects what is collapsed (batch mode only):
+
+- ``off`` (default): every message is written.
+- ``message_id``: a message whose MessageId was already written, earlier in
+  the invocation or in a recent warm one, is dropped. This suppresses SNS
+  at-least-once redeliveries.
+- ``content``: as ``message_id``, and messages with the same body bound for
+  the same log stream are written once, followed by their repeat count.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent
+
+COMPACTION_OFF = "off"
+COMPACTION_MESSAGE_ID = "message_id"
+COMPACTION_CONTENT = "content"
+COMPACTION_MODES = (COMPACTION_OFF, COMPACTION_MESSAGE_ID, COMPACTION_CONTENT)
+
+DEFAULT_DEDUPE_CACHE_SIZE = 10_000
+# Appended to a message written once in place of several identical ones
+REPEAT_SUFFIX = " [repeated {count} times]"
+
+# (log group, log stream, message)
+_ContentKey = Tuple[str, str, str]
+
+
+class SeenMessageIds:
+    """Bounded LRU of the MessageIds of messages already written."""
+
+    def __init__(self, max_size: int = DEFAULT_DEDUPE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_all(self, message_ids: Iterable[str]) -> None:
+        """Remember ``message_ids``, forgetting the least recently seen beyond max_size."""
+        ids = self._ids
+        for message_id in message_ids:
+            ids[message_id] = None
+            ids.move_to_end(message_id)
+        while len(ids) > self.max_size:
+            ids.popitem(last=False)
+
+
+class Compactor:
+    """Collapse the repeated messages of one invocation.
+
+    MessageIds are only added to ``seen`` by commit(), once the events have
+    been written, so that a redelivery of a failed invocation is not dropped.
+    """
+
+    def __init__(self, mode: str, seen: SeenMessageIds) -> None:
+        self.by_content = mode == COMPACTION_CONTENT
+        self.seen = seen
+        self.duplicates = 0
+        self._message_ids: Dict[str, None] = {}
+        self._first: Dict[_ContentKey, LogEvent] = {}
+        self._repeats: Dict[_ContentKey, int] = {}
+
+    def is_duplicate(self, message_id: Optional[str]) -> bool:
+        """Return whether a message was already written, noting its MessageId if not."""
+        if not message_id:
+            return False
+        if message_id in self._message_ids or message_id in self.seen:
+            self.duplicates += 1
+            return True
+        self._message_ids[message_id] = None
+        return False
+
+    def add(self, log_group: str, log_stream: str, event: LogEvent) -> bool:
+        """Return whether ``event`` should be written, or was folded into an earlier one."""
+        if not self.by_content:
+            return True
+        key = (log_group, log_stream, event["message"])
+        if key not in self._first:
+            self._first[key] = event
+            return True
+        self._repeats[key] = self._repeats.get(key, 1) + 1
+        return False
+
+    def finish(self) -> None:
+        """Append the repeat count to every message written in place of several."""
+        for key, count in self._repeats.items():
+            event = self._first[key]
+            event["message"] += REPEAT_SUFFIX.format(count=count)
+
+    def repeats_of(self, log_group: str, log_stream: str, message: str) -> int:
+        """Return how many times a message for a log stream was seen."""
+        return self._repeats.get((log_group, log_stream, message), 1)
+
+    @property
+    def repeats(self) -> int:
+        """Number of messages folded into an earlier identical one."""
+        return sum(self._repeats.values()) - len(self._repeats)
+
+    def commit(self) -> None:
+        """Remember this invocation's MessageIds as written."""
+        self.seen.add_all(self._message_ids)
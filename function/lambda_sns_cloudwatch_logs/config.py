@@ -0,0 +1,316 @@
+"""Function configuration read once from the environment."""
+
+import dataclasses
+import logging
+import os
+from typing import Mapping, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.client import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_RETRY_MODE,
+    RETRY_MODES,
+    ClientSettings,
+)
+from lambda_sns_cloudwatch_logs.compaction import (
+    COMPACTION_MODES,
+    COMPACTION_OFF,
+    DEFAULT_DEDUPE_CACHE_SIZE,
+)
+from lambda_sns_cloudwatch_logs.deadletter import DEAD_LETTER_LOG, DEAD_LETTER_NONE, DEAD_LETTER_SPOOL, queue_url
+from lambda_sns_cloudwatch_logs.enrich import MESSAGE_FORMAT_JSON, MESSAGE_FORMAT_RAW, MESSAGE_FORMATS
+from lambda_sns_cloudwatch_logs.handoff import DEFAULT_EXTENSION_PORT
+from lambda_sns_cloudwatch_logs.metrics import DEFAULT_METRIC_DIMENSIONS, METRIC_DIMENSIONS
+from lambda_sns_cloudwatch_logs.oversize import (
+    DEFAULT_OFFLOAD_PREFIX,
+    OVERSIZED_MODES,
+    OVERSIZED_OFFLOAD,
+    OVERSIZED_SPLIT,
+)
+from lambda_sns_cloudwatch_logs.routing import Route, RoutingError, load_routes
+from lambda_sns_cloudwatch_logs.rules import Rule, RuleError, load_rules
+from lambda_sns_cloudwatch_logs.sharding import (
+    DEFAULT_STREAM_SHARDS,
+    STREAM_SHARDING_MESSAGE_ID,
+    STREAM_SHARDING_OFF,
+    STREAM_SHARDINGS,
+)
+from lambda_sns_cloudwatch_logs.spool import DEFAULT_SPOOL_DIR, DEFAULT_SPOOL_MAX_BYTES, DEFAULT_SPOOL_RETRY_SECONDS
+from lambda_sns_cloudwatch_logs.streams import DEFAULT_STREAM_CACHE_TTL_SECONDS
+
+# Writer modes selectable with WRITER_MODE
+WRITER_MODE_WATCHTOWER = "watchtower"
+WRITER_MODE_BATCH = "batch"
+WRITER_MODES = (WRITER_MODE_WATCHTOWER, WRITER_MODE_BATCH)
+
+# Event time sources selectable with EVENT_TIMESTAMP (batch mode only)
+EVENT_TIMESTAMP_INGESTION = "ingestion"
+EVENT_TIMESTAMP_SNS = "sns"
+EVENT_TIMESTAMPS = (EVENT_TIMESTAMP_INGESTION, EVENT_TIMESTAMP_SNS)
+
+DEFAULT_LOG_STREAM_FORMAT = "%Y-%m-%d/%H00"
+DEFAULT_FLUSH_CONCURRENCY = 4
+
+
+class ConfigError(ValueError):
+    """A required setting is missing or a setting has an invalid value."""
+
+
+def _required(env: Mapping[str, str], name: str) -> str:
+    value = env.get(name)
+    if not value:
+        raise ConfigError(f"Environment variable {name} is not set")
+    return value
+
+
+def _log_level(env: Mapping[str, str], name: str, default: int) -> int:
+    value = env.get(name)
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ConfigError(f"Invalid {name} {value!r}")
+    return level
+
+
+def _positive_int(env: Mapping[str, str], name: str, default: int) -> int:
+    value = env.get(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ConfigError(f"Invalid {name} {value!r}, expected a positive integer")
+    return number
+
+
+def _non_negative_int(env: Mapping[str, str], name: str, default: int) -> int:
+    value = env.get(name)
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ConfigError(f"Invalid {name} {value!r}, expected a whole number")
+    return int(value)
+
+
+def _positive_number(env: Mapping[str, str], name: str, default: float) -> float:
+    value = env.get(name)
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0.0
+    if not number > 0:
+        raise ConfigError(f"Invalid {name} {value!r}, expected a positive number")
+    return number
+
+
+def _flag(env: Mapping[str, str], name: str, default: bool = False) -> bool:
+    value = (env.get(name) or str(default)).lower()
+    if value not in ("true", "false"):
+        raise ConfigError(f"Invalid {name} {value!r}, expected 'true' or 'false'")
+    return value == "true"
+
+
+def _choice(env: Mapping[str, str], name: str, default: str, choices: Tuple[str, ...]) -> str:
+    value = env.get(name) or default
+    if value not in choices:
+        raise ConfigError(f"Unknown {name} {value!r}, expected one of {choices}")
+    return value
+
+
+def _routes(env: Mapping[str, str], writer_mode: str) -> Tuple[Route, ...]:
+    try:
+        routes = load_routes(env.get("ROUTING_TABLE"), env.get("ROUTING_TABLE_FILE"))
+    except RoutingError as err:
+        raise ConfigError(str(err)) from err
+    if routes and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("ROUTING_TABLE and ROUTING_TABLE_FILE require WRITER_MODE=batch")
+    return routes
+
+
+def _rules(env: Mapping[str, str]) -> Tuple[Rule, ...]:
+    try:
+        return load_rules(env.get("FILTER_RULES"), env.get("FILTER_RULES_FILE"))
+    except RuleError as err:
+        raise ConfigError(str(err)) from err
+
+
+def _client(env: Mapping[str, str], flush_concurrency: int) -> ClientSettings:
+    return ClientSettings(
+        pool_size=_non_negative_int(env, "CLIENT_POOL_SIZE", 0) or flush_concurrency,
+        connect_timeout=_positive_number(env, "CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT_SECONDS),
+        read_timeout=_positive_number(env, "READ_TIMEOUT", DEFAULT_READ_TIMEOUT_SECONDS),
+        retry_mode=_choice(env, "RETRY_MODE", DEFAULT_RETRY_MODE, RETRY_MODES),
+        max_attempts=_positive_int(env, "MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS),
+        tcp_keepalive=_flag(env, "TCP_KEEPALIVE", True),
+    )
+
+
+def _stream_sharding(env: Mapping[str, str], writer_mode: str) -> str:
+    sharding = _choice(env, "STREAM_SHARDING", STREAM_SHARDING_OFF, STREAM_SHARDINGS)
+    if sharding == STREAM_SHARDING_MESSAGE_ID and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("STREAM_SHARDING=message_id requires WRITER_MODE=batch")
+    return sharding
+
+
+def _background_flush(env: Mapping[str, str], writer_mode: str) -> bool:
+    background = _flag(env, "BACKGROUND_FLUSH")
+    if background and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("BACKGROUND_FLUSH requires WRITER_MODE=batch")
+    return background
+
+
+def _event_timestamp(env: Mapping[str, str], writer_mode: str) -> str:
+    event_timestamp = _choice(env, "EVENT_TIMESTAMP", EVENT_TIMESTAMP_INGESTION, EVENT_TIMESTAMPS)
+    if event_timestamp != EVENT_TIMESTAMP_INGESTION and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("EVENT_TIMESTAMP=sns requires WRITER_MODE=batch")
+    return event_timestamp
+
+
+def _compaction(env: Mapping[str, str], writer_mode: str) -> str:
+    compaction = _choice(env, "COMPACTION", COMPACTION_OFF, COMPACTION_MODES)
+    if compaction != COMPACTION_OFF and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("COMPACTION requires WRITER_MODE=batch")
+    return compaction
+
+
+def _oversized_messages(env: Mapping[str, str], writer_mode: str) -> str:
+    mode = _choice(env, "OVERSIZED_MESSAGES", OVERSIZED_SPLIT, OVERSIZED_MODES)
+    if mode != OVERSIZED_SPLIT and writer_mode != WRITER_MODE_BATCH:
+        raise ConfigError("OVERSIZED_MESSAGES requires WRITER_MODE=batch")
+    if mode == OVERSIZED_OFFLOAD and not env.get("OFFLOAD_BUCKET"):
+        raise ConfigError("OVERSIZED_MESSAGES=offload requires OFFLOAD_BUCKET")
+    return mode
+
+
+def _metric_dimensions(env: Mapping[str, str]) -> Tuple[str, ...]:
+    value = env.get("METRICS_DIMENSIONS")
+    if value is None:
+        return DEFAULT_METRIC_DIMENSIONS
+    dimensions = tuple(name.strip() for name in value.split(",") if name.strip())
+    for name in dimensions:
+        if name not in METRIC_DIMENSIONS:
+            raise ConfigError(f"Unknown METRICS_DIMENSIONS entry {name!r}, expected some of {METRIC_DIMENSIONS}")
+    return tuple(dict.fromkeys(dimensions))
+
+
+def _dead_letter_target(env: Mapping[str, str]) -> str:
+    value = env.get("DEAD_LETTER_TARGET") or DEAD_LETTER_NONE
+    if value in (DEAD_LETTER_NONE, DEAD_LETTER_LOG, DEAD_LETTER_SPOOL):
+        return value
+    try:
+        queue_url(value)
+    except ValueError:
+        raise ConfigError(
+            f"Invalid DEAD_LETTER_TARGET {value!r}, expected {DEAD_LETTER_NONE!r}, {DEAD_LETTER_LOG!r}, "
+            f"{DEAD_LETTER_SPOOL!r} or an SQS queue ARN"
+        ) from None
+    return value
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Config:
+    """Settings for the handler, resolved at cold start."""
+
+    log_level: int
+    log_group: str
+    log_stream_format: str = DEFAULT_LOG_STREAM_FORMAT
+    writer_mode: str = WRITER_MODE_WATCHTOWER
+    event_timestamp: str = EVENT_TIMESTAMP_INGESTION
+    # Destinations other than log_group, tried in order (batch mode only)
+    routes: Tuple[Route, ...] = ()
+    # Maximum number of destinations written in parallel (batch mode only)
+    flush_concurrency: int = DEFAULT_FLUSH_CONCURRENCY
+    # Where undelivered events go instead of failing the invocation (batch mode only)
+    dead_letter_target: str = DEAD_LETTER_NONE
+    # Where the spool dead-letter target keeps events, its size cap, and how
+    # long a flush retries before spooling
+    spool_dir: str = DEFAULT_SPOOL_DIR
+    spool_max_bytes: int = DEFAULT_SPOOL_MAX_BYTES
+    spool_retry_seconds: float = DEFAULT_SPOOL_RETRY_SECONDS
+    # Whether the flusher extension writes the events after the response is
+    # sent, and the local port it listens on (batch mode only)
+    background_flush: bool = False
+    extension_port: int = DEFAULT_EXTENSION_PORT
+    # Which repeated messages are collapsed (batch mode only)
+    compaction: str = COMPACTION_OFF
+    # Number of written MessageIds remembered across warm invocations
+    dedupe_cache_size: int = DEFAULT_DEDUPE_CACHE_SIZE
+    # Whether messages are written as is or as JSON with their SNS metadata
+    message_format: str = MESSAGE_FORMAT_RAW
+    # What happens to messages over the event size limit (batch mode only)
+    oversized_messages: str = OVERSIZED_SPLIT
+    # S3 bucket and key prefix oversized messages are offloaded to
+    offload_bucket: str = ""
+    offload_prefix: str = DEFAULT_OFFLOAD_PREFIX
+    # CloudWatch namespace for invocation metrics; empty when they are off
+    metrics_namespace: str = ""
+    metrics_dimensions: Tuple[str, ...] = DEFAULT_METRIC_DIMENSIONS
+    # Profile one invocation in profile_sample; 0 turns profiling off
+    profile_sample: int = 0
+    profile_memory: bool = False
+    # Whether the init phase primes the client and the default log stream
+    prewarm: bool = True
+    # Seconds a log group or stream is known to exist without another check; 0 turns that off
+    stream_cache_ttl: int = DEFAULT_STREAM_CACHE_TTL_SECONDS
+    # Filter and transform rules applied to every message, in order
+    rules: Tuple[Rule, ...] = ()
+    # Shard suffix added to log stream names, and the number of message_id shards
+    stream_sharding: str = STREAM_SHARDING_OFF
+    stream_shards: int = DEFAULT_STREAM_SHARDS
+    # Connection pool, timeouts and retries of the shared CloudWatch Logs client
+    client: ClientSettings = ClientSettings(pool_size=DEFAULT_FLUSH_CONCURRENCY)
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "Config":
+        """Read and validate the configuration from ``env`` (default: ``os.environ``)."""
+        if env is None:
+            env = os.environ
+        writer_mode = _choice(env, "WRITER_MODE", WRITER_MODE_WATCHTOWER, WRITER_MODES)
+        flush_concurrency = _positive_int(env, "FLUSH_CONCURRENCY", DEFAULT_FLUSH_CONCURRENCY)
+        return cls(
+            log_level=_log_level(env, "LOG_LEVEL", logging.INFO),
+            log_group=_required(env, "LOG_GROUP"),
+            log_stream_format=env.get("LOG_STREAM_FORMAT") or DEFAULT_LOG_STREAM_FORMAT,
+            writer_mode=writer_mode,
+            event_timestamp=_event_timestamp(env, writer_mode),
+            routes=_routes(env, writer_mode),
+            flush_concurrency=flush_concurrency,
+            dead_letter_target=_dead_letter_target(env),
+            spool_dir=env.get("SPOOL_DIR") or DEFAULT_SPOOL_DIR,
+            spool_max_bytes=_positive_int(env, "SPOOL_MAX_BYTES", DEFAULT_SPOOL_MAX_BYTES),
+            spool_retry_seconds=_positive_number(env, "SPOOL_RETRY_TIME", DEFAULT_SPOOL_RETRY_SECONDS),
+            background_flush=_background_flush(env, writer_mode),
+            extension_port=_positive_int(env, "EXTENSION_PORT", DEFAULT_EXTENSION_PORT),
+            compaction=_compaction(env, writer_mode),
+            dedupe_cache_size=_positive_int(env, "DEDUPE_CACHE_SIZE", DEFAULT_DEDUPE_CACHE_SIZE),
+            message_format=_choice(env, "MESSAGE_FORMAT", MESSAGE_FORMAT_RAW, MESSAGE_FORMATS),
+            oversized_messages=_oversized_messages(env, writer_mode),
+            offload_bucket=env.get("OFFLOAD_BUCKET") or "",
+            offload_prefix=env.get("OFFLOAD_PREFIX", DEFAULT_OFFLOAD_PREFIX),
+            metrics_namespace=env.get("METRICS_NAMESPACE") or "",
+            metrics_dimensions=_metric_dimensions(env),
+            profile_sample=_non_negative_int(env, "PROFILE_SAMPLE", 0),
+            profile_memory=_flag(env, "PROFILE_MEMORY"),
+            prewarm=_flag(env, "PREWARM", True),
+            stream_cache_ttl=_non_negative_int(env, "STREAM_CACHE_TTL", DEFAULT_STREAM_CACHE_TTL_SECONDS),
+            rules=_rules(env),
+            client=_client(env, flush_concurrency),
+            stream_sharding=_stream_sharding(env, writer_mode),
+            stream_shards=_positive_int(env, "STREAM_SHARDS", DEFAULT_STREAM_SHARDS),
+        )
+
+    @property
+    def use_sns_timestamp(self) -> bool:
+        return self.event_timestamp == EVENT_TIMESTAMP_SNS
+
+    @property
+    def use_json(self) -> bool:
+        return self.message_format == MESSAGE_FORMAT_JSON
@@ -0,0 +1,110 @@
+"""Dead-letter sinks for log events that could not be delivered to CloudWatch Logs.
+
+DEAD_LETTER_TARGET selects the sink:
+
+- unset or ``none``: no sink; undelivered events fail the invocation so that
+  the whole event is retried.
+- ``log``: undelivered events are written to the function's own log.
+- ``spool``: undelivered events are kept in ``/tmp`` and written by later
+  invocations (see ``spool.py``).
+- an SQS queue ARN: each undelivered event is sent to the queue as a JSON
+  message with its log group, log stream, timestamp and message.
+"""
+
+import json
+from typing import Any, Callable, List, Optional, Protocol
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.spool import (
+    DEFAULT_SPOOL_DIR,
+    DEFAULT_SPOOL_MAX_BYTES,
+    DEFAULT_SPOOL_RETRY_SECONDS,
+    Spool,
+)
+
+DEAD_LETTER_NONE = "none"
+DEAD_LETTER_LOG = "log"
+DEAD_LETTER_SPOOL = "spool"
+# SendMessageBatch limit
+SQS_BATCH_SIZE = 10
+
+
+class DeadLetterSink(Protocol):
+    def send(self, log_group: str, log_stream: str, events: List[LogEvent]) -> None:
+        """Store undelivered events, raising if they cannot be stored either."""
+
+
+class LogSink:
+    """Write undelivered events to the function's own log."""
+
+    def send(self, log_group: str, log_stream: str, events: List[LogEvent]) -> None:
+        for event in events:
+            log.error(
+                "Undelivered log event",
+                log_group=log_group,
+                log_stream=log_stream,
+                timestamp=event["timestamp"],
+                message=event["message"],
+            )
+
+
+def queue_url(queue_arn: str) -> str:
+    """Return the URL of an SQS queue given its ARN."""
+    parts = queue_arn.split(":")
+    if len(parts) != 6 or parts[2] != "sqs":
+        raise ValueError(f"Not an SQS queue ARN: {queue_arn!r}")
+    _, partition, _, region, account, name = parts
+    domain = "amazonaws.com.cn" if partition == "aws-cn" else "amazonaws.com"
+    return f"https://sqs.{region}.{domain}/{account}/{name}"
+
+
+class SqsSink:
+    """Send undelivered events to an SQS queue."""
+
+    def __init__(self, queue_arn: str, client_factory: Callable[[], Any]) -> None:
+        self.queue_url = queue_url(queue_arn)
+        self._client_factory = client_factory
+        self._client: Any = None
+
+    def send(self, log_group: str, log_stream: str, events: List[LogEvent]) -> None:
+        if self._client is None:
+            self._client = self._client_factory()
+        for start in range(0, len(events), SQS_BATCH_SIZE):
+            entries = [
+                {
+                    "Id": str(index),
+                    "MessageBody": json.dumps({
+                        "log_group": log_group,
+                        "log_stream": log_stream,
+                        "timestamp": event["timestamp"],
+                        "message": event["message"],
+                    }),
+                }
+                for index, event in enumerate(events[start:start + SQS_BATCH_SIZE])
+            ]
+            response = self._client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            if response.get("Failed"):
+                raise RuntimeError(f"SQS rejected {len(response['Failed'])} dead-letter messages: {response['Failed']}")
+
+
+def _sqs_client() -> Any:
+    import boto3
+
+    return boto3.client("sqs")
+
+
+def make_sink(
+    target: str,
+    spool_dir: str = DEFAULT_SPOOL_DIR,
+    spool_max_bytes: int = DEFAULT_SPOOL_MAX_BYTES,
+    spool_retry_seconds: float = DEFAULT_SPOOL_RETRY_SECONDS,
+) -> Optional[DeadLetterSink]:
+    """Return the sink for a DEAD_LETTER_TARGET value, or None for no sink."""
+    if not target or target == DEAD_LETTER_NONE:
+        return None
+    if target == DEAD_LETTER_LOG:
+        return LogSink()
+    if target == DEAD_LETTER_SPOOL:
+        return Spool(spool_dir, spool_max_bytes, spool_retry_seconds)
+    return SqsSink(target, _sqs_client)
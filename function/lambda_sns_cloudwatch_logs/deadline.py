@@ -0,0 +1,47 @@
+"""Time budget of an invocation, taken from the Lambda context.
+
+A deadline is a ``time.monotonic()`` value, or None when there is no limit
+(for example when the handler is run outside Lambda).
+"""
+
+import math
+import time
+from typing import Any, Optional
+
+# Time kept back from the Lambda timeout so the invocation can finish and
+# report instead of being killed
+DEADLINE_MARGIN_SECONDS = 0.5
+# A PutLogEvents call is not started with less time than this left, so a
+# flush is never cut off half way through a request
+MIN_CALL_SECONDS = 0.25
+# With less time than this left, optional per-message work is skipped
+LOW_TIME_SECONDS = 1.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """There was not enough time left in the invocation to write the events."""
+
+
+def from_context(context: Any, margin: float = DEADLINE_MARGIN_SECONDS) -> Optional[float]:
+    """Return the deadline for an invocation, ``margin`` seconds before its timeout."""
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining_time is None:
+        return None
+    return time.monotonic() + get_remaining_time() / 1000 - margin
+
+
+def remaining(deadline: Optional[float]) -> float:
+    """Return the seconds left before ``deadline``, which may be negative."""
+    if deadline is None:
+        return math.inf
+    return deadline - time.monotonic()
+
+
+def from_epoch_millis(deadline_ms: Optional[int], margin: float = DEADLINE_MARGIN_SECONDS) -> Optional[float]:
+    """Return the deadline ``margin`` seconds before an epoch time in milliseconds.
+
+    The Lambda Extensions API gives the deadline of an event that way.
+    """
+    if deadline_ms is None:
+        return None
+    return time.monotonic() + deadline_ms / 1000 - time.time() - margin
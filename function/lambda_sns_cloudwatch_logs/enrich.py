@@ -0,0 +1,70 @@
+"""Format SNS messages as structured JSON log events.
+
+MESSAGE_FORMAT selects what is written for each message:
+
+- ``raw`` (default): the message body as it is.
+- ``json``: one compact JSON document holding the message and its SNS
+  metadata, so CloudWatch Logs Insights can query the fields directly::
+
+    {"topic_arn":"...","message_id":"...","subject":null,
+     "timestamp":"...","attributes":{"name":"value"},"message":...}
+
+  A body that is itself JSON is embedded as a value rather than as an
+  escaped string. ``attributes`` and ``repeated`` are only present when
+  there are message attributes or compacted repeats.
+"""
+
+import json
+from typing import Any, Mapping, Optional
+
+MESSAGE_FORMAT_RAW = "raw"
+MESSAGE_FORMAT_JSON = "json"
+MESSAGE_FORMATS = (MESSAGE_FORMAT_RAW, MESSAGE_FORMAT_JSON)
+
+# The documents are assembled from pre-encoded pieces rather than built as a
+# dict and dumped, so the SNS record is never copied
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+_encode_string = json.encoder.encode_basestring
+_ENVELOPE = '{"topic_arn":%s,"message_id":%s,"subject":%s,"timestamp":%s,%s"message":%s}'
+
+
+def _string(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return _encode_string(value)
+    return _encode(value)
+
+
+def _body(message: str) -> str:
+    if message.lstrip()[:1] in ("{", "["):
+        try:
+            return _encode(json.loads(message))
+        except ValueError:
+            pass
+    return _encode_string(message)
+
+
+def _attributes(attributes: Mapping[str, Mapping[str, Any]]) -> str:
+    return '"attributes":{%s},' % ",".join(
+        f"{_encode_string(name)}:{_string(attribute.get('Value'))}" for name, attribute in attributes.items()
+    )
+
+
+def to_json(sns: Mapping[str, Any], repeated: int = 1, message: Optional[str] = None) -> str:
+    """Return the JSON log event for the ``Sns`` body of a record.
+
+    ``message`` replaces the body, for messages the filter rules changed.
+    """
+    attributes = sns.get("MessageAttributes")
+    extra = _attributes(attributes) if attributes else ""
+    if repeated > 1:
+        extra += f'"repeated":{repeated},'
+    return _ENVELOPE % (
+        _string(sns.get("TopicArn")),
+        _string(sns.get("MessageId")),
+        _string(sns.get("Subject")),
+        _string(sns.get("Timestamp")),
+        extra,
+        _body(sns["Message"] if message is None else message),
+    )
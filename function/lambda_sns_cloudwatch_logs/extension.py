@@ -0,0 +1,239 @@
+"""The ``sns-cloudwatch-flusher`` Lambda extension, which writes events after the response.
+
+With BACKGROUND_FLUSH on, the module's layer adds this extension to the
+function. It starts at init, next to the runtime, and registers with the
+Lambda Extensions API for INVOKE and SHUTDOWN events:
+
+- It listens on 127.0.0.1:EXTENSION_PORT for the events each invocation
+  hands off (see ``handoff.py``).
+- On INVOKE, it waits for that invocation's events and writes them with the
+  function's own settings: routing and sharding have already been applied,
+  the client, flush concurrency and dead-letter target are read from the
+  same environment. Lambda sends the function's response as soon as the
+  handler returns, and only starts the next invocation of the instance once
+  the extension asks for the next event.
+- On SHUTDOWN, it writes whatever is left, spooled events included, before
+  Lambda stops the instance.
+
+Lambda still bills the time the extension takes after the response, and
+the function timeout covers it. Events the extension fails to write go to
+the dead-letter target; with none, they are logged and lost, since the
+invocation has already succeeded. DEAD_LETTER_TARGET=spool keeps them for a
+later invocation.
+
+Run as ``python3 -m lambda_sns_cloudwatch_logs.extension``, with the Extensions
+API address in AWS_LAMBDA_RUNTIME_API.
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent
+from lambda_sns_cloudwatch_logs.client import make_logs_client
+from lambda_sns_cloudwatch_logs.config import Config
+from lambda_sns_cloudwatch_logs.deadline import from_epoch_millis, remaining
+from lambda_sns_cloudwatch_logs.deadletter import make_sink
+from lambda_sns_cloudwatch_logs.flush import FlushError, flush
+from lambda_sns_cloudwatch_logs.handoff import HANDOFF_PATH, REQUEST_ID_HEADER, Destination
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.spool import Spool, decode_blocks
+from lambda_sns_cloudwatch_logs.streams import StreamCache
+from lambda_sns_cloudwatch_logs.writer import BatchWriter
+
+# Lambda requires the name of the executable in /opt/extensions
+EXTENSION_NAME = "sns-cloudwatch-flusher"
+API_PATH = "/2020-01-01/extension"
+EVENT_INVOKE = "INVOKE"
+EVENT_SHUTDOWN = "SHUTDOWN"
+ERROR_TYPE = "Extension.FlusherError"
+
+
+class ExtensionError(Exception):
+    """The Extensions API refused a request."""
+
+
+class ExtensionsApi:
+    """Client of the Lambda Extensions API at ``address`` (host:port)."""
+
+    def __init__(self, address: str, name: str = EXTENSION_NAME) -> None:
+        self.host, _, port = address.partition(":")
+        self.port = int(port or 80)
+        self.name = name
+        self.extension_id = ""
+
+    def _request(
+        self, method: str, path: str, body: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[http.client.HTTPResponse, bytes]:
+        # Waiting for the next event has no time limit
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=None)
+        try:
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            connection.request(method, API_PATH + path, data, headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise ExtensionError(f"{method} {path} failed with {response.status}: {payload[:200]!r}")
+        return response, payload
+
+    def register(self, events: Sequence[str]) -> None:
+        response, _ = self._request(
+            "POST", "/register", {"events": list(events)}, {"Lambda-Extension-Name": self.name}
+        )
+        self.extension_id = response.getheader("Lambda-Extension-Identifier") or ""
+
+    def next_event(self) -> Dict[str, Any]:
+        """Block until Lambda sends the next event."""
+        _, payload = self._request("GET", "/event/next", headers={"Lambda-Extension-Identifier": self.extension_id})
+        return json.loads(payload)
+
+    def init_error(self, message: str) -> None:
+        """Fail the init phase of the instance."""
+        self._request(
+            "POST",
+            "/init/error",
+            {"errorMessage": message, "errorType": ERROR_TYPE},
+            {"Lambda-Extension-Identifier": self.extension_id, "Lambda-Extension-Function-Error-Type": ERROR_TYPE},
+        )
+
+
+class _HandoffRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "HandoffServer"
+
+    def do_POST(self) -> None:
+        request_id = self.headers.get(REQUEST_ID_HEADER)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path != HANDOFF_PATH or not request_id:
+            self._reply(404 if self.path != HANDOFF_PATH else 400)
+            return
+        self.server.add(request_id, decode_blocks(body))
+        self._reply(202)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class HandoffServer(ThreadingHTTPServer):
+    """Receives the events handed off by invocations, on 127.0.0.1:``port``."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int) -> None:
+        super().__init__(("127.0.0.1", port), _HandoffRequestHandler)
+        self._condition = threading.Condition()
+        self._pending: Dict[Destination, List[LogEvent]] = {}
+        self._handed_off: Set[str] = set()
+
+    def add(self, request_id: str, blocks: List[Tuple[Destination, List[LogEvent]]]) -> None:
+        with self._condition:
+            for destination, events in blocks:
+                self._pending.setdefault(destination, []).extend(events)
+            self._handed_off.add(request_id)
+            self._condition.notify_all()
+
+    def wait_for(self, request_id: str, timeout: Optional[float]) -> bool:
+        """Wait for an invocation to hand off, returning whether it did within ``timeout`` seconds."""
+        with self._condition:
+            handed_off = self._condition.wait_for(lambda: request_id in self._handed_off, timeout)
+            self._handed_off.discard(request_id)
+        return handed_off
+
+    def take(self) -> Dict[Destination, List[LogEvent]]:
+        """Return the events handed off so far, and forget them."""
+        with self._condition:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class Flusher:
+    """Writes handed off events the way the handler would have."""
+
+    def __init__(self, config: Config, client: Any = None) -> None:
+        self.client = client if client is not None else make_logs_client(config.client)
+        self.streams = StreamCache(config.stream_cache_ttl)
+        self.executor = ThreadPoolExecutor(max_workers=config.flush_concurrency, thread_name_prefix="flush")
+        self.dead_letter = make_sink(
+            config.dead_letter_target, config.spool_dir, config.spool_max_bytes, config.spool_retry_seconds
+        )
+
+    def flush(self, destinations: Dict[Destination, List[LogEvent]], deadline: Optional[float]) -> None:
+        """Write ``destinations`` until ``deadline``, with the events spooled so far."""
+        spool = self.dead_letter if isinstance(self.dead_letter, Spool) else None
+        drained = None
+        if spool is not None:
+            drained = spool.drain()
+            for destination, events in drained.events.items():
+                destinations.setdefault(destination, []).extend(events)
+            if drained.segments:
+                log.info("Writing spooled events", count=len(drained), expired=drained.expired)
+        if not destinations:
+            return
+        writes = [
+            (BatchWriter(self.client, log_group, log_stream, streams=self.streams), events)
+            for (log_group, log_stream), events in destinations.items()
+        ]
+        try:
+            flush(writes, self.executor, spool.deadline(deadline) if spool is not None else deadline, self.dead_letter)
+        except FlushError:
+            # Already logged; the invocations that handed the events off have succeeded
+            return
+        if spool is not None and drained is not None:
+            spool.commit(drained)
+
+
+def run(api: ExtensionsApi, server: HandoffServer, flusher: Flusher) -> None:
+    """Write each invocation's events once it has handed them off, until SHUTDOWN."""
+    while True:
+        event = api.next_event()
+        deadline = from_epoch_millis(event.get("deadlineMs"))
+        if event.get("eventType") == EVENT_SHUTDOWN:
+            flusher.flush(server.take(), deadline)
+            return
+        request_id = event.get("requestId") or ""
+        left = remaining(deadline)
+        if not server.wait_for(request_id, max(left, 0) if deadline is not None else None):
+            log.warn("Invocation did not hand off its events", request_id=request_id)
+        flusher.flush(server.take(), deadline)
+
+
+def main() -> None:
+    api = ExtensionsApi(os.environ["AWS_LAMBDA_RUNTIME_API"])
+    try:
+        config = Config.from_env()
+    except ValueError as err:
+        # Only a registered extension can report the error
+        api.register((EVENT_SHUTDOWN,))
+        api.init_error(f"Invalid configuration: {err}")
+        sys.exit(1)
+    log.set_level(config.log_level)
+    if not config.background_flush:
+        # Nothing is handed off; stay out of the way of invocations
+        api.register((EVENT_SHUTDOWN,))
+        api.next_event()
+        return
+
+    api.register((EVENT_INVOKE, EVENT_SHUTDOWN))
+    try:
+        server = HandoffServer(config.extension_port)
+    except OSError as err:
+        api.init_error(f"Cannot listen on port {config.extension_port}: {err}")
+        sys.exit(1)
+    threading.Thread(target=server.serve_forever, name="handoff", daemon=True).start()
+    run(api, server, Flusher(config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Flush events to several CloudWatch Logs destinations concurrently."""
+
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent
+from lambda_sns_cloudwatch_logs.deadletter import DeadLetterSink
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.metrics import Metrics
+from lambda_sns_cloudwatch_logs.profiling import NULL_PROFILER, STAGE_BATCH, Profiler
+from lambda_sns_cloudwatch_logs.writer import BatchWriter, WriteResult
+
+# (log group, log stream)
+Destination = Tuple[str, str]
+
+
+class FlushError(Exception):
+    """Events could not be written to one or more destinations."""
+
+    def __init__(self, failures: Dict[Destination, Exception]) -> None:
+        self.failures = failures
+        names = ", ".join(f"{group}:{stream}" for group, stream in failures)
+        super().__init__(f"Failed to write to {len(failures)} destination(s): {names}")
+
+
+class UndeliveredEvents(Exception):
+    """Some events were not delivered, without an error to say why."""
+
+
+def _write(writer: BatchWriter, events: List[LogEvent], deadline: Optional[float]) -> WriteResult:
+    try:
+        return writer.write(events, deadline)
+    except Exception as err:
+        return WriteResult(failed=events, error=err)
+
+
+def flush(
+    writes: Sequence[Tuple[BatchWriter, List[LogEvent]]],
+    executor: Optional[Executor] = None,
+    deadline: Optional[float] = None,
+    dead_letter: Optional[DeadLetterSink] = None,
+    metrics: Optional[Metrics] = None,
+    profiler: Profiler = NULL_PROFILER,
+) -> int:
+    """Write every writer's events and return the number of PutLogEvents calls made.
+
+    Destinations are written in parallel on ``executor`` so the flush takes
+    about as long as the slowest one. A single destination is written on the
+    calling thread. Each writer retries its own failed batches until
+    ``deadline``; events that are still undelivered go to ``dead_letter``.
+    Without a dead-letter sink, or if the sink fails too, the failures are
+    logged and raised together as a FlushError. Calls, retries and bytes
+    written, and events CloudWatch rejected, are added to ``metrics``, and batch building time to ``profiler``.
+    """
+    if executor is None or len(writes) < 2:
+        results = [(writer, _write(writer, events, deadline)) for writer, events in writes]
+    else:
+        futures = [(writer, executor.submit(_write, writer, events, deadline)) for writer, events in writes]
+        results = [(writer, future.result()) for writer, future in futures]
+
+    calls = 0
+    failures: Dict[Destination, Exception] = {}
+    for writer, result in results:
+        calls += result.calls
+        if metrics is not None:
+            metrics.add("PutLogEventsCalls", result.calls)
+            metrics.add("ThrottleRetries", result.retries)
+            metrics.add("BytesWritten", result.bytes)
+            metrics.add("RejectedEvents", result.rejected)
+        profiler.add(STAGE_BATCH, *result.build_time)
+        if result.ok:
+            continue
+        destination = (writer.log_group, writer.log_stream)
+        error = result.error or UndeliveredEvents(f"{len(result.failed)} log events not delivered")
+        if dead_letter is not None:
+            try:
+                dead_letter.send(writer.log_group, writer.log_stream, result.failed)
+            except Exception as sink_error:
+                failures[destination] = sink_error
+                continue
+            if metrics is not None:
+                metrics.add("DeadLetterEvents", len(result.failed))
+            log.warn(
+                "Sent undelivered log events to dead-letter target",
+                log_group=writer.log_group,
+                log_stream=writer.log_stream,
+                count=len(result.failed),
+                error=str(error),
+            )
+        else:
+            failures[destination] = error
+
+    if failures:
+        for (log_group, log_stream), err in failures.items():
+            log.error("Failed to write log events", log_group=log_group, log_stream=log_stream, error=str(err))
+        flush_error = FlushError(failures)
+        if len(failures) == 1:
+            raise flush_error from next(iter(failures.values()))
+        raise flush_error
+    return calls
@@ -0,0 +1,66 @@
+"""Hand an invocation's log events to the flusher extension instead of writing them.
+
+With BACKGROUND_FLUSH on, the handler posts its events to the
+``sns-cloudwatch-flusher`` extension (see ``extension.py``) on
+127.0.0.1:EXTENSION_PORT and returns; the extension writes them to
+CloudWatch Logs after Lambda has sent the response. The body is the events
+as spool blocks (see ``spool.py``), the request id goes in a header.
+
+The extension holds each invocation open until the handler has handed off,
+so every invocation hands off exactly once, with no events if it has none.
+If the extension does not take the events, the handler writes them itself.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent
+from lambda_sns_cloudwatch_logs.spool import encode_block
+
+DEFAULT_EXTENSION_PORT = 9009
+HANDOFF_PATH = "/handoff"
+REQUEST_ID_HEADER = "Lambda-Runtime-Aws-Request-Id"
+# The extension answers at once; it writes after reading the body
+HANDOFF_TIMEOUT_SECONDS = 1.0
+
+# (log group, log stream)
+Destination = Tuple[str, str]
+
+
+def encode_events(destinations: Dict[Destination, List[LogEvent]]) -> bytes:
+    return b"".join(encode_block(group, stream, events) for (group, stream), events in destinations.items())
+
+
+class Handoff:
+    """Send invocations' events to the flusher extension."""
+
+    __slots__ = ("port", "timeout", "last_request_id", "_http")
+
+    def __init__(self, port: int = DEFAULT_EXTENSION_PORT, timeout: float = HANDOFF_TIMEOUT_SECONDS) -> None:
+        # Imported here so that it loads during the init phase, and only in this mode
+        import http.client
+
+        self.port = port
+        self.timeout = timeout
+        # Invocation that has handed off, so it is not released as well
+        self.last_request_id: Optional[str] = None
+        self._http = http.client
+
+    def send(self, request_id: str, destinations: Dict[Destination, List[LogEvent]]) -> bool:
+        """Hand off the events of an invocation, returning whether the extension took them."""
+        body = encode_events(destinations)
+        connection = self._http.HTTPConnection("127.0.0.1", self.port, timeout=self.timeout)
+        try:
+            connection.request("POST", HANDOFF_PATH, body, {REQUEST_ID_HEADER: request_id})
+            accepted = connection.getresponse().status == 202
+        except (OSError, self._http.HTTPException):
+            return False
+        finally:
+            connection.close()
+        if accepted:
+            self.last_request_id = request_id
+        return accepted
+
+    def release(self, request_id: Optional[str]) -> None:
+        """Let the extension finish an invocation that did not hand off any events."""
+        if request_id and request_id != self.last_request_id:
+            self.send(request_id, {})
@@ -0,0 +1,32 @@
+"""Function logger that only imports structlog once something is logged."""
+
+import logging
+from typing import Any
+
+
+class LazyLogger:
+    """Stand-in for a structlog logger, configured on first use.
+
+    Importing structlog accounts for a large share of cold start time, and
+    most invocations never log anything themselves.
+    """
+
+    def __init__(self) -> None:
+        self._level = logging.INFO
+        self._logger: Any = None
+
+    def set_level(self, level: int) -> None:
+        """Filter out messages below ``level``, reconfiguring structlog on next use."""
+        self._level = level
+        self._logger = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._logger is None:
+            import structlog
+
+            structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(self._level))
+            self._logger = structlog.stdlib.get_logger()
+        return getattr(self._logger, name)
+
+
+log = LazyLogger()
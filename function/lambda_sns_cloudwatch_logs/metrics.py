@@ -0,0 +1,112 @@
+"""Invocation metrics written as a CloudWatch Embedded Metric Format log line.
+
+Counters and timers are collected in memory during an invocation and
+printed to stdout as one EMF document at the end. Lambda sends stdout to
+the function's own log group, where CloudWatch extracts the metrics; no API
+call is made. METRICS_NAMESPACE turns this on, and METRICS_DIMENSIONS
+picks the dimensions (``log_group``, ``topic``).
+"""
+
+import json
+import sys
+import time
+from typing import IO, Dict, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.records import (
+    SKIP_MISSING_EVENT_SOURCE,
+    SKIP_MISSING_MESSAGE,
+    SKIP_NON_SNS,
+    SkippedRecords,
+)
+
+METRIC_DIMENSION_LOG_GROUP = "log_group"
+METRIC_DIMENSION_TOPIC = "topic"
+METRIC_DIMENSIONS = (METRIC_DIMENSION_LOG_GROUP, METRIC_DIMENSION_TOPIC)
+DEFAULT_METRIC_DIMENSIONS = (METRIC_DIMENSION_LOG_GROUP,)
+
+# EMF property holding each dimension
+_DIMENSION_KEYS = {
+    METRIC_DIMENSION_LOG_GROUP: "LogGroup",
+    METRIC_DIMENSION_TOPIC: "Topic",
+}
+
+# Every metric reported, with its unit
+METRIC_UNITS = {
+    "RecordsProcessed": "Count",
+    "RecordsSkipped": "Count",
+    "SkippedMissingEventSource": "Count",
+    "SkippedNonSns": "Count",
+    "SkippedMissingMessage": "Count",
+    "RecordsFiltered": "Count",
+    "BytesWritten": "Bytes",
+    "Destinations": "Count",
+    "PutLogEventsCalls": "Count",
+    "ThrottleRetries": "Count",
+    "BatchItemFailures": "Count",
+    "DeadLetterEvents": "Count",
+    "RejectedEvents": "Count",
+    "SpoolDrainedEvents": "Count",
+    "HandedOffEvents": "Count",
+    "FlushLatency": "Milliseconds",
+    "Duration": "Milliseconds",
+}
+
+_SKIP_METRICS = {
+    SKIP_MISSING_EVENT_SOURCE: "SkippedMissingEventSource",
+    SKIP_NON_SNS: "SkippedNonSns",
+    SKIP_MISSING_MESSAGE: "SkippedMissingMessage",
+}
+
+
+def topic_name(topic_arn: Optional[str]) -> str:
+    """Return the topic name of an SNS topic ARN, for the Topic dimension."""
+    if not topic_arn:
+        return "unknown"
+    return topic_arn.rsplit(":", 1)[-1]
+
+
+class Metrics:
+    """Counters and timers of one invocation."""
+
+    __slots__ = ("values", "started", "log_group", "topic")
+
+    def __init__(self, log_group: str = "") -> None:
+        self.values: Dict[str, float] = dict.fromkeys(METRIC_UNITS, 0)
+        self.started = time.perf_counter()
+        self.log_group = log_group
+        self.topic = "unknown"
+
+    def add(self, name: str, value: float = 1) -> None:
+        self.values[name] += value
+
+    def add_skipped(self, skipped: SkippedRecords) -> None:
+        for reason, count in skipped.counts.items():
+            self.values[_SKIP_METRICS[reason]] += count
+        self.values["RecordsSkipped"] += skipped.total
+
+    def document(self, namespace: str, dimensions: Tuple[str, ...]) -> Dict[str, object]:
+        """Return the EMF document for the invocation so far."""
+        self.values["Duration"] = (time.perf_counter() - self.started) * 1000
+        dimension_values = {
+            METRIC_DIMENSION_LOG_GROUP: self.log_group,
+            METRIC_DIMENSION_TOPIC: self.topic,
+        }
+        document: Dict[str, object] = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [[_DIMENSION_KEYS[name] for name in dimensions]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in METRIC_UNITS.items()],
+                }],
+            },
+        }
+        for name in dimensions:
+            document[_DIMENSION_KEYS[name]] = dimension_values[name]
+        document.update(self.values)
+        return document
+
+    def emit(self, namespace: str, dimensions: Tuple[str, ...], stream: Optional[IO[str]] = None) -> None:
+        """Print the EMF document as a single line."""
+        line = json.dumps(self.document(namespace, dimensions), separators=(",", ":"))
+        (stream or sys.stdout).write(line + "\n")
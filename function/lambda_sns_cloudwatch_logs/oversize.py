@@ -0,0 +1,166 @@
+"""Make messages larger than the CloudWatch Logs event limit fit.
+
+OVERSIZED_MESSAGES selects what happens to a message over MAX_MESSAGE_BYTES
+(batch mode only):
+
+- ``split`` (default): the message is written as several events, each
+  prefixed with ``[<id> <part>/<parts>] ``.
+- ``gzip``: the message is written as one JSON event holding it gzipped
+  and base64 encoded: ``{"oversized":"gzip+base64","id":...,"bytes":...,"data":...}``.
+  Messages that are still too large are split.
+- ``offload``: the message is stored in S3 (OFFLOAD_BUCKET) and a pointer
+  event is written: ``{"oversized":"offloaded","id":...,"bytes":...,"location":"s3://..."}``.
+  Messages that cannot be stored are split.
+
+The id is derived from the message content, so the parts of a message, and
+its offloaded copy, are the same when SNS redelivers it.
+"""
+
+import json
+from typing import Any, Callable, List, Optional, Protocol
+
+from lambda_sns_cloudwatch_logs.batch import (
+    EVENT_OVERHEAD_BYTES,
+    MAX_MESSAGE_BYTES,
+    LogEvent,
+    SizedEvent,
+    event_size,
+)
+from lambda_sns_cloudwatch_logs.logger import log
+
+OVERSIZED_SPLIT = "split"
+OVERSIZED_GZIP = "gzip"
+OVERSIZED_OFFLOAD = "offload"
+OVERSIZED_MODES = (OVERSIZED_SPLIT, OVERSIZED_GZIP, OVERSIZED_OFFLOAD)
+
+DEFAULT_OFFLOAD_PREFIX = "oversized/"
+PART_HEADER = "[{id} {part}/{parts}] "
+# Room kept in each part for its header
+_HEADER_BYTES = 64
+
+
+class ObjectStore(Protocol):
+    def put(self, key: str, body: bytes) -> str:
+        """Store ``body`` under ``key`` and return its location."""
+
+
+class S3Store:
+    """Store oversized messages in an S3 bucket.
+
+    Point AWS_ENDPOINT_URL_S3 at an S3-compatible stand-in to use one locally.
+    """
+
+    def __init__(self, bucket: str, prefix: str, client_factory: Callable[[], Any]) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client_factory = client_factory
+        self._client: Any = None
+
+    def put(self, key: str, body: bytes) -> str:
+        if self._client is None:
+            self._client = self._client_factory()
+        key = self.prefix + key
+        self._client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType="text/plain; charset=utf-8")
+        return f"s3://{self.bucket}/{key}"
+
+
+def _s3_client() -> Any:
+    import boto3
+
+    return boto3.client("s3")
+
+
+def make_store(bucket: str, prefix: str = DEFAULT_OFFLOAD_PREFIX) -> Optional[ObjectStore]:
+    """Return the store for OFFLOAD_BUCKET, or None if it is not set."""
+    if not bucket:
+        return None
+    return S3Store(bucket, prefix, _s3_client)
+
+
+def _correlation_id(data: bytes) -> str:
+    # Only oversized messages need it, so hashlib stays out of the cold start
+    import hashlib
+
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def split_message(data: bytes, correlation_id: str, limit: int = MAX_MESSAGE_BYTES) -> List[str]:
+    """Split an encoded message into numbered parts of at most ``limit`` bytes.
+
+    Parts end on character boundaries so each one is valid UTF-8 on its own.
+    """
+    chunk_bytes = limit - _HEADER_BYTES
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = min(start + chunk_bytes, len(data))
+        # Back off to the first byte of a multi-byte character
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        chunks.append(data[start:end].decode("utf-8"))
+        start = end
+    return [
+        PART_HEADER.format(id=correlation_id, part=number, parts=len(chunks)) + chunk
+        for number, chunk in enumerate(chunks, 1)
+    ]
+
+
+class OversizeHandler:
+    """Replace events over the size limit with ones that fit."""
+
+    def __init__(self, mode: str = OVERSIZED_SPLIT, store: Optional[ObjectStore] = None,
+                 limit: int = MAX_MESSAGE_BYTES) -> None:
+        self.mode = mode
+        self.store = store
+        self.limit = limit
+
+    def fit(self, events: List[LogEvent]) -> List[LogEvent]:
+        """Return ``events`` with every oversized event replaced.
+
+        The list is returned as is when no event is too large.
+        """
+        fitted: Optional[List[LogEvent]] = None
+        for index, event in enumerate(events):
+            if event_size(event) - EVENT_OVERHEAD_BYTES <= self.limit:
+                if fitted is not None:
+                    fitted.append(event)
+                continue
+            if fitted is None:
+                fitted = events[:index]
+            fitted.extend(self._fit_event(event))
+        return events if fitted is None else fitted
+
+    def _fit_event(self, event: LogEvent) -> List[LogEvent]:
+        timestamp = event["timestamp"]
+        data = event["message"].encode("utf-8")
+        correlation_id = _correlation_id(data)
+
+        if self.mode == OVERSIZED_GZIP:
+            import base64
+            import gzip
+
+            document = json.dumps({
+                "oversized": "gzip+base64",
+                "id": correlation_id,
+                "bytes": len(data),
+                "data": base64.b64encode(gzip.compress(data)).decode("ascii"),
+            }, separators=(",", ":"))
+            if len(document) <= self.limit:
+                return [SizedEvent(timestamp=timestamp, message=document)]
+            data = document.encode("ascii")
+
+        elif self.mode == OVERSIZED_OFFLOAD and self.store is not None:
+            try:
+                location = self.store.put(correlation_id, data)
+            except Exception as err:
+                log.warn("Could not offload oversized message, splitting it", id=correlation_id, error=str(err))
+            else:
+                document = json.dumps({
+                    "oversized": "offloaded",
+                    "id": correlation_id,
+                    "bytes": len(data),
+                    "location": location,
+                }, separators=(",", ":"))
+                return [SizedEvent(timestamp=timestamp, message=document)]
+
+        return [SizedEvent(timestamp=timestamp, message=part) for part in split_message(data, correlation_id, self.limit)]
@@ -0,0 +1,91 @@
+"""Per-stage timings of sampled invocations.
+
+PROFILE_SAMPLE=N profiles one invocation in N on each instance (0, the
+default, turns profiling off), starting with the cold start. A profiled
+invocation records the wall and CPU time of each handler stage and, with
+PROFILE_MEMORY, its peak traced memory. The handler logs the result as one
+structured line. Invocations that are not sampled get NULL_PROFILER, whose
+methods do nothing.
+
+Batches are built on the flush threads, so the ``batch`` stage is the sum
+over all destinations and is also part of the ``flush`` wall time.
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Handler stages, in the order they run
+STAGE_CONFIG = "config"
+STAGE_PARSE = "parse"
+STAGE_ENCODE = "encode"
+STAGE_BATCH = "batch"
+STAGE_FLUSH = "flush"
+
+
+def _clock() -> Tuple[float, float]:
+    return time.perf_counter(), time.process_time()
+
+
+class Profiler:
+    """Lap timer for the stages of one invocation.
+
+    lap() closes the stage running since the previous lap (or since
+    ``started``). add() records time measured elsewhere, such as batch
+    building on the flush threads.
+    """
+
+    __slots__ = ("stages", "trace_memory", "_started", "_last")
+
+    def __init__(self, trace_memory: bool = False, started: Optional[Tuple[float, float]] = None) -> None:
+        self.stages: Dict[str, Tuple[float, float]] = {}
+        self.trace_memory = trace_memory
+        self._started = self._last = started or _clock()
+        if trace_memory:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def add(self, stage: str, wall: float, cpu: float) -> None:
+        previous_wall, previous_cpu = self.stages.get(stage, (0.0, 0.0))
+        self.stages[stage] = (previous_wall + wall, previous_cpu + cpu)
+
+    def lap(self, stage: str) -> None:
+        now = _clock()
+        self.add(stage, now[0] - self._last[0], now[1] - self._last[1])
+        self._last = now
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        """Stop profiling and return the timings, in milliseconds."""
+        wall, cpu = _clock()
+        report: Dict[str, Any] = {
+            "wall_ms": round((wall - self._started[0]) * 1000, 3),
+            "cpu_ms": round((cpu - self._started[1]) * 1000, 3),
+            "stages": {
+                stage: {"wall_ms": round(stage_wall * 1000, 3), "cpu_ms": round(stage_cpu * 1000, 3)}
+                for stage, (stage_wall, stage_cpu) in self.stages.items()
+            },
+        }
+        if self.trace_memory:
+            import tracemalloc
+
+            report["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return report
+
+
+class _NullProfiler(Profiler):
+    """Profiler for invocations that are not sampled."""
+
+    __slots__ = ()
+
+    def add(self, stage: str, wall: float, cpu: float) -> None:
+        pass
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,58 @@
+"""Bookkeeping for event records the handler skips.
+
+Bad records are counted by reason, and only the first few of an invocation
+are logged, each as a short summary rather than the whole record. A burst
+of malformed or foreign records therefore costs about the same to report
+as a single one.
+"""
+
+from itertools import islice
+from typing import Any, Dict
+
+# Reasons a record is skipped, also used as the log message
+SKIP_MISSING_EVENT_SOURCE = "Unexpected record format - missing EventSource"
+SKIP_NON_SNS = "Skipping non-SNS record"
+SKIP_MISSING_MESSAGE = "Unexpected SNS record format - missing Sns.Message"
+
+# Skipped records logged individually per invocation
+SAMPLED_SKIPS = 3
+# Keys listed in the summary of a skipped record or event
+SUMMARY_KEYS = 10
+
+
+def summarize(value: Any) -> Dict[str, Any]:
+    """Return a small description of a record or event that is safe to log."""
+    if not isinstance(value, dict):
+        return {"type": type(value).__name__}
+    summary: Dict[str, Any] = {"keys": list(islice(value, SUMMARY_KEYS))}
+    if len(value) > SUMMARY_KEYS:
+        summary["more_keys"] = len(value) - SUMMARY_KEYS
+    return summary
+
+
+class SkippedRecords:
+    """Count the records skipped in one invocation and pick the ones to log."""
+
+    __slots__ = ("counts", "sampled", "sample_size")
+
+    def __init__(self, sample_size: int = SAMPLED_SKIPS) -> None:
+        self.counts: Dict[str, int] = {}
+        self.sampled = 0
+        self.sample_size = sample_size
+
+    def skip(self, reason: str) -> bool:
+        """Count a skipped record, returning whether it should be logged."""
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        if self.sampled < self.sample_size:
+            self.sampled += 1
+            return True
+        return False
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def unlogged(self) -> int:
+        """Number of skipped records that were only counted."""
+        return self.total - self.sampled
@@ -0,0 +1,423 @@
+"""Replay archived SNS notifications into CloudWatch Logs, outside Lambda.
+
+Run from the ``function`` directory, with the function's environment
+variables set::
+
+    python -m lambda_sns_cloudwatch_logs.replay --checkpoint replay.json events-*.jsonl.gz
+
+Each input is JSON Lines, gzip compressed if its name ends in ``.gz``; ``-``
+or no file at all reads stdin. Files are streamed a chunk of lines at a
+time, never loaded whole. With ``--format auto`` (the default) a line can
+be a whole Lambda event (``{"Records": [...]}``), one SNS or SQS record, or
+an ``Sns`` body with at least a ``Message``; any other line is taken as a
+raw message. ``--format raw`` takes every line as a raw message.
+
+The records go through the handler's batch mode pipeline, with its
+validation, filter rules, routing, compaction, oversized message handling
+and dead-letter target, as configured by the environment. Events keep their
+SNS ``Timestamp`` and go to the log stream for that time, unless
+``--timestamp ingestion`` is given.
+
+``--workers`` processes write in parallel. Records are partitioned by the
+log stream they are written to, so each stream is only written by one
+process and keeps its order. With STREAM_SHARDING=instance every process
+writes its own streams and records are spread by MessageId instead.
+
+``--checkpoint`` names a JSON file holding, for each input, the number of
+lines whose records have all been written. It is updated as chunks finish,
+in input order, and a later run with the same checkpoint skips those lines.
+The first chunk that fails to write stops the run, so that the checkpoint
+never gets ahead of it; chunks after it that were already written are
+written again on the next run.
+
+A summary with the lines read and the invocation metrics of the whole run
+is printed as JSON when the run ends. The exit status is 1 if a chunk failed.
+"""
+
+import argparse
+import datetime
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import zlib
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lambda_sns_cloudwatch_logs.config import EVENT_TIMESTAMP_SNS, EVENT_TIMESTAMPS, WRITER_MODE_BATCH, Config
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.routing import match_route
+from lambda_sns_cloudwatch_logs.sharding import STREAM_SHARDING_INSTANCE, STREAM_SHARDING_MESSAGE_ID, StreamSharder
+from lambda_sns_cloudwatch_logs.sqs import is_sqs_record, unwrap
+from lambda_sns_cloudwatch_logs.timestamps import parse_sns_timestamp
+
+FORMAT_AUTO = "auto"
+FORMAT_RAW = "raw"
+FORMATS = (FORMAT_AUTO, FORMAT_RAW)
+STDIN = "-"
+
+DEFAULT_CHUNK_LINES = 1000
+# Chunks queued for each worker; reading waits once they are all full
+QUEUE_CHUNKS = 4
+# Least time between two saves of the checkpoint, except the last
+CHECKPOINT_INTERVAL_SECONDS = 1.0
+
+# Metrics added up over the run for the summary
+SUMMARY_METRICS = (
+    "RecordsProcessed",
+    "RecordsSkipped",
+    "RecordsFiltered",
+    "BytesWritten",
+    "PutLogEventsCalls",
+    "ThrottleRetries",
+    "DeadLetterEvents",
+    "RejectedEvents",
+)
+
+# Writes the records of one chunk and returns its metrics
+Writer = Callable[[List[Dict[str, Any]]], Dict[str, float]]
+
+
+def open_source(name: str) -> IO[str]:
+    """Open an input for reading as text, decompressing ``.gz`` files."""
+    if name == STDIN:
+        return sys.stdin
+    if name.endswith(".gz"):
+        return gzip.open(name, "rt", encoding="utf-8")
+    return open(name, encoding="utf-8")
+
+
+def _raw(message: str) -> Dict[str, Any]:
+    return {"EventSource": "aws:sns", "Sns": {"Message": message}}
+
+
+def parse_line(line: str, line_format: str = FORMAT_AUTO) -> List[Dict[str, Any]]:
+    """Return the Lambda event records a line of input stands for."""
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return []
+    if line_format == FORMAT_RAW or line.lstrip()[:1] != "{":
+        return [_raw(line)]
+    try:
+        document = json.loads(line)
+    except ValueError:
+        return [_raw(line)]
+    records = document.get("Records")
+    if isinstance(records, list):
+        return records
+    if "EventSource" in document or "eventSource" in document:
+        return [document]
+    if isinstance(document.get("Message"), str):
+        return [{"EventSource": "aws:sns", "Sns": document}]
+    return [_raw(line)]
+
+
+class Partitioner:
+    """Pick the worker for a record from the log stream it will be written to."""
+
+    def __init__(self, config: Config, workers: int) -> None:
+        self.config = config
+        self.workers = workers
+        # The message_id shard is known up front; the instance shard depends on the worker
+        self._sharder = None
+        if config.stream_sharding == STREAM_SHARDING_MESSAGE_ID:
+            self._sharder = StreamSharder(config.stream_sharding, config.stream_shards, instance="replay")
+
+    def key(self, record: Any) -> str:
+        """Return the log group and stream a record goes to, or "" if it is not known."""
+        if not isinstance(record, dict):
+            return ""
+        sns = unwrap(record) if is_sqs_record(record) else record.get("Sns")
+        if not isinstance(sns, dict):
+            return ""
+        if self.config.stream_sharding == STREAM_SHARDING_INSTANCE:
+            return str(sns.get("MessageId") or "")
+        log_group, log_stream_format = self.config.log_group, self.config.log_stream_format
+        route = match_route(self.config.routes, sns) if self.config.routes else None
+        if route is not None:
+            log_group = route.log_group
+            log_stream_format = route.log_stream_format or log_stream_format
+        sent_at = parse_sns_timestamp(sns.get("Timestamp")) if self.config.use_sns_timestamp else None
+        # Records stamped with the time they are written share a stream
+        log_stream = sent_at.strftime(log_stream_format) if sent_at is not None else ""
+        if self._sharder is not None:
+            log_stream = self._sharder.shard(log_stream, sns.get("MessageId"))
+        return f"{log_group}\n{log_stream}"
+
+    def split(self, records: Iterable[Any]) -> Dict[int, List[Any]]:
+        """Group records by the worker that writes them."""
+        partitions: Dict[int, List[Any]] = {}
+        for record in records:
+            partition = zlib.crc32(self.key(record).encode("utf-8")) % self.workers if self.workers > 1 else 0
+            partitions.setdefault(partition, []).append(record)
+        return partitions
+
+
+class Checkpoint:
+    """Lines of each input whose records have all been written, kept in a JSON file."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.lines: Dict[str, int] = {}
+        self._saved = 0.0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as checkpoint_file:
+                self.lines = dict(json.load(checkpoint_file)["lines"])
+
+    @staticmethod
+    def source_key(name: str) -> str:
+        return name if name == STDIN else os.path.abspath(name)
+
+    def done(self, name: str) -> int:
+        """Return the number of lines of an input already written."""
+        return self.lines.get(self.source_key(name), 0)
+
+    def advance(self, name: str, lines: int) -> None:
+        self.lines[self.source_key(name)] = lines
+        if time.monotonic() - self._saved >= CHECKPOINT_INTERVAL_SECONDS:
+            self.save()
+
+    def save(self) -> None:
+        """Write the checkpoint file, replacing the old one in a single step."""
+        if not self.path:
+            return
+        partial = f"{self.path}.tmp"
+        with open(partial, "w", encoding="utf-8") as checkpoint_file:
+            json.dump({"lines": self.lines}, checkpoint_file, indent=2, sort_keys=True)
+        os.replace(partial, self.path)
+        self._saved = time.monotonic()
+
+
+class ReplayError(Exception):
+    """Records of a chunk could not be written."""
+
+
+def write_records(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Write records through the handler's batch mode pipeline and return its metrics."""
+    import sns_cloudwatch_gw
+    from lambda_sns_cloudwatch_logs.metrics import Metrics
+
+    config = sns_cloudwatch_gw._get_config()
+    metrics = Metrics(config.log_group)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    failed = sns_cloudwatch_gw._write_batch({"Records": records}, config, now, None, metrics)
+    # SQS records that could not be written are returned for retry rather than raised
+    if failed:
+        raise ReplayError(f"Failed to write {len(failed)} SQS message(s)")
+    return {name: metrics.values[name] for name in SUMMARY_METRICS}
+
+
+# (chunk, metrics, error)
+Result = Tuple[int, Optional[Dict[str, float]], Optional[str]]
+
+
+def _run_task(write: Writer, chunk: int, records: List[Dict[str, Any]]) -> Result:
+    try:
+        return chunk, write(records), None
+    except Exception as err:
+        return chunk, None, f"{type(err).__name__}: {err}"
+
+
+def _worker(tasks: "multiprocessing.Queue[Any]", results: "multiprocessing.Queue[Result]", write: Writer) -> None:
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        results.put(_run_task(write, *task))
+
+
+class InlinePool:
+    """Writes every partition in this process, for a single worker."""
+
+    def __init__(self, write: Writer) -> None:
+        self.write = write
+        self._results: List[Result] = []
+
+    def submit(self, partition: int, chunk: int, records: List[Dict[str, Any]]) -> None:
+        self._results.append(_run_task(self.write, chunk, records))
+
+    def results(self, wait: bool = False) -> List[Result]:
+        results, self._results = self._results, []
+        return results
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessPool:
+    """One process per partition, each with its own bounded queue of chunks."""
+
+    def __init__(self, workers: int, write: Writer) -> None:
+        context = multiprocessing.get_context()
+        self._results: "multiprocessing.Queue[Result]" = context.Queue()
+        self._tasks = [context.Queue(QUEUE_CHUNKS) for _ in range(workers)]
+        self._processes = [
+            context.Process(target=_worker, args=(tasks, self._results, write), daemon=True) for tasks in self._tasks
+        ]
+        for process in self._processes:
+            process.start()
+        self._pending = 0
+
+    def submit(self, partition: int, chunk: int, records: List[Dict[str, Any]]) -> None:
+        self._pending += 1
+        self._tasks[partition].put((chunk, records))
+
+    def results(self, wait: bool = False) -> List[Result]:
+        """Return the results so far; with ``wait``, once every submitted chunk has one."""
+        results = []
+        while self._pending:
+            try:
+                result = self._results.get(timeout=1.0 if wait else 0)
+            except queue.Empty:
+                if not wait:
+                    break
+                if not all(process.is_alive() for process in self._processes):
+                    raise RuntimeError("A replay worker exited unexpectedly")
+                continue
+            self._pending -= 1
+            results.append(result)
+        return results
+
+    def close(self) -> None:
+        for tasks, process in zip(self._tasks, self._processes):
+            if process.is_alive():
+                tasks.put(None)
+        for process in self._processes:
+            process.join()
+
+
+class Replay:
+    """Feed chunks of input lines to a pool and move the checkpoint past the written ones."""
+
+    def __init__(
+        self,
+        partitioner: Partitioner,
+        pool: Any,
+        checkpoint: Checkpoint,
+        chunk_lines: int = DEFAULT_CHUNK_LINES,
+        line_format: str = FORMAT_AUTO,
+    ) -> None:
+        self.partitioner = partitioner
+        self.pool = pool
+        self.checkpoint = checkpoint
+        self.chunk_lines = chunk_lines
+        self.line_format = line_format
+        self.lines = 0
+        self.totals: Dict[str, float] = dict.fromkeys(SUMMARY_METRICS, 0)
+        self.error: Optional[str] = None
+        # Per chunk in input order: input name, lines done once written, partitions left
+        self._chunks: Dict[int, List[Any]] = {}
+        self._next_chunk = 0
+
+    def run(self, names: Sequence[str]) -> None:
+        try:
+            for name in names:
+                if not self._read(name):
+                    break
+            self._collect(self.pool.results(wait=True))
+        finally:
+            self.pool.close()
+            self.checkpoint.save()
+
+    def _read(self, name: str) -> bool:
+        """Submit the chunks of one input, returning False once a chunk has failed."""
+        done = self.checkpoint.done(name)
+        source = open_source(name)
+        try:
+            lines = itertools.islice(source, done, None)
+            while self.error is None:
+                chunk_lines = list(itertools.islice(lines, self.chunk_lines))
+                if not chunk_lines:
+                    break
+                done += len(chunk_lines)
+                self.lines += len(chunk_lines)
+                records = [record for line in chunk_lines for record in parse_line(line, self.line_format)]
+                self._submit(name, done, records)
+                self._collect(self.pool.results())
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        return self.error is None
+
+    def _submit(self, name: str, done: int, records: List[Dict[str, Any]]) -> None:
+        chunk = self._next_chunk
+        self._next_chunk += 1
+        partitions = self.partitioner.split(records)
+        self._chunks[chunk] = [name, done, len(partitions)]
+        if not partitions:
+            self._advance()
+        for partition, partition_records in partitions.items():
+            self.pool.submit(partition, chunk, partition_records)
+
+    def _collect(self, results: List[Result]) -> None:
+        for chunk, metrics, error in results:
+            if error is not None:
+                if self.error is None:
+                    self.error = error
+                    log.error("Replay chunk failed", chunk=chunk, error=error)
+                continue
+            for name, value in (metrics or {}).items():
+                self.totals[name] = self.totals.get(name, 0) + value
+            self._chunks[chunk][2] -= 1
+        self._advance()
+
+    def _advance(self) -> None:
+        """Move the checkpoint to the end of the written chunks that precede any unwritten one."""
+        while self._chunks:
+            first = min(self._chunks)
+            name, done, left = self._chunks[first]
+            if left:
+                return
+            del self._chunks[first]
+            self.checkpoint.advance(name, done)
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        return dict(
+            {"lines": self.lines, "seconds": round(seconds, 3), "error": self.error},
+            **{name: int(value) for name, value in self.totals.items()},
+        )
+
+
+def main(argv: Optional[List[str]] = None, write: Writer = write_records) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m lambda_sns_cloudwatch_logs.replay", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("files", nargs="*", default=[STDIN], help="JSON Lines inputs, .gz for gzip; - for stdin")
+    parser.add_argument("--format", choices=FORMATS, default=FORMAT_AUTO, help="how lines are read (default: auto)")
+    parser.add_argument("--timestamp", choices=EVENT_TIMESTAMPS, default=EVENT_TIMESTAMP_SNS,
+                        help="event time: the SNS Timestamp or the time of writing (default: sns)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes writing in parallel (default: one per CPU)")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES,
+                        help="input lines handed to the workers at a time (default: %(default)s)")
+    parser.add_argument("--checkpoint", help="JSON file recording the progress to resume from")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_lines < 1:
+        parser.error("--workers and --chunk-lines must be at least 1")
+
+    # Read by the worker processes as well; the handler's batch mode pipeline
+    # writes the events itself rather than through a flusher extension
+    os.environ["WRITER_MODE"] = WRITER_MODE_BATCH
+    os.environ["EVENT_TIMESTAMP"] = args.timestamp
+    os.environ["BACKGROUND_FLUSH"] = "false"
+    try:
+        config = Config.from_env()
+    except ValueError as err:
+        parser.error(str(err))
+
+    pool = InlinePool(write) if args.workers == 1 else ProcessPool(args.workers, write)
+    replay = Replay(Partitioner(config, args.workers), pool, Checkpoint(args.checkpoint), args.chunk_lines, args.format)
+    started = time.perf_counter()
+    try:
+        replay.run(args.files)
+    except (OSError, RuntimeError) as err:
+        replay.error = replay.error or str(err)
+    print(json.dumps(replay.summary(time.perf_counter() - started)))
+    return 1 if replay.error else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Route SNS messages to log groups based on topic, subject and message attributes.
+
+A routing table is a JSON list of routes, for example::
+
+    [
+        {"attributes": {"service": "billing"}, "log_group": "/app/billing"},
+        {"topic_arn": "arn:aws:sns:*:*:alerts-*", "log_group": "/app/alerts",
+         "log_stream_format": "%Y-%m-%d"}
+    ]
+
+``topic_arn`` and ``subject`` are shell-style patterns (``*``, ``?``, ``[...]``)
+and ``attributes`` maps MessageAttribute names to exact values. Every condition
+given must match. Routes are tried in order and the first match wins; messages
+matching no route go to the default log group.
+"""
+
+import dataclasses
+import fnmatch
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+Matcher = Callable[[str], Any]
+
+ROUTE_KEYS = frozenset(("log_group", "log_stream_format", "topic_arn", "subject", "attributes"))
+
+
+class RoutingError(ValueError):
+    """The routing table is not valid."""
+
+
+def compile_pattern(pattern: str) -> Matcher:
+    """Compile a pattern once into a matcher, using plain equality when it has no wildcards."""
+    if not any(char in pattern for char in "*?["):
+        return pattern.__eq__
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def matches_record(
+    sns: Dict[str, Any],
+    topic_arn: Optional[Matcher],
+    subject: Optional[Matcher],
+    attributes: Tuple[Tuple[str, str], ...],
+) -> bool:
+    """Return whether an SNS record body meets every condition given."""
+    if topic_arn is not None and not topic_arn(sns.get("TopicArn") or ""):
+        return False
+    if subject is not None and not subject(sns.get("Subject") or ""):
+        return False
+    if attributes:
+        message_attributes = sns.get("MessageAttributes") or {}
+        for name, value in attributes:
+            attribute = message_attributes.get(name)
+            if attribute is None or attribute.get("Value") != value:
+                return False
+    return True
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Route:
+    """A destination and the conditions a message must meet to be sent there."""
+
+    log_group: str
+    log_stream_format: Optional[str] = None
+    topic_arn: Optional[Matcher] = dataclasses.field(default=None, compare=False)
+    subject: Optional[Matcher] = dataclasses.field(default=None, compare=False)
+    attributes: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "Route":
+        """Build a route from its JSON form, compiling its patterns."""
+        if not isinstance(spec, dict):
+            raise RoutingError(f"Route must be an object, got {spec!r}")
+        unknown = set(spec) - ROUTE_KEYS
+        if unknown:
+            raise RoutingError(f"Unknown route keys {sorted(unknown)}")
+        if not isinstance(spec.get("log_group"), str) or not spec["log_group"]:
+            raise RoutingError(f"Route is missing log_group: {spec!r}")
+        attributes = spec.get("attributes") or {}
+        if not isinstance(attributes, dict):
+            raise RoutingError(f"Route attributes must be an object: {spec!r}")
+        return cls(
+            log_group=spec["log_group"],
+            log_stream_format=spec.get("log_stream_format") or None,
+            topic_arn=compile_pattern(spec["topic_arn"]) if spec.get("topic_arn") else None,
+            subject=compile_pattern(spec["subject"]) if spec.get("subject") else None,
+            attributes=tuple((str(name), str(value)) for name, value in attributes.items()),
+        )
+
+    def matches(self, sns: Dict[str, Any]) -> bool:
+        """Return whether an SNS record body meets every condition of this route."""
+        return matches_record(sns, self.topic_arn, self.subject, self.attributes)
+
+
+def parse_routes(document: str) -> Tuple[Route, ...]:
+    """Parse and compile a JSON routing table."""
+    try:
+        specs = json.loads(document)
+    except json.JSONDecodeError as err:
+        raise RoutingError(f"Routing table is not valid JSON: {err}") from err
+    if not isinstance(specs, list):
+        raise RoutingError("Routing table must be a JSON list of routes")
+    return tuple(Route.from_dict(spec) for spec in specs)
+
+
+def load_routes(table: Optional[str], path: Optional[str]) -> Tuple[Route, ...]:
+    """Load routes from an inline JSON table and/or a JSON file, inline routes first."""
+    routes: Tuple[Route, ...] = ()
+    if table:
+        routes += parse_routes(table)
+    if path:
+        try:
+            with open(path, encoding="utf-8") as routing_file:
+                routes += parse_routes(routing_file.read())
+        except OSError as err:
+            raise RoutingError(f"Cannot read routing table {path}: {err}") from err
+    return routes
+
+
+def match_route(routes: Iterable[Route], sns: Dict[str, Any]) -> Optional[Route]:
+    """Return the first route matching an SNS record body, if any."""
+    for route in routes:
+        if route.matches(sns):
+            return route
+    return None
@@ -0,0 +1,243 @@
+"""Drop, sample, redact and truncate messages before they are written.
+
+A rule list is JSON, for example::
+
+    [
+        {"json": {"level": "debug"}, "action": "drop"},
+        {"topic_arn": "arn:aws:sns:*:*:chatty-*", "action": "sample", "rate": 0.1},
+        {"action": "redact", "fields": ["password", "user.token"], "patterns": ["\\\\d{16}"]},
+        {"subject": "TRACE*", "action": "truncate", "max_bytes": 2048}
+    ]
+
+``topic_arn``, ``subject`` and ``attributes`` match as in the routing table.
+``json`` maps dotted paths in a JSON message body to shell-style patterns of
+their values; a message that is not a JSON object never matches it. Every
+condition given must match.
+
+Every matching rule applies, in order, until one drops the message:
+
+- ``drop``: the message is not written.
+- ``sample``: a ``rate`` share of the messages is kept. The choice follows
+  the MessageId, so a redelivered message gets the same one.
+- ``redact``: the values of ``fields`` in a JSON body, and the text matching
+  any of ``patterns``, are replaced with ``[REDACTED]``.
+- ``truncate``: the message is cut to ``max_bytes``, ending in ``...``.
+
+Rules are compiled once at cold start. A record only pays for the conditions
+it is checked against, and the body is parsed as JSON at most once, when a
+rule needs it.
+"""
+
+import dataclasses
+import json
+import random
+import re
+import zlib
+from typing import Any, Dict, Iterable, Optional, Pattern, Tuple
+
+from lambda_sns_cloudwatch_logs.routing import Matcher, compile_pattern, matches_record
+
+RULE_DROP = "drop"
+RULE_SAMPLE = "sample"
+RULE_REDACT = "redact"
+RULE_TRUNCATE = "truncate"
+RULE_ACTIONS = (RULE_DROP, RULE_SAMPLE, RULE_REDACT, RULE_TRUNCATE)
+
+RULE_KEYS = frozenset((
+    "action", "topic_arn", "subject", "attributes", "json", "rate", "fields", "patterns", "max_bytes",
+))
+
+REDACTED = "[REDACTED]"
+TRUNCATED_SUFFIX = "..."
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+# Stands for a body that has not been parsed yet
+_UNPARSED = object()
+_HASH_RANGE = 2 ** 32
+
+
+class RuleError(ValueError):
+    """The rule list is not valid."""
+
+
+def _path(path: Any) -> Tuple[str, ...]:
+    if not isinstance(path, str) or not path:
+        raise RuleError(f"Rule path must be a non-empty string, got {path!r}")
+    return tuple(path.split("."))
+
+
+def _lookup(document: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(document, dict):
+            return _UNPARSED
+        document = document.get(key, _UNPARSED)
+    return document
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else _encode(value)
+
+
+def _parse(message: str) -> Any:
+    if message.lstrip()[:1] != "{":
+        return None
+    try:
+        return json.loads(message)
+    except ValueError:
+        return None
+
+
+def _sampled(sns: Dict[str, Any], rate: float) -> bool:
+    """Return whether a message is kept at ``rate``, the same way for every delivery of it."""
+    message_id = sns.get("MessageId")
+    if not message_id:
+        return random.random() < rate
+    return zlib.crc32(message_id.encode("utf-8")) < rate * _HASH_RANGE
+
+
+def truncate(message: str, max_bytes: int) -> str:
+    """Cut a message to at most ``max_bytes`` UTF-8 bytes, marking the cut."""
+    data = message.encode("utf-8")
+    if len(data) <= max_bytes:
+        return message
+    keep = max(max_bytes - len(TRUNCATED_SUFFIX), 0)
+    return data[:keep].decode("utf-8", "ignore") + TRUNCATED_SUFFIX
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Rule:
+    """An action and the conditions a message must meet for it to apply."""
+
+    action: str
+    topic_arn: Optional[Matcher] = dataclasses.field(default=None, compare=False)
+    subject: Optional[Matcher] = dataclasses.field(default=None, compare=False)
+    attributes: Tuple[Tuple[str, str], ...] = ()
+    json: Tuple[Tuple[Tuple[str, ...], Matcher], ...] = dataclasses.field(default=(), compare=False)
+    rate: float = 1.0
+    fields: Tuple[Tuple[str, ...], ...] = ()
+    pattern: Optional[Pattern[str]] = None
+    max_bytes: int = 0
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "Rule":
+        """Build a rule from its JSON form, compiling its patterns."""
+        if not isinstance(spec, dict):
+            raise RuleError(f"Rule must be an object, got {spec!r}")
+        # Terraform sends unset optional attributes as null
+        spec = {key: value for key, value in spec.items() if value is not None}
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise RuleError(f"Unknown rule keys {sorted(unknown)}")
+        action = spec.get("action")
+        if action not in RULE_ACTIONS:
+            raise RuleError(f"Rule action must be one of {RULE_ACTIONS}: {spec!r}")
+        attributes = spec.get("attributes") or {}
+        conditions = spec.get("json") or {}
+        if not isinstance(attributes, dict) or not isinstance(conditions, dict):
+            raise RuleError(f"Rule attributes and json must be objects: {spec!r}")
+
+        rate = spec.get("rate", 1.0 if action != RULE_SAMPLE else None)
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+            raise RuleError(f"Sample rule needs a rate between 0 and 1: {spec!r}")
+        fields = tuple(_path(field) for field in spec.get("fields") or ())
+        patterns = spec.get("patterns") or ()
+        if action == RULE_REDACT and not (fields or patterns):
+            raise RuleError(f"Redact rule needs fields or patterns: {spec!r}")
+        try:
+            pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        except (re.error, TypeError) as err:
+            raise RuleError(f"Invalid redact pattern in {spec!r}: {err}") from err
+        max_bytes = spec.get("max_bytes", 0)
+        if action == RULE_TRUNCATE and (not isinstance(max_bytes, int) or max_bytes <= len(TRUNCATED_SUFFIX)):
+            raise RuleError(f"Truncate rule needs max_bytes over {len(TRUNCATED_SUFFIX)}: {spec!r}")
+
+        return cls(
+            action=action,
+            topic_arn=compile_pattern(spec["topic_arn"]) if spec.get("topic_arn") else None,
+            subject=compile_pattern(spec["subject"]) if spec.get("subject") else None,
+            attributes=tuple((str(name), str(value)) for name, value in attributes.items()),
+            json=tuple((_path(path), compile_pattern(_text(value))) for path, value in conditions.items()),
+            rate=float(rate),
+            fields=fields,
+            pattern=pattern,
+            max_bytes=max_bytes,
+        )
+
+    def matches_json(self, document: Any) -> bool:
+        for path, matcher in self.json:
+            value = _lookup(document, path)
+            if value is _UNPARSED or not matcher(_text(value)):
+                return False
+        return True
+
+
+def _redact_fields(document: Any, fields: Iterable[Tuple[str, ...]]) -> bool:
+    """Replace the values at ``fields`` in a parsed body, returning whether any was found."""
+    found = False
+    for path in fields:
+        parent = _lookup(document, path[:-1])
+        if isinstance(parent, dict) and path[-1] in parent:
+            parent[path[-1]] = REDACTED
+            found = True
+    return found
+
+
+def apply_rules(rules: Iterable[Rule], sns: Dict[str, Any]) -> Optional[str]:
+    """Return the message to write for an SNS record body, or None to drop it."""
+    message: str = sns["Message"]
+    document: Any = _UNPARSED
+    for rule in rules:
+        if not matches_record(sns, rule.topic_arn, rule.subject, rule.attributes):
+            continue
+        if rule.json:
+            if document is _UNPARSED:
+                document = _parse(message)
+            if not rule.matches_json(document):
+                continue
+
+        action = rule.action
+        if action == RULE_DROP:
+            return None
+        if action == RULE_SAMPLE:
+            if not _sampled(sns, rule.rate):
+                return None
+        elif action == RULE_REDACT:
+            if rule.fields:
+                if document is _UNPARSED:
+                    document = _parse(message)
+                if _redact_fields(document, rule.fields):
+                    message = _encode(document)
+            if rule.pattern is not None:
+                redacted = rule.pattern.sub(REDACTED, message)
+                if redacted != message:
+                    message, document = redacted, _UNPARSED
+        elif action == RULE_TRUNCATE:
+            truncated = truncate(message, rule.max_bytes)
+            if truncated is not message:
+                message, document = truncated, _UNPARSED
+    return message
+
+
+def parse_rules(document: str) -> Tuple[Rule, ...]:
+    """Parse and compile a JSON rule list."""
+    try:
+        specs = json.loads(document)
+    except json.JSONDecodeError as err:
+        raise RuleError(f"Filter rules are not valid JSON: {err}") from err
+    if not isinstance(specs, list):
+        raise RuleError("Filter rules must be a JSON list of rules")
+    return tuple(Rule.from_dict(spec) for spec in specs)
+
+
+def load_rules(rules: Optional[str], path: Optional[str]) -> Tuple[Rule, ...]:
+    """Load rules from an inline JSON list and/or a JSON file, inline rules first."""
+    loaded: Tuple[Rule, ...] = ()
+    if rules:
+        loaded += parse_rules(rules)
+    if path:
+        try:
+            with open(path, encoding="utf-8") as rules_file:
+                loaded += parse_rules(rules_file.read())
+        except OSError as err:
+            raise RuleError(f"Cannot read filter rules {path}: {err}") from err
+    return loaded
@@ -0,0 +1,75 @@
+"""Spread the events of one log stream over several, to scale past its write limit.
+
+Every instance of the function writes to the stream LOG_STREAM_FORMAT gives
+for the current time, so at high concurrency they all share one stream's
+PutLogEvents throughput. STREAM_SHARDING appends a shard to the stream name:
+
+- ``off`` (default): no shard, ``2025-07-29/0600``.
+- ``instance``: the id of the execution environment, so each instance has a
+  stream of its own: ``2025-07-29/0600/<id>``. The id is the one in the
+  function's own log stream name, which ties the two together.
+- ``message_id``: a hash of the MessageId modulo STREAM_SHARDS, zero padded:
+  ``2025-07-29/0600/03``. The shard count caps the number of streams, but
+  each invocation writes to several of them (batch mode only).
+
+The unsharded name followed by ``/`` is a prefix of exactly its shards, so
+readers reassemble them by prefix, for example with
+``aws logs filter-log-events --log-stream-name-prefix 2025-07-29/0600/``.
+Logs Insights queries a whole log group and orders by ``@timestamp`` anyway.
+"""
+
+import os
+import zlib
+from typing import Mapping, Optional
+
+STREAM_SHARDING_OFF = "off"
+STREAM_SHARDING_INSTANCE = "instance"
+STREAM_SHARDING_MESSAGE_ID = "message_id"
+STREAM_SHARDINGS = (STREAM_SHARDING_OFF, STREAM_SHARDING_INSTANCE, STREAM_SHARDING_MESSAGE_ID)
+DEFAULT_STREAM_SHARDS = 8
+
+SHARD_SEPARATOR = "/"
+
+
+def instance_id(env: Optional[Mapping[str, str]] = None) -> str:
+    """Return an id for this execution environment.
+
+    Lambda names the function's own log stream ``<date>/[<version>]<id>``;
+    outside Lambda a random id is used.
+    """
+    if env is None:
+        env = os.environ
+    _, _, lambda_id = env.get("AWS_LAMBDA_LOG_STREAM_NAME", "").rpartition("]")
+    return lambda_id or os.urandom(16).hex()
+
+
+class StreamSharder:
+    """Add the shard to log stream names, for one STREAM_SHARDING mode."""
+
+    __slots__ = ("mode", "shards", "instance", "_suffix", "_width")
+
+    def __init__(self, mode: str, shards: int = DEFAULT_STREAM_SHARDS, instance: Optional[str] = None) -> None:
+        self.mode = mode
+        self.shards = shards
+        self.instance = instance or instance_id()
+        self._suffix = SHARD_SEPARATOR + self.instance
+        self._width = len(str(shards - 1))
+
+    def shard(self, log_stream: str, message_id: Optional[str] = None) -> str:
+        """Return the name of the shard of ``log_stream`` a message is written to.
+
+        In ``message_id`` mode, messages without a MessageId go to shard 0.
+        """
+        if self.mode == STREAM_SHARDING_INSTANCE:
+            return log_stream + self._suffix
+        shard = zlib.crc32(message_id.encode("utf-8")) % self.shards if message_id else 0
+        return f"{log_stream}{SHARD_SEPARATOR}{shard:0{self._width}d}"
+
+
+def make_sharder(
+    mode: str, shards: int = DEFAULT_STREAM_SHARDS, instance: Optional[str] = None
+) -> Optional[StreamSharder]:
+    """Return the sharder for a STREAM_SHARDING mode, or None when sharding is off."""
+    if mode == STREAM_SHARDING_OFF:
+        return None
+    return StreamSharder(mode, shards, instance)
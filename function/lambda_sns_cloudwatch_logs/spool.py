@@ -0,0 +1,277 @@
+"""Write-ahead spool in ``/tmp`` for events CloudWatch Logs did not accept.
+
+With DEAD_LETTER_TARGET=spool, events still undelivered after
+SPOOL_RETRY_TIME of retries are appended to files under SPOOL_DIR and
+the invocation succeeds, instead of retrying until its timeout and having
+SNS deliver the whole event again. Later invocations of the same instance
+drain the spool alongside their own records. ``/tmp`` outlives a crashed or
+timed out runtime, but not the execution environment: events still spooled
+when Lambda retires the instance are lost, like those written to ``log``.
+
+The spool is a directory of numbered segment files. Each ``send`` appends
+one block, for one log stream::
+
+    >HHI  log group length, log stream length, event count
+          log group, log stream (UTF-8)
+    >qI   per event: timestamp, message length, then the message (UTF-8)
+
+A block cut short by a crash is ignored when read. Segments roll over at
+SEGMENT_BYTES, and once the spool holds more than SPOOL_MAX_BYTES the oldest
+segments are deleted. Drained segments are only deleted once their events
+have been written or spooled again, so a crash in between writes them twice
+rather than losing them.
+
+The handler and the flusher extension run in separate processes and can
+share a spool. Sends and drains hold an exclusive ``flock`` on the
+directory, and a drain renames each segment it takes to
+``<segment>.<pid>``, so that no process appends to a segment once it has
+been drained. Taken segments are read again by the next drain of the same
+process until they are committed, and by any process once their owner has
+exited.
+"""
+
+import contextlib
+import itertools
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent, SizedEvent
+from lambda_sns_cloudwatch_logs.deadline import MIN_CALL_SECONDS
+from lambda_sns_cloudwatch_logs.logger import log
+
+DEFAULT_SPOOL_DIR = "/tmp/sns-cloudwatch-spool"
+DEFAULT_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SPOOL_RETRY_SECONDS = 2.0
+# Largest segment file; the spool is evicted a segment at a time
+SEGMENT_BYTES = 1024 * 1024
+# Most spooled data taken by one invocation, about four PutLogEvents calls
+DRAIN_MAX_BYTES = 4 * 1024 * 1024
+# CloudWatch Logs rejects events older than 14 days; older spooled ones are dropped
+MAX_EVENT_AGE_MS = 14 * 24 * 60 * 60 * 1000
+
+_BLOCK_HEADER = struct.Struct(">HHI")
+_EVENT_HEADER = struct.Struct(">qI")
+_SUFFIX = ".spool"
+# Sequence number, and the pid of the process that drained the segment
+_SEGMENT_NAME = re.compile(r"(\d+)\.spool(?:\.(\d+))?")
+
+# (log group, log stream)
+Destination = Tuple[str, str]
+
+
+def encode_block(log_group: str, log_stream: str, events: List[LogEvent]) -> bytes:
+    """Return the spool block holding ``events`` for one log stream."""
+    group, stream = log_group.encode("utf-8"), log_stream.encode("utf-8")
+    parts = [_BLOCK_HEADER.pack(len(group), len(stream), len(events)), group, stream]
+    for event in events:
+        message = event["message"].encode("utf-8")
+        parts.append(_EVENT_HEADER.pack(event["timestamp"], len(message)))
+        parts.append(message)
+    return b"".join(parts)
+
+
+def decode_blocks(data: bytes) -> List[Tuple[Destination, List[LogEvent]]]:
+    """Return the blocks in ``data``, stopping at a block that was cut short."""
+    blocks = []
+    offset = 0
+    try:
+        while offset < len(data):
+            group_length, stream_length, count = _BLOCK_HEADER.unpack_from(data, offset)
+            offset += _BLOCK_HEADER.size
+            log_group = data[offset:offset + group_length].decode("utf-8")
+            offset += group_length
+            log_stream = data[offset:offset + stream_length].decode("utf-8")
+            offset += stream_length
+            events: List[LogEvent] = []
+            for _ in range(count):
+                timestamp, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                if offset + length > len(data):
+                    raise ValueError("truncated message")
+                events.append(SizedEvent(timestamp=timestamp, message=data[offset:offset + length].decode("utf-8")))
+                offset += length
+            blocks.append(((log_group, log_stream), events))
+    except (struct.error, ValueError):
+        pass
+    return blocks
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Drained:
+    """Events taken from the spool, and the segments to delete once they are written."""
+
+    __slots__ = ("events", "segments", "expired")
+
+    def __init__(self) -> None:
+        self.events: Dict[Destination, List[LogEvent]] = {}
+        self.segments: List[str] = []
+        # Events dropped for being too old to write
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return sum(map(len, self.events.values()))
+
+
+class Spool:
+    """A dead-letter sink that keeps undelivered events on local disk until they can be written."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_SPOOL_DIR,
+        max_bytes: int = DEFAULT_SPOOL_MAX_BYTES,
+        retry_seconds: float = DEFAULT_SPOOL_RETRY_SECONDS,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retry_seconds = retry_seconds
+        self.segment_bytes = min(SEGMENT_BYTES, max(max_bytes // 4, 1))
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Sizes of the segments open for sends, by sequence number, oldest first;
+        # left by an earlier runtime or written by another process too
+        self._segments: Dict[int, int] = {}
+        # Drained segments not committed yet, by sequence number: (owner pid, size)
+        self._taken: Dict[int, Tuple[int, int]] = {}
+        self._scan()
+        # Segment appended to; a drain closes it so its events are not read twice
+        self._current: Optional[int] = None
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the spool against other threads and, with ``flock``, other processes."""
+        # Only imported when the spool is used
+        import fcntl
+
+        with self._lock:
+            directory = os.open(self.directory, os.O_RDONLY)
+            try:
+                fcntl.flock(directory, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the descriptor releases the lock
+                os.close(directory)
+
+    def _scan(self) -> None:
+        """Pick up the segments on disk, including those another process wrote or drained."""
+        segments, taken = {}, {}
+        for name in sorted(os.listdir(self.directory)):
+            match = _SEGMENT_NAME.fullmatch(name)
+            if match is None:
+                continue
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            sequence, owner = int(match.group(1)), match.group(2)
+            if owner is None:
+                segments[sequence] = size
+            else:
+                taken[sequence] = (int(owner), size)
+        self._segments, self._taken = segments, taken
+
+    @property
+    def size(self) -> int:
+        return sum(self._segments.values())
+
+    def _path(self, sequence: int, owner: Optional[int] = None) -> str:
+        name = f"{sequence:012d}{_SUFFIX}" if owner is None else f"{sequence:012d}{_SUFFIX}.{owner}"
+        return os.path.join(self.directory, name)
+
+    def deadline(self, deadline: Optional[float]) -> float:
+        """Return the deadline of a flush, after which its failed events are spooled.
+
+        Every batch gets at least one attempt, then ``retry_seconds`` of retries.
+        """
+        spool_at = time.monotonic() + MIN_CALL_SECONDS + self.retry_seconds
+        return spool_at if deadline is None else min(deadline, spool_at)
+
+    def send(self, log_group: str, log_stream: str, events: List[LogEvent]) -> None:
+        block = encode_block(log_group, log_stream, events)
+        with self._locked():
+            # Another process may have drained the current segment or started a newer one
+            self._scan()
+            if self._current not in self._segments or self._segments[self._current] >= self.segment_bytes:
+                self._current = max(itertools.chain(self._segments, self._taken), default=0) + 1
+                self._segments[self._current] = 0
+            with open(self._path(self._current), "ab") as segment:
+                segment.write(block)
+            self._segments[self._current] += len(block)
+            self._evict()
+
+    def _evict(self) -> None:
+        evicted = 0
+        while self.size > self.max_bytes and len(self._segments) > 1:
+            sequence = next(iter(self._segments))
+            evicted += self._segments.pop(sequence)
+            self._remove(sequence)
+        if evicted:
+            log.warn("Spool full, dropped oldest events", bytes=evicted, max_bytes=self.max_bytes)
+
+    def _remove(self, sequence: int) -> None:
+        try:
+            os.remove(self._path(sequence))
+        except FileNotFoundError:
+            pass
+
+    def drain(self, max_bytes: int = DRAIN_MAX_BYTES, now_millis: Optional[int] = None) -> Drained:
+        """Read the oldest segments, up to about ``max_bytes``, without deleting them."""
+        drained = Drained()
+        if now_millis is None:
+            now_millis = int(time.time() * 1000)
+        oldest = now_millis - MAX_EVENT_AGE_MS
+        pid = os.getpid()
+        with self._locked():
+            self._scan()
+            # Later sends start a new segment
+            self._current = None
+            # Segments drained before and not committed, by this process or one that has exited
+            segments: Dict[int, Tuple[Optional[int], int]] = {
+                sequence: (owner, size)
+                for sequence, (owner, size) in self._taken.items()
+                if owner == pid or not _is_running(owner)
+            }
+            segments.update((sequence, (None, size)) for sequence, size in self._segments.items())
+            taken = 0
+            for sequence in sorted(segments):
+                owner, size = segments[sequence]
+                if drained.segments and taken + size > max_bytes:
+                    break
+                path = self._path(sequence, pid)
+                try:
+                    # Sends never append to a segment once it is renamed
+                    os.rename(self._path(sequence, owner), path)
+                    with open(path, "rb") as segment:
+                        data = segment.read()
+                except FileNotFoundError:
+                    continue
+                self._segments.pop(sequence, None)
+                for destination, events in decode_blocks(data):
+                    fresh = [event for event in events if event["timestamp"] >= oldest]
+                    drained.expired += len(events) - len(fresh)
+                    if fresh:
+                        drained.events.setdefault(destination, []).extend(fresh)
+                drained.segments.append(path)
+                taken += size
+        return drained
+
+    def commit(self, drained: Drained) -> None:
+        """Delete drained segments whose events have been written or spooled again."""
+        with self._lock:
+            for path in drained.segments:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
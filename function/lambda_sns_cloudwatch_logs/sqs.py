@@ -0,0 +1,52 @@
+"""SNS messages delivered in batches through an SQS queue.
+
+With the topic subscribed to a queue and the queue as the function's event
+source (``sqs_batching``), each invocation gets up to the configured batch
+size of messages instead of one. Each SQS record's body is the SNS envelope,
+which is unwrapped into the same ``Sns`` mapping an SNS record carries, so
+routing, compaction and JSON formatting work unchanged. A body that is not
+an envelope (raw message delivery) is taken as the message itself.
+
+The handler answers SQS invocations with ``batchItemFailures``: the SQS
+messages written to a destination that failed are retried on their own,
+and the rest of the batch is deleted from the queue.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+SQS_EVENT_SOURCE = "aws:sqs"
+# Key of the unwrapped message holding the SQS messageId it came in
+SQS_MESSAGE_ID = "SqsMessageId"
+
+
+def is_sqs_record(record: Any) -> bool:
+    return isinstance(record, dict) and record.get("eventSource") == SQS_EVENT_SOURCE
+
+
+def is_sqs_event(event: Any) -> bool:
+    """Return whether ``event`` was delivered by an SQS event source mapping."""
+    records = event.get("Records") if isinstance(event, dict) else None
+    return bool(records) and isinstance(records, list) and is_sqs_record(records[0])
+
+
+def unwrap(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the SNS message carried by an SQS record, or None if it has no body."""
+    body = record.get("body")
+    if not isinstance(body, str):
+        return None
+    sns = None
+    if body[:1] == "{":
+        try:
+            sns = json.loads(body)
+        except ValueError:
+            pass
+    if not isinstance(sns, dict) or sns.get("Type") != "Notification" or not isinstance(sns.get("Message"), str):
+        sns = {"Message": body, "MessageId": record.get("messageId")}
+    sns[SQS_MESSAGE_ID] = record.get("messageId")
+    return sns
+
+
+def batch_item_failures(message_ids: Iterable[str]) -> Dict[str, List[Dict[str, str]]]:
+    """Return the partial batch response asking SQS to retry ``message_ids``."""
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in message_ids]}
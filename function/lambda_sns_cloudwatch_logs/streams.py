@@ -0,0 +1,85 @@
+"""Log groups and streams known to exist, shared by the invocations of an instance.
+
+CreateLogGroup, CreateLogStream and DescribeLogGroups have much lower rate
+limits than PutLogEvents. Once a write, a creation or a
+ResourceAlreadyExistsException shows that a stream (or group) exists, it is
+remembered for STREAM_CACHE_TTL seconds (0 turns the cache off) and not
+created or looked up again in that time. A stream deleted in the meantime
+is still handled: its next write fails with ResourceNotFoundException, which
+drops it from the cache and creates it again.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+DEFAULT_STREAM_CACHE_TTL_SECONDS = 3600
+# Entries kept at most; the oldest are dropped first
+DEFAULT_STREAM_CACHE_SIZE = 1024
+
+# Stream name of the entry recording that a log group exists
+_GROUP = ""
+
+
+class StreamCache:
+    """``(log group, log stream)`` pairs known to exist, each forgotten after ``ttl`` seconds.
+
+    Flush threads update the cache concurrently, so changes hold a lock.
+    """
+
+    __slots__ = ("ttl", "max_size", "clock", "_expiry", "_lock")
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_STREAM_CACHE_TTL_SECONDS,
+        max_size: int = DEFAULT_STREAM_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._expiry: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def has_stream(self, log_group: str, log_stream: str) -> bool:
+        return self._get((log_group, log_stream))
+
+    def has_group(self, log_group: str) -> bool:
+        return self._get((log_group, _GROUP))
+
+    def add_stream(self, log_group: str, log_stream: str) -> None:
+        """Remember a stream, and so its group, as existing."""
+        self._add((log_group, log_stream), (log_group, _GROUP))
+
+    def add_group(self, log_group: str) -> None:
+        self._add((log_group, _GROUP))
+
+    def discard_stream(self, log_group: str, log_stream: str) -> None:
+        """Forget a stream that turned out not to exist, and its group with it."""
+        with self._lock:
+            self._expiry.pop((log_group, log_stream), None)
+            self._expiry.pop((log_group, _GROUP), None)
+
+    def _get(self, key: Tuple[str, str]) -> bool:
+        expiry = self._expiry.get(key)
+        return expiry is not None and expiry > self.clock()
+
+    def _add(self, *keys: Tuple[str, str]) -> None:
+        if self.ttl <= 0:
+            return
+        now = self.clock()
+        expiry = now + self.ttl
+        with self._lock:
+            entries = self._expiry
+            for key in keys:
+                # Re-insert so the dict stays ordered from oldest to newest
+                entries.pop(key, None)
+                entries[key] = expiry
+            if len(entries) > self.max_size:
+                for key in [key for key, expires in entries.items() if expires <= now]:
+                    del entries[key]
+                while len(entries) > self.max_size:
+                    del entries[next(iter(entries))]
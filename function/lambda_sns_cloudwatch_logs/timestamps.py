@@ -0,0 +1,27 @@
+"""Convert SNS notification timestamps for use as CloudWatch event times."""
+
+import datetime
+from typing import Any, Optional
+
+
+def parse_sns_timestamp(value: Any) -> Optional[datetime.datetime]:
+    """Return an SNS ``Timestamp`` as an aware UTC datetime.
+
+    SNS sends ISO 8601 strings such as ``2023-01-01T00:00:00.000Z``. None is
+    returned for missing or unparseable values so callers can fall back to the
+    ingestion time.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def to_epoch_millis(value: datetime.datetime) -> int:
+    """Return a datetime as milliseconds since the epoch, as PutLogEvents expects."""
+    return int(value.timestamp() * 1000)
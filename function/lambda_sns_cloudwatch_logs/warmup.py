@@ -0,0 +1,29 @@
+"""Warmer pings and init-phase priming.
+
+The optional warmer rule (``create_warmer_event``) invokes the function every
+15 minutes with ``{"Records": [{"EventSource": "aws:events"}]}``. The handler
+recognizes that event, and a plain EventBridge scheduled event, and returns
+before doing any work.
+
+Keeping an instance warm only pays off if the cold start also did the setup
+the first message would otherwise wait for. With PREWARM (the default), the
+init phase creates the CloudWatch Logs client, opens its HTTPS connection and
+makes sure the default log group and current log stream exist.
+"""
+
+from typing import Any
+
+WARMER_EVENT_SOURCE = "aws:events"
+SCHEDULED_EVENT_SOURCE = "aws.events"
+
+
+def is_warmer_ping(event: Any) -> bool:
+    """Return whether ``event`` is a warmer ping rather than a delivery."""
+    if not isinstance(event, dict):
+        return False
+    if event.get("source") == SCHEDULED_EVENT_SOURCE:
+        return True
+    records = event.get("Records")
+    if not isinstance(records, list) or not records:
+        return False
+    return all(isinstance(record, dict) and record.get("EventSource") == WARMER_EVENT_SOURCE for record in records)
@@ -0,0 +1,214 @@
+"""Write log events directly to CloudWatch Logs with batched PutLogEvents calls."""
+
+import dataclasses
+import random
+import time
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from lambda_sns_cloudwatch_logs.batch import LogEvent, build_batches, event_size
+from lambda_sns_cloudwatch_logs.deadline import MIN_CALL_SECONDS, DeadlineExceeded, remaining
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.streams import StreamCache
+
+# Errors worth retrying: the request may succeed if it is sent again later
+RETRYABLE_ERROR_CODES = frozenset((
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "InternalFailure",
+    "InternalServerError",
+    "RequestTimeout",
+))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 0.1
+BACKOFF_MAX_SECONDS = 2.0
+
+
+def _error_code(err: Exception) -> str:
+    """Return the error code of a botocore ClientError, or "" for any other exception."""
+    # Read from the response rather than checked with isinstance, so that
+    # botocore is only imported by the client, on first use
+    response = getattr(err, "response", None)
+    if not isinstance(response, dict):
+        return ""
+    return response.get("Error", {}).get("Code", "")
+
+
+def _is_retryable(err: Exception) -> bool:
+    code = _error_code(err)
+    if code:
+        return code in RETRYABLE_ERROR_CODES
+    # Already loaded by the client that raised the error
+    from botocore.exceptions import ConnectionError as BotoConnectionError
+    from botocore.exceptions import HTTPClientError
+
+    return isinstance(err, (BotoConnectionError, HTTPClientError))
+
+
+def _rejected_events(batch: List[LogEvent], info: dict) -> List[LogEvent]:
+    """Return the events of a batch that PutLogEvents reported as rejected."""
+    old_end = max(info.get("tooOldLogEventEndIndex", 0), info.get("expiredLogEventEndIndex", 0))
+    new_start = info.get("tooNewLogEventStartIndex", len(batch))
+    return batch[:old_end] + batch[max(new_start, old_end):]
+
+
+@dataclasses.dataclass(slots=True)
+class WriteResult:
+    """Outcome of writing events to one log stream."""
+
+    calls: int = 0
+    # Calls that were retries of a failed call
+    retries: int = 0
+    # Size of the events delivered, as counted against the batch limit
+    bytes: int = 0
+    # Wall and CPU seconds spent packing the events into batches
+    build_time: Tuple[float, float] = (0.0, 0.0)
+    # Events CloudWatch refused for good (too old, too new or expired); logged and dropped
+    rejected: int = 0
+    # Events that were not delivered, with the last error seen for them
+    failed: List[LogEvent] = dataclasses.field(default_factory=list)
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class BatchWriter:
+    """Deliver events to a single log stream, creating the stream on demand.
+
+    Batches that fail with a throttling or transient error are retried on
+    their own with jittered exponential backoff, for as long as ``deadline``
+    (a ``time.monotonic()`` value) allows. No call is started without
+    MIN_CALL_SECONDS left, so batches that would not finish in time are
+    handed back rather than cut off mid-request. Events in batches that still
+    fail are returned in the WriteResult instead of being raised, so that the
+    batches already written are not sent again. Events CloudWatch rejects as
+    too old, too new or expired would be rejected again on every retry, so
+    they are only logged and counted.
+
+    ``streams`` shares what is known about existing streams across writers,
+    so that a stream is only created or checked once per instance.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        log_group: str,
+        log_stream: str,
+        sleep: Callable[[float], None] = time.sleep,
+        streams: Optional[StreamCache] = None,
+    ) -> None:
+        self.client = client
+        self.log_group = log_group
+        self.log_stream = log_stream
+        self.sleep = sleep
+        self.streams = streams
+
+    def write(self, events: Iterable[LogEvent], deadline: Optional[float] = None) -> WriteResult:
+        """Send all events, returning the calls made and any undelivered events."""
+        result = WriteResult()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        batches = list(build_batches(events))
+        result.build_time = (time.perf_counter() - wall, time.thread_time() - cpu)
+        for batch in batches:
+            self._put_with_retries(batch, deadline, result)
+        return result
+
+    def ensure_stream(self) -> None:
+        """Create the log stream, and its log group, if they do not exist yet."""
+        if self.streams is not None and self.streams.has_stream(self.log_group, self.log_stream):
+            return
+        self._create_stream()
+
+    def _put_with_retries(self, batch: List[LogEvent], deadline: Optional[float], result: WriteResult) -> None:
+        for attempt in range(MAX_ATTEMPTS):
+            if remaining(deadline) < MIN_CALL_SECONDS:
+                result.failed.extend(batch)
+                result.error = result.error or DeadlineExceeded(
+                    f"Not enough time left to write to {self.log_group}:{self.log_stream}"
+                )
+                return
+            result.calls += 1
+            try:
+                rejected = self._put(batch)
+            except Exception as err:
+                if not _is_retryable(err) or attempt + 1 == MAX_ATTEMPTS:
+                    result.failed.extend(batch)
+                    result.error = err
+                    return
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+                if remaining(deadline) < delay + MIN_CALL_SECONDS:
+                    result.failed.extend(batch)
+                    result.error = err
+                    return
+                log.info(
+                    "Retrying PutLogEvents",
+                    log_group=self.log_group,
+                    log_stream=self.log_stream,
+                    attempt=attempt + 1,
+                    error=str(err),
+                )
+                result.retries += 1
+                self.sleep(delay)
+            else:
+                result.rejected += len(rejected)
+                result.bytes += sum(map(event_size, batch)) - sum(map(event_size, rejected))
+                return
+
+    def _put(self, batch: List[LogEvent]) -> List[LogEvent]:
+        try:
+            return self._put_log_events(batch)
+        except Exception as err:
+            if _error_code(err) != "ResourceNotFoundException":
+                raise
+            # First write to this stream (or group): create it and try once more
+            if self.streams is not None:
+                self.streams.discard_stream(self.log_group, self.log_stream)
+            self._create_stream()
+            return self._put_log_events(batch)
+
+    def _put_log_events(self, batch: List[LogEvent]) -> List[LogEvent]:
+        response = self.client.put_log_events(
+            logGroupName=self.log_group,
+            logStreamName=self.log_stream,
+            logEvents=batch,
+        )
+        if self.streams is not None and not self.streams.has_stream(self.log_group, self.log_stream):
+            self.streams.add_stream(self.log_group, self.log_stream)
+        rejected = response.get("rejectedLogEventsInfo")
+        if not rejected:
+            return []
+        log.warn(
+            "CloudWatch rejected log events",
+            log_group=self.log_group,
+            log_stream=self.log_stream,
+            rejected=rejected,
+        )
+        return _rejected_events(batch, rejected)
+
+    def _create_stream(self) -> None:
+        try:
+            self.client.create_log_stream(
+                logGroupName=self.log_group, logStreamName=self.log_stream
+            )
+        except Exception as err:
+            code = _error_code(err)
+            if code == "ResourceNotFoundException":
+                # The log group is missing as well
+                self._create_group()
+                self.client.create_log_stream(
+                    logGroupName=self.log_group, logStreamName=self.log_stream
+                )
+            elif code != "ResourceAlreadyExistsException":
+                raise
+        if self.streams is not None:
+            self.streams.add_stream(self.log_group, self.log_stream)
+
+    def _create_group(self) -> None:
+        try:
+            self.client.create_log_group(logGroupName=self.log_group)
+        except Exception as err:
+            if _error_code(err) != "ResourceAlreadyExistsException":
+                raise
+        if self.streams is not None:
+            self.streams.add_group(self.log_group)
@@ -1,66 +1,558 @@
 """Write log entries to cloudwatch logs."""
 
 import logging
-from typing import Any, Dict
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
-import environs
-import structlog
-import watchtower
 import datetime
-import pytz
 
-env = environs.Env()
-log = structlog.stdlib.get_logger()
+from lambda_sns_cloudwatch_logs.batch import LogEvent, SizedEvent, message_size
+from lambda_sns_cloudwatch_logs.client import make_logs_client
+from lambda_sns_cloudwatch_logs.compaction import COMPACTION_OFF, Compactor, SeenMessageIds
+from lambda_sns_cloudwatch_logs.config import WRITER_MODE_BATCH, Config
+from lambda_sns_cloudwatch_logs.deadline import LOW_TIME_SECONDS, from_context, remaining
+from lambda_sns_cloudwatch_logs.deadletter import DeadLetterSink, make_sink
+from lambda_sns_cloudwatch_logs.enrich import to_json
+from lambda_sns_cloudwatch_logs.flush import FlushError, flush
+from lambda_sns_cloudwatch_logs.handoff import Handoff
+from lambda_sns_cloudwatch_logs.logger import log
+from lambda_sns_cloudwatch_logs.metrics import Metrics, topic_name
+from lambda_sns_cloudwatch_logs.oversize import OversizeHandler, make_store
+from lambda_sns_cloudwatch_logs.profiling import (
+    NULL_PROFILER,
+    STAGE_CONFIG,
+    STAGE_ENCODE,
+    STAGE_FLUSH,
+    STAGE_PARSE,
+    Profiler,
+)
+from lambda_sns_cloudwatch_logs.records import (
+    SKIP_MISSING_EVENT_SOURCE,
+    SKIP_MISSING_MESSAGE,
+    SKIP_NON_SNS,
+    SkippedRecords,
+    summarize,
+)
+from lambda_sns_cloudwatch_logs.routing import match_route
+from lambda_sns_cloudwatch_logs.rules import apply_rules
+from lambda_sns_cloudwatch_logs.sqs import (
+    SQS_MESSAGE_ID,
+    batch_item_failures,
+    is_sqs_event,
+    is_sqs_record,
+    unwrap,
+)
+from lambda_sns_cloudwatch_logs.sharding import StreamSharder, make_sharder
+from lambda_sns_cloudwatch_logs.spool import Spool
+from lambda_sns_cloudwatch_logs.streams import StreamCache
+from lambda_sns_cloudwatch_logs.timestamps import parse_sns_timestamp, to_epoch_millis
+from lambda_sns_cloudwatch_logs.warmup import is_warmer_ping
+from lambda_sns_cloudwatch_logs.writer import BatchWriter
 
+# boto3 and watchtower take longer to import than everything else together, so
+# they are only imported by the code paths that use them
+if TYPE_CHECKING:
+    import watchtower
 
-def handler(event: Dict[str, Any], context: Any) -> None:
+# Configuration and loggers are set up once, at cold start; reset_config()
+# has the next invocation set them up again
+_config: Optional[Config] = None
+_cw_logger: Optional[logging.Logger] = None
+# Pool writing batch mode destinations in parallel; its threads start on demand
+_flush_executor: Optional[ThreadPoolExecutor] = None
+_dead_letter: Optional[DeadLetterSink] = None
+# MessageIds written by recent invocations, for COMPACTION
+_seen_message_ids: Optional[SeenMessageIds] = None
+_oversize: Optional[OversizeHandler] = None
+# Log groups and streams known to exist, for STREAM_CACHE_TTL
+_streams: Optional[StreamCache] = None
+# Adds the shard to log stream names, for STREAM_SHARDING; None when it is off
+_sharder: Optional[StreamSharder] = None
+# Sends events to the flusher extension, for BACKGROUND_FLUSH; None when it is off
+_handoff: Optional[Handoff] = None
+# Invocations handled by this instance, for PROFILE_SAMPLE
+_invocations = 0
+# Whether the client and default log stream have been primed, for PREWARM
+_prewarmed = False
+
+# CloudWatch Logs client shared by both writer modes, built from config.client
+_logs_client: Optional[Any] = None
+
+# CloudWatch writers are reused across warm invocations. Each one owns a
+# background delivery thread, so only the writer for the current (log group,
+# log stream) is kept; it is replaced when the stream rotates.
+_writers: Dict[Tuple[str, str], "watchtower.CloudWatchLogHandler"] = {}
+
+
+def _get_logs_client(config: Config) -> Any:
+    """Return the CloudWatch Logs client shared by all writers, creating it if needed."""
+    global _logs_client
+    if _logs_client is None:
+        _logs_client = make_logs_client(config.client)
+    return _logs_client
+
+
+def _get_writer(
+    cw_logger: logging.Logger, log_group: str, log_stream: str, client: Any
+) -> "watchtower.CloudWatchLogHandler":
+    """Return the cached writer for a log group and stream, creating it if needed."""
+    key = (log_group, log_stream)
+    writer = _writers.get(key)
+    if writer is not None:
+        return writer
+
+    import watchtower
+
+    # Evict writers for previous streams
+    for stale_key in list(_writers):
+        stale = _writers.pop(stale_key)
+        cw_logger.removeHandler(stale)
+        stale.close()
+
+    # watchtower looks the log group up for every new writer unless told it exists
+    known_group = _streams is not None and _streams.has_group(log_group)
+    writer = watchtower.CloudWatchLogHandler(
+        log_group=log_group, stream_name=log_stream, boto3_client=client, create_log_group=not known_group
+    )
+    if _streams is not None:
+        _streams.add_group(log_group)
+    cw_logger.addHandler(writer)
+    _writers[key] = writer
+    return writer
+
+
+def _get_config() -> Config:
+    """Return the configuration, resolving it and configuring logging on first use."""
+    global _config, _cw_logger, _flush_executor, _dead_letter, _seen_message_ids, _oversize, _streams, _logs_client
+    global _sharder, _handoff
+    if _config is not None:
+        return _config
+
+    config = Config.from_env()
     # Debug logging
-    log_level = env.log_level("LOG_LEVEL", logging.INFO)
-    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(log_level))
+    log.set_level(config.log_level)
 
-    cwLogger = logging.getLogger("cloudwatch")
-    cwLogger.setLevel(logging.INFO)
+    cw_logger = logging.getLogger("cloudwatch")
+    cw_logger.setLevel(logging.INFO)
     # Prevent propagation to root logger to avoid double logging
-    cwLogger.propagate = False
-    cloudwatch_log_group = env.str("LOG_GROUP")
-    log_stream_format = env.str("LOG_STREAM_FORMAT", "%Y-%m-%d/%H00")
-    now = datetime.datetime.now(pytz.utc)
-    cloudwatch_log_stream = now.strftime(log_stream_format)
-    cloudwatch_handler = watchtower.CloudWatchLogHandler(
-        log_group=cloudwatch_log_group, stream_name=cloudwatch_log_stream
+    cw_logger.propagate = False
+
+    if _flush_executor is None or _config is None or _config.flush_concurrency != config.flush_concurrency:
+        if _flush_executor is not None:
+            _flush_executor.shutdown(wait=False)
+        _flush_executor = ThreadPoolExecutor(
+            max_workers=config.flush_concurrency, thread_name_prefix="flush"
+        )
+
+    # A client is built on next use; current writers keep the old one
+    _logs_client = None
+    _dead_letter = make_sink(
+        config.dead_letter_target, config.spool_dir, config.spool_max_bytes, config.spool_retry_seconds
     )
-    cwLogger.addHandler(cloudwatch_handler)
+    if _seen_message_ids is None or _config is None or _seen_message_ids.max_size != config.dedupe_cache_size:
+        _seen_message_ids = SeenMessageIds(config.dedupe_cache_size)
+    if _streams is None or _streams.ttl != config.stream_cache_ttl:
+        _streams = StreamCache(config.stream_cache_ttl)
+    # Kept while the settings hold, so an instance keeps writing to the same shard
+    if _sharder is None or (_sharder.mode, _sharder.shards) != (config.stream_sharding, config.stream_shards):
+        _sharder = make_sharder(config.stream_sharding, config.stream_shards)
+    if not config.background_flush:
+        _handoff = None
+    elif _handoff is None or _handoff.port != config.extension_port:
+        _handoff = Handoff(config.extension_port)
+    _oversize = OversizeHandler(config.oversized_messages, make_store(config.offload_bucket, config.offload_prefix))
+    _config, _cw_logger = config, cw_logger
+    return config
 
-    # Process all records in the event
-    if "Records" not in event:
-        log.warn("Unexpected event format - missing Records", lambda_event=event)
+
+def reset_config() -> None:
+    """Have the next invocation read the environment again.
+
+    Lambda sets the environment once, before init; this is for tests and
+    tools that change it afterwards.
+    """
+    global _config
+    _config = None
+
+
+# Resolve configuration at cold start. A missing or invalid setting is raised
+# again on the first invocation, where it is reported against the event.
+try:
+    _get_config()
+except ValueError:
+    pass
+
+
+def _prewarm(config: Config) -> None:
+    """Create the CloudWatch Logs client and the current default log stream ahead of any message.
+
+    The calls open the client's HTTPS connection, which warm invocations then
+    reuse. Failures are only logged: the first write creates what is missing.
+    """
+    global _prewarmed
+    log_stream = datetime.datetime.now(datetime.timezone.utc).strftime(config.log_stream_format)
+    if _sharder is not None:
+        log_stream = _sharder.shard(log_stream)
+    try:
+        client = _get_logs_client(config)
+        if config.writer_mode != WRITER_MODE_BATCH:
+            assert _cw_logger is not None
+            _get_writer(_cw_logger, config.log_group, log_stream, client)
+        BatchWriter(client, config.log_group, log_stream, streams=_streams).ensure_stream()
+    except Exception as err:
+        log.warn("Could not prewarm", log_group=config.log_group, log_stream=log_stream, error=str(err))
         return
+    _prewarmed = True
+
+
+# Prime during the init phase, which runs at full CPU before the first event.
+# Only inside Lambda, so importing the module elsewhere makes no AWS calls.
+if _config is not None and _config.prewarm and "AWS_LAMBDA_FUNCTION_NAME" in os.environ:
+    _prewarm(_config)
+
+
+def _sns_records(records: Any, skipped: Optional[SkippedRecords] = None) -> Iterator[Dict[str, Any]]:
+    """Yield the ``Sns`` body of every valid SNS record, counting the others.
+
+    SQS records yield the SNS message unwrapped from their body instead.
+    Records are checked one at a time as they are consumed and nothing is
+    copied. Only a sample of the skipped records is logged, as summaries;
+    the rest are reported as counts once the records are exhausted.
+    """
+    if skipped is None:
+        skipped = SkippedRecords()
+    for record in records:
+        # SNS message delivered through an SQS queue
+        if is_sqs_record(record):
+            sns = unwrap(record)
+            if sns is None:
+                if skipped.skip(SKIP_MISSING_MESSAGE):
+                    log.warn(SKIP_MISSING_MESSAGE, record=summarize(record))
+                continue
+            yield sns
+            continue
 
-    for record in event["Records"]:
         # Skip records without EventSource
-        if "EventSource" not in record:
-            log.warn("Unexpected record format - missing EventSource", record=record)
+        if not isinstance(record, dict) or "EventSource" not in record:
+            if skipped.skip(SKIP_MISSING_EVENT_SOURCE):
+                log.warn(SKIP_MISSING_EVENT_SOURCE, record=summarize(record))
             continue
 
         # Only process SNS records
         if record["EventSource"] != "aws:sns":
-            log.warn("Skipping non-SNS record", event_source=record["EventSource"], record=record)
+            if skipped.skip(SKIP_NON_SNS):
+                log.warn(SKIP_NON_SNS, event_source=record["EventSource"], record=summarize(record))
             continue
 
-        # Extract and log the SNS message
-        if "Sns" not in record or "Message" not in record.get("Sns", {}):
-            log.warn("Unexpected SNS record format - missing Sns.Message", record=record)
+        # Extract the SNS message
+        sns = record.get("Sns")
+        if not isinstance(sns, dict) or "Message" not in sns:
+            if skipped.skip(SKIP_MISSING_MESSAGE):
+                log.warn(SKIP_MISSING_MESSAGE, record=summarize(record))
             continue
 
-        cwLogger.info(record["Sns"]["Message"])
+        yield sns
 
-    # Flush after processing all records
-    cloudwatch_handler.flush()
+    if skipped.unlogged:
+        log.warn("Skipped more records", skipped=skipped.counts, not_logged=skipped.unlogged)
+
+
+def _profiler(config: Config, started: Tuple[float, float]) -> Profiler:
+    """Return a profiler for one invocation in every PROFILE_SAMPLE, else NULL_PROFILER."""
+    global _invocations
+    sampled = config.profile_sample and _invocations % config.profile_sample == 0
+    _invocations += 1
+    if not sampled:
+        return NULL_PROFILER
+    return Profiler(config.profile_memory, started)
+
+
+def handler(event: Dict[str, Any], context: Any) -> Optional[Dict[str, Any]]:
+    started = (time.perf_counter(), time.process_time())
+    config = _get_config()
+    request_id = getattr(context, "aws_request_id", None)
+    if is_warmer_ping(event):
+        # Prime here instead if the init phase could not
+        if config.prewarm and not _prewarmed:
+            _prewarm(config)
+        log.debug("Warmer ping")
+        if _handoff is not None:
+            _handoff.release(request_id)
+        return None
+    profiler = _profiler(config, started)
+    profiler.lap(STAGE_CONFIG)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    metrics = Metrics(config.log_group)
 
+    try:
+        if config.writer_mode == WRITER_MODE_BATCH:
+            failed = _write_batch(event, config, now, from_context(context), metrics, profiler, request_id)
+        else:
+            _write_watchtower(event, config, now, metrics, profiler)
+            failed = []
+    finally:
+        # The flusher extension waits for every invocation to hand off
+        if _handoff is not None:
+            _handoff.release(request_id)
+        if config.metrics_namespace:
+            metrics.emit(config.metrics_namespace, config.metrics_dimensions)
+        profile = profiler.report()
+        if profile is not None:
+            log.info("Profile", writer_mode=config.writer_mode, **profile)
+
+    # SQS deletes the messages of a batch that are not reported as failed
+    if is_sqs_event(event):
+        return batch_item_failures(failed)
     # Lambda doesn't require a specific return value for asynchronous invocations
     # Returning None indicates successful completion
-    return
+    return None
+
+
+def _write_watchtower(
+    event: Dict[str, Any],
+    config: Config,
+    now: datetime.datetime,
+    metrics: Metrics,
+    profiler: Profiler = NULL_PROFILER,
+) -> None:
+    """Log all SNS messages in the event through the cached watchtower handler."""
+    cwLogger = _cw_logger
+    # Set up by _get_config, which the handler calls first
+    assert cwLogger is not None
+    cloudwatch_log_stream = now.strftime(config.log_stream_format)
+    if _sharder is not None:
+        cloudwatch_log_stream = _sharder.shard(cloudwatch_log_stream)
+    cloudwatch_handler = _get_writer(cwLogger, config.log_group, cloudwatch_log_stream, _get_logs_client(config))
+
+    # Process all records in the event
+    if "Records" not in event:
+        log.warn("Unexpected event format - missing Records", lambda_event=summarize(event))
+        return
+
+    skipped = SkippedRecords()
+    processed = written = 0
+    for sns in _sns_records(event["Records"], skipped):
+        if not processed:
+            metrics.topic = topic_name(sns.get("TopicArn"))
+        processed += 1
+        message = sns["Message"]
+        if config.rules:
+            message = apply_rules(config.rules, sns)
+            if message is None:
+                metrics.add("RecordsFiltered")
+                continue
+        if config.use_json:
+            message = to_json(sns, message=message)
+        written += message_size(message)
+        cwLogger.info(message)
+    metrics.add("RecordsProcessed", processed)
+    metrics.add_skipped(skipped)
+    profiler.lap(STAGE_PARSE)
+
+    # Flush after processing all records
+    started = time.perf_counter()
+    cloudwatch_handler.flush()
+    metrics.add("FlushLatency", (time.perf_counter() - started) * 1000)
+    profiler.lap(STAGE_FLUSH)
+    metrics.add("BytesWritten", written)
+    metrics.add("Destinations")
+
+
+def _write_batch(
+    event: Dict[str, Any],
+    config: Config,
+    now: datetime.datetime,
+    deadline: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+    profiler: Profiler = NULL_PROFILER,
+    request_id: Optional[str] = None,
+) -> List[str]:
+    """Write all SNS messages in the event with direct PutLogEvents calls.
+
+    Each message goes to the log group of the first route it matches, or to
+    LOG_GROUP. Events are stamped with the invocation time, as the watchtower
+    path does, unless the SNS timestamp is used. In that case each event keeps
+    the time SNS accepted the message and is routed to the log stream for that
+    time, so redelivered messages land in the stream they belong to. Each
+    destination stream gets its own bulk write. Failed batches are retried
+    until ``deadline`` and then handed to the dead-letter target, if any.
+    With DEAD_LETTER_TARGET=spool, they are retried for SPOOL_RETRY_TIME
+    only, and events spooled by earlier invocations are written along with
+    this one's; their segments are deleted once written or spooled again.
+
+    FILTER_RULES drop, sample, redact and truncate messages before they are
+    routed; the rest of the pipeline sees the transformed message. With
+    STREAM_SHARDING, the log stream name gets this instance's id or the
+    message's shard appended.
+
+    With BACKGROUND_FLUSH, the events are handed to the flusher extension
+    under ``request_id`` and written by it once the response is sent; they
+    count as written once handed off. Spooled events are then left to the
+    extension too. If the extension does not take them, they are written here.
+
+    With COMPACTION on, redelivered messages are dropped and, in ``content``
+    mode, identical messages for the same stream are written once with their
+    repeat count. MessageIds are remembered only once the write succeeded.
+    With MESSAGE_FORMAT=json the messages are written as JSON documents with
+    their SNS metadata; compaction still compares the bare message bodies.
+
+    Once less than LOW_TIME_SECONDS is left, optional work is skipped so the
+    time goes to writing: later messages are stamped with the invocation time
+    instead of their SNS timestamp and written without their metadata.
+
+    Messages over the CloudWatch event size limit are split, compressed or
+    offloaded on their own (OVERSIZED_MESSAGES), so that one large message
+    never fails the batch it is written in. Counts and timings are added to
+    ``metrics``, and the time taken by each stage to ``profiler``.
+
+    Returns the SQS messageIds of the messages to retry: for an SQS batch, a
+    destination that cannot be written fails only the messages sent to it.
+    """
+    # Set up by _get_config, which the handler calls first
+    assert _seen_message_ids is not None and _oversize is not None
+    if "Records" not in event:
+        log.warn("Unexpected event format - missing Records", lambda_event=summarize(event))
+        return []
+
+    now_millis = to_epoch_millis(now)
+    now_streams: Dict[str, str] = {}
+    destinations: Dict[Tuple[str, str], List[LogEvent]] = {}
+    # Events to rewrite as JSON once repeats are counted: (event, sns, message, log group, log stream)
+    enriched: List[Tuple[LogEvent, Dict[str, Any], str, str, str]] = []
+    # SQS messageIds of the messages written to each destination
+    sources: Dict[Tuple[str, str], List[str]] = {}
+    compactor = None
+    if config.compaction != COMPACTION_OFF:
+        compactor = Compactor(config.compaction, _seen_message_ids)
+
+    if metrics is None:
+        metrics = Metrics(config.log_group)
+    skipped = SkippedRecords()
+    processed = 0
+
+    low_time = False
+    for sns in _sns_records(event["Records"], skipped):
+        if not processed:
+            metrics.topic = topic_name(sns.get("TopicArn"))
+        processed += 1
+        if compactor is not None and compactor.is_duplicate(sns.get("MessageId")):
+            continue
+        if not low_time and remaining(deadline) < LOW_TIME_SECONDS:
+            low_time = True
+            log.warn("Running out of time, skipping optional processing", remaining=remaining(deadline))
+
+        message = sns["Message"]
+        if config.rules:
+            message = apply_rules(config.rules, sns)
+            if message is None:
+                metrics.add("RecordsFiltered")
+                continue
+
+        log_group, log_stream_format = config.log_group, config.log_stream_format
+        if config.routes:
+            route = match_route(config.routes, sns)
+            if route is not None:
+                log_group = route.log_group
+                log_stream_format = route.log_stream_format or log_stream_format
+
+        sent_at = None
+        if config.use_sns_timestamp and not low_time:
+            sent_at = parse_sns_timestamp(sns.get("Timestamp"))
+        if sent_at is None:
+            log_stream = now_streams.get(log_stream_format)
+            if log_stream is None:
+                log_stream = now_streams[log_stream_format] = now.strftime(log_stream_format)
+            log_event: LogEvent = SizedEvent(timestamp=now_millis, message=message)
+        else:
+            log_stream = sent_at.strftime(log_stream_format)
+            log_event = SizedEvent(timestamp=to_epoch_millis(sent_at), message=message)
+        if _sharder is not None:
+            log_stream = _sharder.shard(log_stream, sns.get("MessageId"))
+        if compactor is None or compactor.add(log_group, log_stream, log_event):
+            destinations.setdefault((log_group, log_stream), []).append(log_event)
+            if config.use_json and not low_time:
+                enriched.append((log_event, sns, message, log_group, log_stream))
+        item_id = sns.get(SQS_MESSAGE_ID)
+        if item_id is not None:
+            sources.setdefault((log_group, log_stream), []).append(item_id)
+
+    metrics.add("RecordsProcessed", processed)
+    metrics.add_skipped(skipped)
+    profiler.lap(STAGE_PARSE)
+
+    if compactor is not None:
+        compactor.finish()
+        if compactor.duplicates or compactor.repeats:
+            log.info("Compacted messages", duplicates=compactor.duplicates, repeats=compactor.repeats)
+    for log_event, sns, message, log_group, log_stream in enriched:
+        repeated = compactor.repeats_of(log_group, log_stream, message) if compactor is not None else 1
+        log_event["message"] = to_json(sns, repeated, message)
+
+    for destination, events in destinations.items():
+        destinations[destination] = _oversize.fit(events)
+    profiler.lap(STAGE_ENCODE)
+
+    # Events spooled by earlier invocations are written alongside this one's
+    spool = _dead_letter if isinstance(_dead_letter, Spool) else None
+    drained = None
+    if spool is not None and not low_time and _handoff is None:
+        drained = spool.drain(now_millis=now_millis)
+        for destination, events in drained.events.items():
+            destinations.setdefault(destination, []).extend(events)
+        if drained.segments:
+            metrics.add("SpoolDrainedEvents", len(drained))
+            log.info("Writing spooled events", count=len(drained), expired=drained.expired)
+
+    if not destinations:
+        return []
+    if _handoff is not None and request_id:
+        if _handoff.send(request_id, destinations):
+            metrics.add("Destinations", len(destinations))
+            metrics.add("HandedOffEvents", sum(map(len, destinations.values())))
+            profiler.lap(STAGE_FLUSH)
+            if compactor is not None:
+                compactor.commit()
+            return []
+        log.warn("Flusher extension did not take the events, writing them here", port=_handoff.port)
+    client = _get_logs_client(config)
+    writes = [
+        (BatchWriter(client, log_group, log_stream, streams=_streams), events)
+        for (log_group, log_stream), events in destinations.items()
+    ]
+    metrics.add("Destinations", len(writes))
+    started = time.perf_counter()
+    failed: List[str] = []
+    try:
+        # With a spool, failed batches are spooled early instead of retried until the timeout
+        flush_deadline = spool.deadline(deadline) if spool is not None else deadline
+        flush(writes, _flush_executor, flush_deadline, _dead_letter, metrics, profiler)
+    except FlushError as err:
+        # Only SQS messages can be retried on their own
+        if not all(destination in sources for destination in err.failures):
+            raise
+        failed = [item_id for destination in err.failures for item_id in sources.get(destination, ())]
+    finally:
+        metrics.add("FlushLatency", (time.perf_counter() - started) * 1000)
+        profiler.lap(STAGE_FLUSH)
+    if failed:
+        # Not committed, so that the retried messages are not taken for duplicates,
+        # nor the drained events, which may not have been written or spooled again
+        metrics.add("BatchItemFailures", len(failed))
+        log.warn("Returning SQS messages for retry", count=len(failed))
+        return failed
+    if spool is not None and drained is not None:
+        spool.commit(drained)
+    if compactor is not None:
+        compactor.commit()
+    return []
 
 
 if __name__ == "__main__":
-    handler({}, None)
+    # Replay archived notifications through _write_batch; see lambda_sns_cloudwatch_logs/replay.py
+    import sys
+
+    from lambda_sns_cloudwatch_logs.replay import main
+
+    sys.exit(main())
@@ -1,5 +1,6 @@
 """Pytest fixtures for sns_cloudwatch_gw tests."""
 
+import json
 import os
 import pytest
 from unittest.mock import patch
@@ -77,6 +78,41 @@ def sns_event_multiple_records():
     }
 
 
+@pytest.fixture
+def sqs_event():
+    """SNS messages delivered in a batch through an SQS queue."""
+    def envelope(message_id, message, topic="example-topic"):
+        return json.dumps({
+            "Type": "Notification",
+            "MessageId": message_id,
+            "TopicArn": f"arn:aws:sns:us-east-1:123456789012:{topic}",
+            "Subject": None,
+            "Message": message,
+            "Timestamp": "2023-01-01T00:00:00.000Z",
+            "SignatureVersion": "1",
+            "Signature": "EXAMPLE",
+            "SigningCertURL": "EXAMPLE",
+            "UnsubscribeURL": "EXAMPLE",
+        })
+
+    return {
+        "Records": [
+            {
+                "messageId": f"sqs-{index}",
+                "receiptHandle": f"handle-{index}",
+                "body": envelope(f"msg-{index}", f"Queued message {index}", topic),
+                "attributes": {"ApproximateReceiveCount": "1", "SentTimestamp": "1672531200000"},
+                "messageAttributes": {},
+                "md5OfBody": "EXAMPLE",
+                "eventSource": "aws:sqs",
+                "eventSourceARN": "arn:aws:sqs:us-east-1:123456789012:example-queue",
+                "awsRegion": "us-east-1",
+            }
+            for index, topic in enumerate(["example-topic", "example-topic", "alerts"])
+        ]
+    }
+
+
 @pytest.fixture
 def non_sns_event():
     """Non-SNS event (e.g., S3 event)."""
@@ -129,6 +165,7 @@ def lambda_context():
             self.log_group_name = "/aws/lambda/test-function"
             self.log_stream_name = "2023/01/01/[$LATEST]abcdef1234567890"
             self.remaining_time_in_millis = lambda: 300000
+            self.get_remaining_time_in_millis = lambda: 300000
     
     return LambdaContext()
 
@@ -138,7 +175,9 @@ def mock_environment():
     """Mock environment variables."""
     with patch.dict(os.environ, {
         'LOG_GROUP': 'test-log-group',
-        'LOG_LEVEL': 'INFO'
+        'LOG_LEVEL': 'INFO',
+        # The shared logs client is created for real in watchtower mode tests
+        'AWS_DEFAULT_REGION': 'us-east-1',
     }):
         yield
 
@@ -149,4 +188,25 @@ def mock_watchtower_handler(mocker):
     mock_handler = mocker.MagicMock()
     mock_handler.flush = mocker.MagicMock()
     mock_handler.level = 20  # logging.INFO
-    return mock_handler
\ No newline at end of file
+    return mock_handler
+
+@pytest.fixture(autouse=True)
+def reset_module_state():
+    """Drop configuration, CloudWatch writers and clients cached by previous tests."""
+    import sns_cloudwatch_gw
+
+    def reset():
+        sns_cloudwatch_gw.reset_config()
+        sns_cloudwatch_gw._cw_logger = None
+        sns_cloudwatch_gw._writers.clear()
+        sns_cloudwatch_gw._logs_client = None
+        sns_cloudwatch_gw._seen_message_ids = None
+        sns_cloudwatch_gw._invocations = 0
+        sns_cloudwatch_gw._prewarmed = False
+        sns_cloudwatch_gw._streams = None
+        sns_cloudwatch_gw._sharder = None
+        sns_cloudwatch_gw._handoff = None
+
+    reset()
+    yield
+    reset()
@@ -0,0 +1,70 @@
+"""Unit tests for PutLogEvents batch packing."""
+
+from lambda_sns_cloudwatch_logs import batch
+from lambda_sns_cloudwatch_logs.batch import SizedEvent, build_batches, event_size, message_size
+
+
+def make_events(count, message="m", start=0, step=1):
+    return [{"timestamp": start + i * step, "message": message} for i in range(count)]
+
+
+class TestBuildBatches:
+    """Test cases for splitting events into PutLogEvents calls."""
+
+    def test_empty(self):
+        assert list(build_batches([])) == []
+
+    def test_single_batch_sorted_by_timestamp(self):
+        events = [
+            {"timestamp": 3, "message": "c"},
+            {"timestamp": 1, "message": "a"},
+            {"timestamp": 2, "message": "b"},
+        ]
+        batches = list(build_batches(events))
+        assert len(batches) == 1
+        assert [e["message"] for e in batches[0]] == ["a", "b", "c"]
+
+    def test_event_count_limit(self):
+        batches = list(build_batches(make_events(batch.MAX_BATCH_EVENTS + 1)))
+        assert [len(b) for b in batches] == [batch.MAX_BATCH_EVENTS, 1]
+
+    def test_byte_limit(self):
+        message = "x" * 100_000
+        events = make_events(25, message=message)
+        batches = list(build_batches(events))
+        for b in batches:
+            assert sum(event_size(e) for e in b) <= batch.MAX_BATCH_BYTES
+        per_batch = batch.MAX_BATCH_BYTES // event_size(events[0])
+        assert [len(b) for b in batches] == [per_batch, per_batch, 25 - 2 * per_batch]
+
+    def test_byte_limit_counts_utf8(self):
+        # 4 bytes per character when encoded
+        message = "🚀" * 100_000
+        assert event_size({"timestamp": 0, "message": message}) == 400_000 + batch.EVENT_OVERHEAD_BYTES
+        assert [len(b) for b in build_batches(make_events(3, message=message))] == [2, 1]
+
+    def test_time_span_limit(self):
+        events = make_events(3, step=batch.MAX_BATCH_SPAN_MS // 2 + 1)
+        assert [len(b) for b in build_batches(events)] == [2, 1]
+
+
+class TestMessageSize:
+    """Test cases for measuring messages."""
+
+    def test_ascii(self):
+        assert message_size("hello") == 5
+
+    def test_utf8(self):
+        assert message_size("é☃") == 5
+        assert event_size({"timestamp": 1, "message": "é☃"}) == 5 + batch.EVENT_OVERHEAD_BYTES
+
+    def test_sized_event_measured_once(self, monkeypatch):
+        calls = []
+        measure = batch.message_size
+        monkeypatch.setattr(batch, "message_size", lambda message: calls.append(message) or measure(message))
+        event = SizedEvent(timestamp=1, message="é☃")
+
+        assert event_size(event) == event_size(event) == 5 + batch.EVENT_OVERHEAD_BYTES
+        list(build_batches([event]))
+        assert calls == ["é☃"]
+        assert event == {"timestamp": 1, "message": "é☃"}
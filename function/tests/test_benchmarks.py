@@ -0,0 +1,93 @@
+"""Smoke tests for the offline benchmarks and their CloudWatch Logs stand-in."""
+
+import os
+from unittest.mock import patch
+
+import boto3
+import pytest
+
+from benchmarks.run import compare, make_event, percentile, run_scenario, scenarios
+from benchmarks.standin import CloudWatchLogsStandin, count_calls
+
+
+@pytest.fixture
+def standin_client():
+    session = boto3.Session(aws_access_key_id="x", aws_secret_access_key="x", region_name="us-east-1")
+    standin = CloudWatchLogsStandin()
+    standin.install(session)
+    calls = count_calls(session)
+    return standin, calls, session.client("logs")
+
+
+class TestStandin:
+    """Test cases for CloudWatchLogsStandin."""
+
+    def test_put_log_events(self, standin_client):
+        standin, calls, client = standin_client
+        client.create_log_group(logGroupName="g")
+        client.create_log_stream(logGroupName="g", logStreamName="s")
+
+        client.put_log_events(logGroupName="g", logStreamName="s",
+                              logEvents=[{"timestamp": 1, "message": "a"}, {"timestamp": 2, "message": "b"}])
+
+        assert standin.stats()["events_stored"] == 2
+        assert calls == {"CreateLogGroup": 1, "CreateLogStream": 1, "PutLogEvents": 1}
+
+    def test_missing_stream(self, standin_client):
+        _, _, client = standin_client
+        client.create_log_group(logGroupName="g")
+
+        with pytest.raises(client.exceptions.ResourceNotFoundException):
+            client.put_log_events(logGroupName="g", logStreamName="s", logEvents=[{"timestamp": 1, "message": "a"}])
+
+    def test_rejects_unordered_batch(self, standin_client):
+        _, _, client = standin_client
+        client.create_log_group(logGroupName="g")
+        client.create_log_stream(logGroupName="g", logStreamName="s")
+
+        with pytest.raises(client.exceptions.InvalidParameterException):
+            client.put_log_events(logGroupName="g", logStreamName="s",
+                                  logEvents=[{"timestamp": 2, "message": "a"}, {"timestamp": 1, "message": "b"}])
+
+
+class TestRun:
+    """Test cases for the benchmark runner."""
+
+    def test_make_event(self):
+        event = make_event(4, 10, 2)
+
+        assert len(event["Records"]) == 4
+        assert {r["Sns"]["TopicArn"].rsplit(":", 1)[1] for r in event["Records"]} == {"bench-0", "bench-1"}
+        assert event["Records"][0]["Sns"]["Message"] == "x" * 10
+
+    def test_scenarios_skip_spread_for_watchtower(self):
+        result = scenarios(["batch", "watchtower"], [1], [100], [1, 4])
+
+        assert [(s["mode"], s["spread"]) for s in result] == [("batch", 1), ("batch", 4), ("watchtower", 1)]
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([3.0], 0.99) == 3.0
+
+    def test_compare(self):
+        before = {"mode": "batch", "records": 1, "size": 1, "spread": 1,
+                  "records_per_second": 100.0, "latency_ms": {"p99": 2.0}}
+        after = dict(before, records_per_second=150.0, latency_ms={"p99": 1.0})
+
+        assert compare([after], [before]) == ["batch 1 1 1 +50.0% rec/s -50.0% p99"]
+
+    def test_run_scenario(self):
+        scenario = {"mode": "batch", "records": 5, "size": 50, "spread": 2}
+
+        with patch.dict(os.environ), patch.object(boto3, "DEFAULT_SESSION", None):
+            result = run_scenario(scenario, invocations=2)
+
+        assert result["invocations"] == 2
+        assert result["records_per_second"] > 0
+        assert set(result["latency_ms"]) == {"cold", "p50", "p99", "mean", "max"}
+        # Two destinations over three invocations
+        assert result["api_calls"]["PutLogEvents"] >= 6
+        assert result["peak_rss_kb"] > 0
@@ -0,0 +1,35 @@
+"""Unit tests for the shared CloudWatch Logs client."""
+
+from unittest.mock import patch
+
+from lambda_sns_cloudwatch_logs.client import ClientSettings, make_logs_client
+
+
+class TestClientSettings:
+    """Test cases for ClientSettings."""
+
+    def test_botocore_config(self):
+        settings = ClientSettings(pool_size=8, connect_timeout=0.5, read_timeout=3.0, max_attempts=3)
+
+        config = settings.botocore_config()
+
+        assert config.max_pool_connections == 8
+        assert config.connect_timeout == 0.5
+        assert config.read_timeout == 3.0
+        assert config.retries == {"mode": "adaptive", "max_attempts": 3}
+        assert config.tcp_keepalive is True
+
+    def test_make_logs_client(self):
+        with patch("boto3.client") as mock_boto3_client:
+            client = make_logs_client(ClientSettings(pool_size=4))
+
+        assert client is mock_boto3_client.return_value
+        assert mock_boto3_client.call_args.args == ("logs",)
+        assert mock_boto3_client.call_args.kwargs["config"].max_pool_connections == 4
+
+    def test_real_client(self):
+        client = make_logs_client(ClientSettings(pool_size=6, read_timeout=2.0))
+
+        assert client.meta.config.max_pool_connections == 6
+        assert client.meta.config.read_timeout == 2.0
+        assert client.meta.config.retries["mode"] == "adaptive"
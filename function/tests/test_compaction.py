@@ -0,0 +1,83 @@
+"""Unit tests for collapsing repeated messages."""
+
+from lambda_sns_cloudwatch_logs.compaction import (
+    COMPACTION_CONTENT,
+    COMPACTION_MESSAGE_ID,
+    Compactor,
+    SeenMessageIds,
+)
+
+
+def event(message, timestamp=1):
+    return {"timestamp": timestamp, "message": message}
+
+
+class TestSeenMessageIds:
+    """Test cases for SeenMessageIds."""
+
+    def test_remembers_ids(self):
+        seen = SeenMessageIds(10)
+        seen.add_all(["a", "b"])
+
+        assert "a" in seen
+        assert "c" not in seen
+        assert len(seen) == 2
+
+    def test_evicts_least_recently_seen(self):
+        seen = SeenMessageIds(3)
+        seen.add_all(["a", "b", "c"])
+        seen.add_all(["a", "d"])
+
+        assert "b" not in seen
+        assert all(message_id in seen for message_id in "acd")
+
+
+class TestCompactor:
+    """Test cases for Compactor."""
+
+    def test_duplicate_message_ids(self):
+        compactor = Compactor(COMPACTION_MESSAGE_ID, SeenMessageIds())
+
+        assert not compactor.is_duplicate("a")
+        assert compactor.is_duplicate("a")
+        assert not compactor.is_duplicate(None)
+        assert not compactor.is_duplicate(None)
+        assert compactor.duplicates == 1
+
+    def test_ids_remembered_only_on_commit(self):
+        seen = SeenMessageIds()
+        compactor = Compactor(COMPACTION_MESSAGE_ID, seen)
+        compactor.is_duplicate("a")
+
+        assert "a" not in seen
+        compactor.commit()
+        assert "a" in seen
+        assert Compactor(COMPACTION_MESSAGE_ID, seen).is_duplicate("a")
+
+    def test_message_id_mode_keeps_identical_bodies(self):
+        compactor = Compactor(COMPACTION_MESSAGE_ID, SeenMessageIds())
+
+        assert compactor.add("group", "stream", event("same"))
+        assert compactor.add("group", "stream", event("same"))
+
+    def test_content_mode_counts_repeats(self):
+        compactor = Compactor(COMPACTION_CONTENT, SeenMessageIds())
+        first, other = event("alarm", 1), event("other", 2)
+
+        written = [
+            e for e in (first, event("alarm", 3), other, event("alarm", 4))
+            if compactor.add("group", "stream", e)
+        ]
+        compactor.finish()
+
+        assert written == [first, other]
+        assert first == {"timestamp": 1, "message": "alarm [repeated 3 times]"}
+        assert other["message"] == "other"
+        assert compactor.repeats == 2
+
+    def test_content_mode_per_destination(self):
+        compactor = Compactor(COMPACTION_CONTENT, SeenMessageIds())
+
+        assert compactor.add("group", "stream", event("alarm"))
+        assert compactor.add("other", "stream", event("alarm"))
+        assert compactor.add("group", "2023", event("alarm"))
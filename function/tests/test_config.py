@@ -0,0 +1,279 @@
+"""Unit tests for the function configuration."""
+
+import dataclasses
+import logging
+import os
+from unittest.mock import patch
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.client import ClientSettings
+from lambda_sns_cloudwatch_logs.config import Config, ConfigError
+
+
+class TestConfig:
+    """Test cases for Config."""
+
+    def test_defaults(self):
+        config = Config.from_env()
+
+        assert config.log_level == logging.INFO
+        assert config.log_group == "test-log-group"
+        assert config.log_stream_format == "%Y-%m-%d/%H00"
+        assert config.writer_mode == "watchtower"
+        assert config.event_timestamp == "ingestion"
+        assert not config.use_sns_timestamp
+        assert config.flush_concurrency == 4
+        assert config.dead_letter_target == "none"
+        assert config.compaction == "off"
+        assert config.dedupe_cache_size == 10_000
+        assert config.message_format == "raw"
+        assert not config.use_json
+        assert config.oversized_messages == "split"
+        assert config.offload_bucket == ""
+        assert config.offload_prefix == "oversized/"
+        assert config.metrics_namespace == ""
+        assert config.metrics_dimensions == ("log_group",)
+        assert config.profile_sample == 0
+        assert not config.profile_memory
+        assert config.prewarm
+        assert config.stream_cache_ttl == 3600
+        assert config.rules == ()
+        assert config.client == ClientSettings(pool_size=4)
+        assert config.stream_sharding == "off"
+        assert config.stream_shards == 8
+        assert config.spool_dir == "/tmp/sns-cloudwatch-spool"
+        assert config.spool_max_bytes == 64 * 1024 * 1024
+        assert config.spool_retry_seconds == 2.0
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {
+            "LOG_LEVEL": "DEBUG",
+            "LOG_STREAM_FORMAT": "%Y/%m/%d",
+            "WRITER_MODE": "batch",
+            "EVENT_TIMESTAMP": "sns",
+        }):
+            config = Config.from_env()
+
+        assert config.log_level == logging.DEBUG
+        assert config.log_stream_format == "%Y/%m/%d"
+        assert config.writer_mode == "batch"
+        assert config.use_sns_timestamp
+
+    def test_missing_log_group(self):
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ConfigError, match="LOG_GROUP"):
+                Config.from_env()
+
+    def test_from_mapping(self):
+        config = Config.from_env({"LOG_GROUP": "other", "LOG_LEVEL": "10"})
+
+        assert config.log_group == "other"
+        assert config.log_level == logging.DEBUG
+
+    @pytest.mark.parametrize("name", ["LOG_LEVEL", "WRITER_MODE", "EVENT_TIMESTAMP"])
+    def test_invalid_choice(self, name):
+        with patch.dict(os.environ, {name: "bogus"}):
+            with pytest.raises(ValueError, match=name):
+                Config.from_env()
+
+    def test_sns_timestamp_requires_batch_mode(self):
+        with patch.dict(os.environ, {"EVENT_TIMESTAMP": "sns"}):
+            with pytest.raises(ConfigError, match="WRITER_MODE=batch"):
+                Config.from_env()
+
+    def test_routing_table(self):
+        with patch.dict(os.environ, {
+            "WRITER_MODE": "batch",
+            "ROUTING_TABLE": '[{"subject": "Billing*", "log_group": "billing"}]',
+        }):
+            config = Config.from_env()
+
+        assert [route.log_group for route in config.routes] == ["billing"]
+
+    def test_invalid_routing_table(self):
+        with patch.dict(os.environ, {"WRITER_MODE": "batch", "ROUTING_TABLE": "[{}]"}):
+            with pytest.raises(ConfigError, match="log_group"):
+                Config.from_env()
+
+    def test_routing_table_requires_batch_mode(self):
+        with patch.dict(os.environ, {"ROUTING_TABLE": '[{"log_group": "billing"}]'}):
+            with pytest.raises(ConfigError, match="WRITER_MODE=batch"):
+                Config.from_env()
+
+    @pytest.mark.parametrize("value", ["0", "-1", "many"])
+    def test_invalid_flush_concurrency(self, value):
+        with patch.dict(os.environ, {"FLUSH_CONCURRENCY": value}):
+            with pytest.raises(ConfigError, match="FLUSH_CONCURRENCY"):
+                Config.from_env()
+
+    @pytest.mark.parametrize("value", ["none", "log", "spool", "arn:aws:sqs:us-east-1:123456789012:undelivered"])
+    def test_dead_letter_target(self, value):
+        with patch.dict(os.environ, {"DEAD_LETTER_TARGET": value}):
+            assert Config.from_env().dead_letter_target == value
+
+    @pytest.mark.parametrize("value", ["stdout", "arn:aws:sns:us-east-1:123456789012:topic"])
+    def test_invalid_dead_letter_target(self, value):
+        with patch.dict(os.environ, {"DEAD_LETTER_TARGET": value}):
+            with pytest.raises(ConfigError, match="DEAD_LETTER_TARGET"):
+                Config.from_env()
+
+    def test_compaction(self):
+        with patch.dict(os.environ, {"WRITER_MODE": "batch", "COMPACTION": "content", "DEDUPE_CACHE_SIZE": "50"}):
+            config = Config.from_env()
+
+        assert config.compaction == "content"
+        assert config.dedupe_cache_size == 50
+
+    def test_compaction_requires_batch_mode(self):
+        with patch.dict(os.environ, {"COMPACTION": "message_id"}):
+            with pytest.raises(ConfigError, match="WRITER_MODE=batch"):
+                Config.from_env()
+
+    def test_message_format(self):
+        with patch.dict(os.environ, {"MESSAGE_FORMAT": "json"}):
+            config = Config.from_env()
+
+        assert config.message_format == "json"
+        assert config.use_json
+
+    def test_oversized_messages(self):
+        with patch.dict(os.environ, {
+            "WRITER_MODE": "batch",
+            "OVERSIZED_MESSAGES": "offload",
+            "OFFLOAD_BUCKET": "big-messages",
+            "OFFLOAD_PREFIX": "",
+        }):
+            config = Config.from_env()
+
+        assert config.oversized_messages == "offload"
+        assert config.offload_bucket == "big-messages"
+        assert config.offload_prefix == ""
+
+    @pytest.mark.parametrize("env, match", [
+        ({"OVERSIZED_MESSAGES": "gzip"}, "WRITER_MODE=batch"),
+        ({"WRITER_MODE": "batch", "OVERSIZED_MESSAGES": "offload"}, "OFFLOAD_BUCKET"),
+    ])
+    def test_invalid_oversized_messages(self, env, match):
+        with patch.dict(os.environ, env):
+            with pytest.raises(ConfigError, match=match):
+                Config.from_env()
+
+    def test_metrics(self):
+        with patch.dict(os.environ, {"METRICS_NAMESPACE": "SnsLogs", "METRICS_DIMENSIONS": "topic, log_group,topic"}):
+            config = Config.from_env()
+
+        assert config.metrics_namespace == "SnsLogs"
+        assert config.metrics_dimensions == ("topic", "log_group")
+
+    def test_no_metric_dimensions(self):
+        with patch.dict(os.environ, {"METRICS_DIMENSIONS": ""}):
+            assert Config.from_env().metrics_dimensions == ()
+
+    def test_invalid_metric_dimension(self):
+        with patch.dict(os.environ, {"METRICS_DIMENSIONS": "region"}):
+            with pytest.raises(ConfigError, match="METRICS_DIMENSIONS"):
+                Config.from_env()
+
+    def test_profiling(self):
+        with patch.dict(os.environ, {"PROFILE_SAMPLE": "100", "PROFILE_MEMORY": "TRUE"}):
+            config = Config.from_env()
+
+        assert config.profile_sample == 100
+        assert config.profile_memory
+
+    @pytest.mark.parametrize("env", [{"PROFILE_SAMPLE": "-1"}, {"PROFILE_MEMORY": "yes"}])
+    def test_invalid_profiling(self, env):
+        with patch.dict(os.environ, env):
+            with pytest.raises(ConfigError, match="PROFILE_"):
+                Config.from_env()
+
+    def test_prewarm_off(self):
+        with patch.dict(os.environ, {"PREWARM": "false"}):
+            assert not Config.from_env().prewarm
+
+    def test_stream_cache_ttl(self):
+        with patch.dict(os.environ, {"STREAM_CACHE_TTL": "0"}):
+            assert Config.from_env().stream_cache_ttl == 0
+        with patch.dict(os.environ, {"STREAM_CACHE_TTL": "ten"}):
+            with pytest.raises(ConfigError, match="STREAM_CACHE_TTL"):
+                Config.from_env()
+
+    def test_filter_rules(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text('[{"action": "truncate", "max_bytes": 100}]')
+
+        with patch.dict(os.environ, {"FILTER_RULES": '[{"action": "drop", "subject": "DEBUG*"}]',
+                                     "FILTER_RULES_FILE": str(path)}):
+            config = Config.from_env()
+
+        assert [rule.action for rule in config.rules] == ["drop", "truncate"]
+
+    def test_invalid_filter_rules(self):
+        with patch.dict(os.environ, {"FILTER_RULES": '[{"action": "explode"}]'}):
+            with pytest.raises(ConfigError, match="action"):
+                Config.from_env()
+
+    def test_client_settings(self):
+        with patch.dict(os.environ, {"CONNECT_TIMEOUT": "0.5", "READ_TIMEOUT": "3", "RETRY_MODE": "standard",
+                                     "MAX_ATTEMPTS": "4", "TCP_KEEPALIVE": "false", "CLIENT_POOL_SIZE": "16"}):
+            config = Config.from_env()
+
+        assert config.client == ClientSettings(pool_size=16, connect_timeout=0.5, read_timeout=3.0,
+                                               retry_mode="standard", max_attempts=4, tcp_keepalive=False)
+
+    def test_client_pool_sized_to_flush_concurrency(self):
+        with patch.dict(os.environ, {"FLUSH_CONCURRENCY": "12", "CLIENT_POOL_SIZE": "0"}):
+            config = Config.from_env()
+
+        assert config.client.pool_size == 12
+
+    @pytest.mark.parametrize("name,value", [
+        ("CONNECT_TIMEOUT", "0"),
+        ("READ_TIMEOUT", "soon"),
+        ("RETRY_MODE", "eager"),
+        ("MAX_ATTEMPTS", "0"),
+        ("CLIENT_POOL_SIZE", "-1"),
+    ])
+    def test_invalid_client_settings(self, name, value):
+        with patch.dict(os.environ, {name: value}):
+            with pytest.raises(ConfigError, match=name):
+                Config.from_env()
+
+    def test_stream_sharding(self):
+        with patch.dict(os.environ, {"WRITER_MODE": "batch", "STREAM_SHARDING": "message_id", "STREAM_SHARDS": "32"}):
+            config = Config.from_env()
+
+        assert config.stream_sharding == "message_id"
+        assert config.stream_shards == 32
+
+    def test_message_id_sharding_requires_batch_mode(self):
+        with patch.dict(os.environ, {"STREAM_SHARDING": "message_id"}):
+            with pytest.raises(ConfigError, match="STREAM_SHARDING"):
+                Config.from_env()
+
+    def test_spool_settings(self):
+        with patch.dict(os.environ, {"SPOOL_DIR": "/tmp/spool", "SPOOL_MAX_BYTES": "1048576",
+                                     "SPOOL_RETRY_TIME": "0.5"}):
+            config = Config.from_env()
+
+        assert (config.spool_dir, config.spool_max_bytes, config.spool_retry_seconds) == ("/tmp/spool", 1048576, 0.5)
+
+    def test_background_flush(self):
+        with patch.dict(os.environ, {"WRITER_MODE": "batch", "BACKGROUND_FLUSH": "true", "EXTENSION_PORT": "9100"}):
+            config = Config.from_env()
+
+        assert config.background_flush
+        assert config.extension_port == 9100
+
+    def test_background_flush_requires_batch_mode(self):
+        with patch.dict(os.environ, {"BACKGROUND_FLUSH": "true"}):
+            with pytest.raises(ConfigError, match="BACKGROUND_FLUSH"):
+                Config.from_env()
+
+    def test_frozen_and_slotted(self):
+        config = Config.from_env()
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.log_group = "other"
+        assert not hasattr(config, "__dict__")
@@ -0,0 +1,98 @@
+"""Unit tests for the dead-letter sinks."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.deadletter import LogSink, SqsSink, make_sink, queue_url
+from lambda_sns_cloudwatch_logs.spool import Spool
+
+QUEUE_ARN = "arn:aws:sqs:us-east-1:123456789012:undelivered"
+
+
+def events(count):
+    return [{"timestamp": i, "message": f"message {i}"} for i in range(count)]
+
+
+class TestQueueUrl:
+    """Test cases for queue_url."""
+
+    def test_queue_url(self):
+        assert queue_url(QUEUE_ARN) == "https://sqs.us-east-1.amazonaws.com/123456789012/undelivered"
+
+    def test_china_partition(self):
+        assert queue_url("arn:aws-cn:sqs:cn-north-1:123456789012:q") == "https://sqs.cn-north-1.amazonaws.com.cn/123456789012/q"
+
+    @pytest.mark.parametrize("arn", ["undelivered", "arn:aws:sns:us-east-1:123456789012:topic"])
+    def test_invalid_arn(self, arn):
+        with pytest.raises(ValueError, match="SQS queue ARN"):
+            queue_url(arn)
+
+
+class TestLogSink:
+    """Test cases for LogSink."""
+
+    def test_logs_each_event(self):
+        with patch("lambda_sns_cloudwatch_logs.deadletter.log") as mock_log:
+            LogSink().send("group", "stream", events(2))
+
+        assert mock_log.error.call_count == 2
+        assert mock_log.error.call_args.kwargs == {
+            "log_group": "group",
+            "log_stream": "stream",
+            "timestamp": 1,
+            "message": "message 1",
+        }
+
+
+class TestSqsSink:
+    """Test cases for SqsSink."""
+
+    def test_sends_in_batches_of_ten(self):
+        client = MagicMock()
+        client.send_message_batch.return_value = {"Successful": []}
+        factory = MagicMock(return_value=client)
+        sink = SqsSink(QUEUE_ARN, factory)
+
+        sink.send("group", "stream", events(25))
+        sink.send("group", "stream", events(1))
+
+        factory.assert_called_once_with()
+        sizes = [len(c.kwargs["Entries"]) for c in client.send_message_batch.call_args_list]
+        assert sizes == [10, 10, 5, 1]
+        first = client.send_message_batch.call_args_list[0].kwargs
+        assert first["QueueUrl"] == "https://sqs.us-east-1.amazonaws.com/123456789012/undelivered"
+        assert json.loads(first["Entries"][0]["MessageBody"]) == {
+            "log_group": "group",
+            "log_stream": "stream",
+            "timestamp": 0,
+            "message": "message 0",
+        }
+
+    def test_failed_entries_raise(self):
+        client = MagicMock()
+        client.send_message_batch.return_value = {"Failed": [{"Id": "0", "Code": "InternalError"}]}
+
+        with pytest.raises(RuntimeError, match="1 dead-letter"):
+            SqsSink(QUEUE_ARN, lambda: client).send("group", "stream", events(1))
+
+
+class TestMakeSink:
+    """Test cases for make_sink."""
+
+    @pytest.mark.parametrize("target", ["", "none"])
+    def test_no_sink(self, target):
+        assert make_sink(target) is None
+
+    def test_log_sink(self):
+        assert isinstance(make_sink("log"), LogSink)
+
+    def test_sqs_sink(self):
+        assert isinstance(make_sink(QUEUE_ARN), SqsSink)
+
+    def test_spool(self, tmp_path):
+        sink = make_sink("spool", str(tmp_path), 1024, 0.5)
+
+        assert isinstance(sink, Spool)
+        assert (sink.directory, sink.max_bytes, sink.retry_seconds) == (str(tmp_path), 1024, 0.5)
@@ -0,0 +1,42 @@
+"""Unit tests for the invocation time budget."""
+
+import math
+import time
+from unittest.mock import MagicMock
+
+from lambda_sns_cloudwatch_logs.deadline import DEADLINE_MARGIN_SECONDS, from_context, from_epoch_millis, remaining
+
+
+class TestDeadline:
+    """Test cases for from_context, from_epoch_millis and remaining."""
+
+    def test_from_context(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 3000
+
+        before = time.monotonic()
+        deadline = from_context(context)
+        after = time.monotonic()
+
+        assert before + 3 - DEADLINE_MARGIN_SECONDS <= deadline <= after + 3 - DEADLINE_MARGIN_SECONDS
+
+    def test_custom_margin(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 3000
+
+        assert remaining(from_context(context, margin=2)) <= 1
+
+    def test_no_context(self):
+        assert from_context(None) is None
+        assert remaining(None) == math.inf
+
+    def test_remaining_goes_negative(self):
+        assert remaining(time.monotonic() - 1) < 0
+
+    def test_from_epoch_millis(self):
+        deadline = from_epoch_millis(int(time.time() * 1000) + 3000)
+
+        assert 2.9 - DEADLINE_MARGIN_SECONDS < remaining(deadline) <= 3 - DEADLINE_MARGIN_SECONDS
+
+    def test_no_epoch_millis(self):
+        assert from_epoch_millis(None) is None
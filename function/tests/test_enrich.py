@@ -0,0 +1,78 @@
+"""Unit tests for structured JSON log events."""
+
+import json
+from typing import Any, Dict
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.enrich import to_json
+
+SNS: Dict[str, Any] = {
+    "TopicArn": "arn:aws:sns:us-east-1:123456789012:alerts",
+    "MessageId": "95df01b4-ee98-5cb9-9903-4c221d41eb5e",
+    "Subject": None,
+    "Timestamp": "2023-06-15T10:00:00.000Z",
+    "Message": "disk full",
+    "MessageAttributes": {},
+}
+
+
+def sns(**overrides):
+    return {**SNS, **overrides}
+
+
+class TestToJson:
+    """Test cases for to_json."""
+
+    def test_metadata(self):
+        document = to_json(SNS)
+
+        assert json.loads(document) == {
+            "topic_arn": "arn:aws:sns:us-east-1:123456789012:alerts",
+            "message_id": "95df01b4-ee98-5cb9-9903-4c221d41eb5e",
+            "subject": None,
+            "timestamp": "2023-06-15T10:00:00.000Z",
+            "message": "disk full",
+        }
+        assert " " not in document.replace("disk full", "")
+
+    @pytest.mark.parametrize("body, expected", [
+        ('{"alarm": "CPU", "value": 97.5}', {"alarm": "CPU", "value": 97.5}),
+        ('  [1, 2]', [1, 2]),
+        ('{not json', "{not json"),
+        ('"quoted"', '"quoted"'),
+    ])
+    def test_json_bodies_embedded(self, body, expected):
+        assert json.loads(to_json(sns(Message=body)))["message"] == expected
+
+    def test_attributes(self):
+        attributes = {
+            "severity": {"Type": "String", "Value": "high"},
+            "count": {"Type": "Number", "Value": "3"},
+        }
+
+        document = json.loads(to_json(sns(MessageAttributes=attributes)))
+
+        assert document["attributes"] == {"severity": "high", "count": "3"}
+
+    def test_escaping_and_unicode(self):
+        message = 'line "one"\nline two é☃'
+
+        document = to_json(sns(Message=message, Subject="tab\there"))
+
+        assert "☃" in document
+        assert json.loads(document)["message"] == message
+        assert json.loads(document)["subject"] == "tab\there"
+
+    def test_repeated(self):
+        assert json.loads(to_json(SNS, repeated=4))["repeated"] == 4
+        assert "repeated" not in json.loads(to_json(SNS, repeated=1))
+
+    def test_missing_metadata(self):
+        assert json.loads(to_json({"Message": "bare"})) == {
+            "topic_arn": None,
+            "message_id": None,
+            "subject": None,
+            "timestamp": None,
+            "message": "bare",
+        }
@@ -0,0 +1,212 @@
+"""Tests for the flusher extension, against stand-ins for the Extensions API and CloudWatch Logs."""
+
+import threading
+import time
+
+import boto3
+import pytest
+
+from benchmarks.extensions_api import ExtensionsApiStandin
+from benchmarks.standin import CloudWatchLogsStandin
+from lambda_sns_cloudwatch_logs.config import Config
+from lambda_sns_cloudwatch_logs.extension import (
+    EXTENSION_NAME,
+    ExtensionError,
+    ExtensionsApi,
+    Flusher,
+    HandoffServer,
+    main,
+    run,
+)
+from lambda_sns_cloudwatch_logs.handoff import Handoff
+from lambda_sns_cloudwatch_logs.spool import Spool
+
+
+@pytest.fixture
+def api():
+    standin = ExtensionsApiStandin().start()
+    yield standin
+    standin.shutdown()
+    standin.server_close()
+
+
+@pytest.fixture
+def logs():
+    session = boto3.Session(aws_access_key_id="x", aws_secret_access_key="x", region_name="us-east-1")
+    standin = CloudWatchLogsStandin()
+    standin.install(session)
+    return standin, session.client("logs")
+
+
+@pytest.fixture
+def extension(api, logs, tmp_path):
+    """The extension loop, running in a thread until SHUTDOWN."""
+
+    def start(**settings):
+        config = Config(log_level=20, log_group="g", background_flush=True, spool_dir=str(tmp_path), **settings)
+        client = ExtensionsApi(api.address)
+        client.register(("INVOKE", "SHUTDOWN"))
+        server = HandoffServer(0)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        flusher = Flusher(config, logs[1])
+        thread = threading.Thread(target=run, args=(client, server, flusher), daemon=True)
+        thread.start()
+        started.append((server, thread))
+        return Handoff(server.server_address[1]), flusher, thread
+
+    started = []
+    yield start
+    for server, thread in started:
+        api.shutdown_instance()
+        thread.join(5)
+        server.shutdown()
+        server.server_close()
+
+
+def _events(*messages):
+    return [{"timestamp": int(time.time() * 1000), "message": message} for message in messages]
+
+
+class TestExtensionsApi:
+    """Test cases for ExtensionsApi."""
+
+    def test_register(self, api):
+        client = ExtensionsApi(api.address)
+
+        client.register(("INVOKE", "SHUTDOWN"))
+
+        assert api.name == EXTENSION_NAME
+        assert api.events == ["INVOKE", "SHUTDOWN"]
+        assert client.extension_id
+
+    def test_next_event(self, api):
+        client = ExtensionsApi(api.address)
+        client.register(("INVOKE",))
+        api.invoke("r1")
+
+        event = client.next_event()
+
+        assert event["eventType"] == "INVOKE"
+        assert event["requestId"] == "r1"
+
+    def test_next_event_unregistered(self, api):
+        with pytest.raises(ExtensionError):
+            ExtensionsApi(api.address).next_event()
+
+    def test_init_error(self, api):
+        client = ExtensionsApi(api.address)
+        client.register(("SHUTDOWN",))
+
+        client.init_error("broken")
+
+        assert api.errors == [{"errorMessage": "broken", "errorType": "Extension.FlusherError"}]
+
+
+class TestRun:
+    """Test cases for the extension's event loop."""
+
+    def test_writes_handed_off_events(self, api, logs, extension):
+        standin, _ = logs
+        handoff, _, _ = extension()
+        api.invoke("r1")
+
+        assert handoff.send("r1", {("g", "s"): _events("a", "b")})
+
+        assert api.wait_for_next(2)
+        assert standin.events[("g", "s")] == 2
+
+    def test_next_invocation_waits_for_flush(self, api, logs, extension):
+        standin, _ = logs
+        standin.latency = 0.1
+        handoff, _, _ = extension()
+        api.invoke("r1")
+        handoff.send("r1", {("g", "s"): _events("a")})
+
+        # The response has been sent, but the instance is not ready for another invocation
+        assert not api.wait_for_next(2, timeout=0.05)
+        assert api.wait_for_next(2)
+        assert standin.events[("g", "s")] == 1
+
+    def test_waits_until_deadline_without_handoff(self, api, logs, extension):
+        extension()
+        started = time.monotonic()
+        api.invoke("r1", timeout=0.8)
+
+        assert api.wait_for_next(2)
+        assert 0.2 < time.monotonic() - started < 2
+
+    def test_empty_handoff(self, api, logs, extension):
+        standin, _ = logs
+        handoff, _, _ = extension()
+        api.invoke("r1")
+
+        handoff.release("r1")
+
+        assert api.wait_for_next(2)
+        assert not standin.calls
+
+    def test_shutdown_writes_spool(self, api, logs, extension, tmp_path):
+        standin, _ = logs
+        Spool(str(tmp_path)).send("g", "s", _events("spooled"))
+        _, _, thread = extension(dead_letter_target="spool")
+
+        api.shutdown_instance()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert standin.events[("g", "s")] == 1
+        assert Spool(str(tmp_path)).size == 0
+
+    def test_failed_events_spooled(self, api, logs, extension, tmp_path):
+        standin, client = logs
+        handoff, _, _ = extension(dead_letter_target="spool", spool_retry_seconds=0.1)
+        client.meta.events.register("before-send.cloudwatch-logs.PutLogEvents", _unreachable)
+        api.invoke("r1")
+
+        handoff.send("r1", {("g", "s"): _events("a")})
+
+        assert api.wait_for_next(2)
+        assert not standin.events
+        assert Spool(str(tmp_path)).size > 0
+
+
+def _unreachable(**kwargs):
+    raise ConnectionError("unreachable")
+
+
+class TestMain:
+    """Test cases for running the extension as a process."""
+
+    def test_background_flush_off(self, api, monkeypatch):
+        monkeypatch.setenv("AWS_LAMBDA_RUNTIME_API", api.address)
+        monkeypatch.setenv("LOG_GROUP", "g")
+        api.shutdown_instance()
+
+        main()
+
+        assert api.events == ["SHUTDOWN"]
+
+    def test_invalid_config(self, api, monkeypatch):
+        monkeypatch.setenv("AWS_LAMBDA_RUNTIME_API", api.address)
+        monkeypatch.delenv("LOG_GROUP", raising=False)
+
+        with pytest.raises(SystemExit):
+            main()
+
+        assert "LOG_GROUP" in api.errors[0]["errorMessage"]
+
+    def test_port_in_use(self, api, monkeypatch):
+        busy = HandoffServer(0)
+        monkeypatch.setenv("AWS_LAMBDA_RUNTIME_API", api.address)
+        monkeypatch.setenv("LOG_GROUP", "g")
+        monkeypatch.setenv("WRITER_MODE", "batch")
+        monkeypatch.setenv("BACKGROUND_FLUSH", "true")
+        monkeypatch.setenv("EXTENSION_PORT", str(busy.server_address[1]))
+
+        try:
+            with pytest.raises(SystemExit):
+                main()
+        finally:
+            busy.server_close()
+
+        assert "Cannot listen" in api.errors[0]["errorMessage"]
@@ -0,0 +1,149 @@
+"""Unit tests for flushing several destinations concurrently."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.flush import FlushError, flush
+from lambda_sns_cloudwatch_logs.metrics import Metrics
+from lambda_sns_cloudwatch_logs.writer import WriteResult
+
+EVENTS = [{"timestamp": 1, "message": "m"}]
+
+
+def make_writer(log_group, log_stream="stream", write=None, calls=1):
+    writer = MagicMock(log_group=log_group, log_stream=log_stream)
+    writer.write.side_effect = write or (lambda events, deadline: WriteResult(calls=calls))
+    return writer
+
+
+def failing(error):
+    return lambda events, deadline: WriteResult(calls=1, failed=events, error=error)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+class TestFlush:
+    """Test cases for flush."""
+
+    def test_single_destination_runs_inline(self, executor):
+        threads = []
+
+        def write(events, deadline):
+            threads.append(threading.current_thread())
+            return WriteResult(calls=2)
+
+        assert flush([(make_writer("g", write=write), EVENTS)], executor) == 2
+        assert threads == [threading.current_thread()]
+
+    def test_destinations_written_in_parallel(self, executor):
+        # Every write waits for all the others, so this only completes if they run at once
+        barrier = threading.Barrier(3, timeout=5)
+
+        def write(events, deadline):
+            barrier.wait()
+            return WriteResult(calls=1)
+
+        writers = [make_writer(f"g{i}", write=write) for i in range(3)]
+
+        assert flush([(writer, EVENTS) for writer in writers], executor) == 3
+
+    def test_without_executor(self):
+        writers = [make_writer("a", calls=1), make_writer("b", calls=2)]
+
+        assert flush([(writer, EVENTS) for writer in writers]) == 3
+
+    def test_deadline_passed_to_writers(self, executor):
+        writer = make_writer("g")
+
+        flush([(writer, EVENTS)], executor, deadline=123.0)
+
+        writer.write.assert_called_once_with(EVENTS, 123.0)
+
+    def test_failures_reported_per_destination(self, executor):
+        ok = make_writer("ok")
+        bad = make_writer("bad", "s1", write=failing(RuntimeError("throttled")))
+        worse = make_writer("worse", "s2", write=failing(RuntimeError("denied")))
+
+        with pytest.raises(FlushError) as exc_info:
+            flush([(ok, EVENTS), (bad, EVENTS), (worse, EVENTS)], executor)
+
+        ok.write.assert_called_once()
+        assert set(exc_info.value.failures) == {("bad", "s1"), ("worse", "s2")}
+        assert "2 destination(s)" in str(exc_info.value)
+
+    def test_single_failure_chains_cause(self):
+        error = RuntimeError("throttled")
+
+        with pytest.raises(FlushError) as exc_info:
+            flush([(make_writer("bad", write=failing(error)), EVENTS)])
+
+        assert exc_info.value.__cause__ is error
+        assert exc_info.value.failures == {("bad", "stream"): error}
+
+    def test_unexpected_writer_exception(self):
+        def write(events, deadline):
+            raise KeyError("bug")
+
+        with pytest.raises(FlushError) as exc_info:
+            flush([(make_writer("g", write=write), EVENTS)])
+
+        assert isinstance(exc_info.value.__cause__, KeyError)
+
+    def test_rejected_events_counted(self):
+        writer = make_writer("g", write=lambda events, deadline: WriteResult(calls=1, rejected=1))
+        metrics = Metrics()
+
+        assert flush([(writer, EVENTS)], metrics=metrics) == 1
+        assert metrics.values["RejectedEvents"] == 1
+
+    def test_undelivered_events_without_error(self):
+        writer = make_writer("g", write=lambda events, deadline: WriteResult(calls=1, failed=events))
+
+        with pytest.raises(FlushError, match="1 destination"):
+            flush([(writer, EVENTS)])
+
+    def test_undelivered_events_sent_to_dead_letter(self, executor):
+        sink = MagicMock()
+        ok = make_writer("ok")
+        bad = make_writer("bad", "s1", write=failing(RuntimeError("throttled")))
+
+        metrics = Metrics()
+
+        calls = flush([(ok, EVENTS), (bad, EVENTS)], executor, dead_letter=sink, metrics=metrics)
+
+        assert calls == 2
+        sink.send.assert_called_once_with("bad", "s1", EVENTS)
+        assert metrics.values["DeadLetterEvents"] == 1
+
+    def test_dead_letter_failure_raises(self):
+        sink = MagicMock()
+        sink.send.side_effect = RuntimeError("queue gone")
+        bad = make_writer("bad", write=failing(RuntimeError("throttled")))
+
+        with pytest.raises(FlushError) as exc_info:
+            flush([(bad, EVENTS)], dead_letter=sink)
+
+        assert str(exc_info.value.__cause__) == "queue gone"
+
+    def test_metrics(self, executor):
+        metrics = Metrics()
+        writers = [
+            make_writer("a", write=lambda events, deadline: WriteResult(calls=3, retries=2, bytes=100)),
+            make_writer("b", write=lambda events, deadline: WriteResult(calls=1, bytes=50)),
+        ]
+
+        flush([(writer, EVENTS) for writer in writers], executor, metrics=metrics)
+
+        assert metrics.values["PutLogEventsCalls"] == 4
+        assert metrics.values["ThrottleRetries"] == 2
+        assert metrics.values["BytesWritten"] == 150
+
+    def test_nothing_to_flush(self, executor):
+        assert flush([], executor) == 0
@@ -0,0 +1,73 @@
+"""Unit tests for handing events off to the flusher extension."""
+
+import socket
+import threading
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.extension import HandoffServer
+from lambda_sns_cloudwatch_logs.handoff import Handoff, encode_events
+from lambda_sns_cloudwatch_logs.spool import decode_blocks
+
+
+@pytest.fixture
+def server():
+    server = HandoffServer(0)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestHandoff:
+    """Test cases for Handoff."""
+
+    def test_encode_events(self):
+        destinations = {("g", "s1"): [{"timestamp": 1, "message": "a"}], ("g", "s2"): [{"timestamp": 2, "message": "b"}]}
+
+        assert dict(decode_blocks(encode_events(destinations))) == destinations
+
+    def test_send(self, server):
+        handoff = Handoff(server.server_address[1])
+
+        assert handoff.send("r1", {("g", "s"): [{"timestamp": 1, "message": "a"}]})
+
+        assert server.wait_for("r1", 1)
+        assert server.take() == {("g", "s"): [{"timestamp": 1, "message": "a"}]}
+        assert handoff.last_request_id == "r1"
+
+    def test_send_without_extension(self):
+        handoff = Handoff(_free_port(), timeout=0.5)
+
+        assert not handoff.send("r1", {("g", "s"): [{"timestamp": 1, "message": "a"}]})
+        assert handoff.last_request_id is None
+
+    def test_release(self, server):
+        handoff = Handoff(server.server_address[1])
+
+        handoff.release("r1")
+
+        assert server.wait_for("r1", 1)
+        assert server.take() == {}
+
+    def test_release_after_send(self, server):
+        handoff = Handoff(server.server_address[1])
+        handoff.send("r1", {})
+        assert server.wait_for("r1", 1)
+
+        handoff.release("r1")
+
+        assert not server.wait_for("r1", 0.2)
+
+    def test_release_without_request_id(self, server):
+        handoff = Handoff(server.server_address[1])
+
+        handoff.release(None)
+
+        assert handoff.last_request_id is None
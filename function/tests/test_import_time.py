@@ -0,0 +1,74 @@
+"""Cold start import budget for the handler module.
+
+The handler is imported in a fresh interpreter with ``-X importtime`` so the
+numbers reflect a Lambda cold start rather than the test process. The
+interpreter runs isolated and without ``site`` (``-I -S``), so that ``.pth``
+hooks of the local environment do not preload modules the handler would
+otherwise be charged for, and without writing bytecode (``-B``).
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+FUNCTION_DIR = Path(__file__).parent.parent
+
+# Budgets leave headroom over the values measured on a stock Python 3.12
+# (about 107 modules, 25 of them the function's own, and 100-130 ms without
+# cached bytecode) so that only real regressions fail, not a slow CI runner
+MAX_IMPORTED_MODULES = 120
+MAX_IMPORT_TIME_US = 250_000
+
+# Imported on first use by the code paths that need them
+DEFERRED_PACKAGES = ("boto3", "botocore", "watchtower", "structlog", "hashlib")
+# No longer dependencies of the function
+DROPPED_PACKAGES = ("environs", "marshmallow", "pytz")
+
+PROBE = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+before = set(sys.modules)
+import sns_cloudwatch_gw
+loaded = sorted(set(sys.modules) - before)
+print(json.dumps(loaded))
+"""
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    """Import the handler in a new interpreter and return (modules loaded, import time in us)."""
+    env = dict(os.environ, LOG_GROUP="test-log-group")
+    result = subprocess.run(
+        [sys.executable, "-I", "-S", "-B", "-X", "importtime", "-c", PROBE, str(FUNCTION_DIR)],
+        cwd=FUNCTION_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = json.loads(result.stdout)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if fields[-1] == "sns_cloudwatch_gw":
+            return modules, int(fields[1])
+    pytest.fail(f"no import time reported for sns_cloudwatch_gw:\n{result.stderr}")
+
+
+def test_imported_module_count(cold_import):
+    modules, _ = cold_import
+    assert len(modules) <= MAX_IMPORTED_MODULES, modules
+
+
+def test_import_time(cold_import):
+    _, import_time_us = cold_import
+    assert import_time_us <= MAX_IMPORT_TIME_US
+
+
+@pytest.mark.parametrize("package", DEFERRED_PACKAGES + DROPPED_PACKAGES)
+def test_heavy_packages_not_imported(cold_import, package):
+    modules, _ = cold_import
+    assert not [m for m in modules if m == package or m.startswith(package + ".")]
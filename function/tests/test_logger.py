@@ -0,0 +1,39 @@
+"""Unit tests for the lazily configured function logger."""
+
+import logging
+from unittest.mock import patch
+
+import structlog
+
+from lambda_sns_cloudwatch_logs.logger import LazyLogger
+
+
+class TestLazyLogger:
+    """Test cases for LazyLogger."""
+
+    def test_configured_on_first_use(self):
+        lazy = LazyLogger()
+
+        with patch("structlog.configure") as mock_configure:
+            lazy.set_level(logging.WARNING)
+            mock_configure.assert_not_called()
+
+            lazy.debug("hidden")
+            lazy.warning("shown")
+
+        mock_configure.assert_called_once_with(
+            wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+        )
+
+    def test_set_level_reconfigures(self):
+        lazy = LazyLogger()
+
+        with patch("structlog.configure") as mock_configure:
+            lazy.info("first")
+            lazy.set_level(logging.ERROR)
+            lazy.info("second")
+
+        assert [c.kwargs["wrapper_class"] for c in mock_configure.call_args_list] == [
+            structlog.make_filtering_bound_logger(logging.INFO),
+            structlog.make_filtering_bound_logger(logging.ERROR),
+        ]
@@ -0,0 +1,69 @@
+"""Unit tests for Embedded Metric Format invocation metrics."""
+
+import io
+import json
+
+from lambda_sns_cloudwatch_logs.metrics import METRIC_UNITS, Metrics, topic_name
+from lambda_sns_cloudwatch_logs.records import SKIP_MISSING_MESSAGE, SKIP_NON_SNS, SkippedRecords
+
+
+class TestMetrics:
+    """Test cases for Metrics."""
+
+    def test_document(self):
+        metrics = Metrics("app-logs")
+        metrics.topic = "alerts"
+        metrics.add("RecordsProcessed", 3)
+        metrics.add("BytesWritten", 120)
+
+        document = metrics.document("SnsCloudWatchLogs", ("log_group", "topic"))
+
+        directive = document["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Namespace"] == "SnsCloudWatchLogs"
+        assert directive["Dimensions"] == [["LogGroup", "Topic"]]
+        assert {m["Name"] for m in directive["Metrics"]} == set(METRIC_UNITS)
+        assert document["LogGroup"] == "app-logs"
+        assert document["Topic"] == "alerts"
+        assert document["RecordsProcessed"] == 3
+        assert document["BytesWritten"] == 120
+        assert document["Duration"] >= 0
+        # Every declared metric has a value
+        assert all(name in document for name in METRIC_UNITS)
+
+    def test_no_dimensions(self):
+        document = Metrics("app-logs").document("ns", ())
+
+        assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [[]]
+        assert "LogGroup" not in document
+
+    def test_skipped_by_reason(self):
+        skipped = SkippedRecords()
+        for reason in (SKIP_NON_SNS, SKIP_NON_SNS, SKIP_MISSING_MESSAGE):
+            skipped.skip(reason)
+        metrics = Metrics()
+
+        metrics.add_skipped(skipped)
+
+        assert metrics.values["RecordsSkipped"] == 3
+        assert metrics.values["SkippedNonSns"] == 2
+        assert metrics.values["SkippedMissingMessage"] == 1
+        assert metrics.values["SkippedMissingEventSource"] == 0
+
+    def test_emit_single_line(self):
+        stream = io.StringIO()
+
+        Metrics("app-logs").emit("ns", ("log_group",), stream)
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["LogGroup"] == "app-logs"
+
+
+class TestTopicName:
+    """Test cases for topic_name."""
+
+    def test_topic_name(self):
+        assert topic_name("arn:aws:sns:us-east-1:123456789012:alerts") == "alerts"
+
+    def test_missing(self):
+        assert topic_name(None) == "unknown"
@@ -0,0 +1,153 @@
+"""Unit tests for fitting oversized messages into CloudWatch events."""
+
+import base64
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.batch import MAX_MESSAGE_BYTES, message_size
+from lambda_sns_cloudwatch_logs.oversize import (
+    OVERSIZED_GZIP,
+    OVERSIZED_OFFLOAD,
+    OversizeHandler,
+    S3Store,
+    make_store,
+    split_message,
+)
+
+LIMIT = 1000
+
+
+def event(message, timestamp=1):
+    return {"timestamp": timestamp, "message": message}
+
+
+def unsplit(parts):
+    return "".join(part.split("] ", 1)[1] for part in parts)
+
+
+class InMemoryStore:
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, key, body):
+        self.objects[key] = body
+        return f"memory://{key}"
+
+
+class TestSplitMessage:
+    """Test cases for split_message."""
+
+    def test_parts_fit_and_rejoin(self):
+        message = "".join(str(i % 10) for i in range(2500))
+
+        parts = split_message(message.encode(), "abc", LIMIT)
+
+        assert len(parts) == 3
+        assert [part.split("] ")[0] for part in parts] == ["[abc 1/3", "[abc 2/3", "[abc 3/3"]
+        assert all(message_size(part) <= LIMIT for part in parts)
+        assert unsplit(parts) == message
+
+    def test_never_cuts_a_character(self):
+        message = "é☃" * 1000
+
+        parts = split_message(message.encode(), "abc", LIMIT)
+
+        assert all(message_size(part) <= LIMIT for part in parts)
+        assert unsplit(parts) == message
+
+
+class TestOversizeHandler:
+    """Test cases for OversizeHandler."""
+
+    def test_small_events_untouched(self):
+        events = [event("a"), event("b")]
+
+        assert OversizeHandler(limit=LIMIT).fit(events) is events
+
+    def test_split_in_place(self):
+        big = "x" * 2500
+        events = [event("before", 1), event(big, 2), event("after", 3)]
+
+        fitted = OversizeHandler(limit=LIMIT).fit(events)
+
+        assert fitted[0] == events[0] and fitted[-1] == events[-1]
+        parts = fitted[1:-1]
+        assert len(parts) == 3
+        assert {part["timestamp"] for part in parts} == {2}
+        assert unsplit(p["message"] for p in parts) == big
+
+    def test_same_id_for_same_message(self):
+        handler = OversizeHandler(limit=LIMIT)
+        first = handler.fit([event("x" * 2500)])
+        second = handler.fit([event("x" * 2500)])
+
+        assert first == second
+
+    def test_gzip(self):
+        big = "log line\n" * 500
+
+        fitted = OversizeHandler(OVERSIZED_GZIP, limit=LIMIT).fit([event(big)])
+
+        assert len(fitted) == 1
+        document = json.loads(fitted[0]["message"])
+        assert document["oversized"] == "gzip+base64"
+        assert document["bytes"] == len(big)
+        assert gzip.decompress(base64.b64decode(document["data"])).decode() == big
+
+    def test_gzip_still_too_large_is_split(self):
+        incompressible = base64.b64encode(bytes(range(256)) * 20).decode()
+
+        fitted = OversizeHandler(OVERSIZED_GZIP, limit=LIMIT).fit([event(incompressible)])
+
+        assert len(fitted) > 1
+        assert json.loads(unsplit(e["message"] for e in fitted))["oversized"] == "gzip+base64"
+
+    def test_offload(self):
+        store = InMemoryStore()
+        big = "x" * 2500
+
+        fitted = OversizeHandler(OVERSIZED_OFFLOAD, store, limit=LIMIT).fit([event(big, 7)])
+
+        document = json.loads(fitted[0]["message"])
+        assert fitted[0]["timestamp"] == 7
+        assert document["oversized"] == "offloaded"
+        assert store.objects[document["id"]] == big.encode()
+        assert document["location"] == f"memory://{document['id']}"
+
+    def test_offload_failure_splits(self):
+        store = MagicMock()
+        store.put.side_effect = RuntimeError("AccessDenied")
+
+        with patch("lambda_sns_cloudwatch_logs.oversize.log") as mock_log:
+            fitted = OversizeHandler(OVERSIZED_OFFLOAD, store, limit=LIMIT).fit([event("x" * 2500)])
+
+        assert len(fitted) == 3
+        mock_log.warn.assert_called_once()
+
+    def test_default_limit_is_cloudwatch_limit(self):
+        fitted = OversizeHandler().fit([event("x" * (MAX_MESSAGE_BYTES + 1))])
+
+        assert len(fitted) == 2
+
+
+class TestS3Store:
+    """Test cases for S3Store."""
+
+    def test_put(self):
+        client = MagicMock()
+        factory = MagicMock(return_value=client)
+        store = S3Store("bucket", "oversized/", factory)
+
+        assert store.put("abc", b"body") == "s3://bucket/oversized/abc"
+        store.put("def", b"body")
+
+        factory.assert_called_once_with()
+        assert client.put_object.call_args_list[0].kwargs["Key"] == "oversized/abc"
+        assert client.put_object.call_args_list[0].kwargs["Body"] == b"body"
+
+    @pytest.mark.parametrize("bucket, expected", [("", type(None)), ("bucket", S3Store)])
+    def test_make_store(self, bucket, expected):
+        assert isinstance(make_store(bucket), expected)
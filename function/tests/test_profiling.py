@@ -0,0 +1,54 @@
+"""Unit tests for per-stage profiling."""
+
+import time
+import tracemalloc
+
+from lambda_sns_cloudwatch_logs.profiling import NULL_PROFILER, Profiler
+
+
+class TestProfiler:
+    """Test cases for Profiler."""
+
+    def test_laps(self):
+        profiler = Profiler()
+        profiler.lap("config")
+        time.sleep(0.01)
+        profiler.lap("flush")
+
+        report = profiler.report()
+
+        assert list(report["stages"]) == ["config", "flush"]
+        assert report["stages"]["flush"]["wall_ms"] >= 10
+        assert report["stages"]["config"]["wall_ms"] < report["stages"]["flush"]["wall_ms"]
+        assert report["wall_ms"] >= report["stages"]["flush"]["wall_ms"]
+        assert "peak_memory_bytes" not in report
+
+    def test_started_before_creation(self):
+        started = (time.perf_counter() - 1, time.process_time())
+        profiler = Profiler(started=started)
+        profiler.lap("config")
+
+        assert profiler.report()["stages"]["config"]["wall_ms"] >= 1000
+
+    def test_add_accumulates(self):
+        profiler = Profiler()
+        profiler.add("batch", 0.001, 0.0005)
+        profiler.add("batch", 0.002, 0.0005)
+
+        assert profiler.report()["stages"]["batch"] == {"wall_ms": 3.0, "cpu_ms": 1.0}
+
+    def test_peak_memory(self):
+        profiler = Profiler(trace_memory=True)
+        data = [bytearray(1024) for _ in range(1000)]
+
+        report = profiler.report()
+
+        assert report["peak_memory_bytes"] >= 1_000_000
+        assert not tracemalloc.is_tracing()
+        del data
+
+    def test_null_profiler(self):
+        NULL_PROFILER.lap("config")
+        NULL_PROFILER.add("batch", 1, 1)
+
+        assert NULL_PROFILER.report() is None
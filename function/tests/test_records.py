@@ -0,0 +1,41 @@
+"""Unit tests for skipped record bookkeeping."""
+
+from lambda_sns_cloudwatch_logs.records import SkippedRecords, summarize
+
+
+class TestSummarize:
+    """Test cases for summarize."""
+
+    def test_lists_keys_not_values(self):
+        summary = summarize({"EventSource": "aws:sqs", "body": "x" * 100_000})
+
+        assert summary == {"keys": ["EventSource", "body"]}
+
+    def test_many_keys(self):
+        summary = summarize({str(i): i for i in range(25)})
+
+        assert summary["keys"] == [str(i) for i in range(10)]
+        assert summary["more_keys"] == 15
+
+    def test_not_a_dict(self):
+        assert summarize(["record"]) == {"type": "list"}
+
+
+class TestSkippedRecords:
+    """Test cases for SkippedRecords."""
+
+    def test_samples_then_counts(self):
+        skipped = SkippedRecords(sample_size=2)
+
+        logged = [skipped.skip(reason) for reason in ["a", "b", "a", "a"]]
+
+        assert logged == [True, True, False, False]
+        assert skipped.counts == {"a": 3, "b": 1}
+        assert skipped.total == 4
+        assert skipped.unlogged == 2
+
+    def test_nothing_skipped(self):
+        skipped = SkippedRecords()
+
+        assert skipped.total == 0
+        assert skipped.unlogged == 0
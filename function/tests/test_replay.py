@@ -0,0 +1,278 @@
+"""Tests for the replay CLI."""
+
+import gzip
+import io
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.config import Config
+from lambda_sns_cloudwatch_logs.replay import (
+    Checkpoint,
+    InlinePool,
+    Partitioner,
+    ProcessPool,
+    Replay,
+    main,
+    parse_line,
+    write_records,
+)
+from lambda_sns_cloudwatch_logs.writer import WriteResult
+
+
+def sns_line(index, timestamp="2026-10-18T06:15:00.000Z", topic="arn:aws:sns:us-east-1:123456789012:app"):
+    sns = {"Message": f"message {index}", "MessageId": f"id-{index}", "Timestamp": timestamp, "TopicArn": topic}
+    return json.dumps({"Records": [{"EventSource": "aws:sns", "Sns": sns}]})
+
+
+def count_records(records):
+    return {"RecordsProcessed": len(records)}
+
+
+def fail_on_five(records):
+    if any(record["Sns"]["Message"] == "message 5" for record in records):
+        raise RuntimeError("throttled")
+    return {"RecordsProcessed": len(records)}
+
+
+def pid_of_writer(records):
+    return {"RecordsProcessed": len(records), "Worker": os.getpid()}
+
+
+@pytest.fixture
+def events_file(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text("".join(sns_line(index) + "\n" for index in range(10)))
+    return path
+
+
+class TestParseLine:
+    """Test cases for parse_line."""
+
+    def test_lambda_event(self):
+        (record,) = parse_line(sns_line(1) + "\n")
+
+        assert record["Sns"]["Message"] == "message 1"
+
+    def test_single_record(self):
+        record = {"eventSource": "aws:sqs", "body": "queued", "messageId": "m1"}
+
+        assert parse_line(json.dumps(record)) == [record]
+
+    def test_sns_body(self):
+        assert parse_line('{"Message": "hello", "MessageId": "id"}') == [
+            {"EventSource": "aws:sns", "Sns": {"Message": "hello", "MessageId": "id"}}
+        ]
+
+    def test_raw_message(self):
+        assert parse_line("plain text\n") == [{"EventSource": "aws:sns", "Sns": {"Message": "plain text"}}]
+
+    def test_other_json_is_raw(self):
+        assert parse_line('{"level": "info"}') == [{"EventSource": "aws:sns", "Sns": {"Message": '{"level": "info"}'}}]
+
+    def test_raw_format(self):
+        assert parse_line(sns_line(1), "raw")[0]["Sns"]["Message"] == sns_line(1)
+
+    def test_blank_line(self):
+        assert parse_line("  \n") == []
+
+
+class TestPartitioner:
+    """Test cases for Partitioner."""
+
+    def test_same_stream_same_worker(self):
+        partitioner = Partitioner(Config(log_level=20, log_group="g", event_timestamp="sns"), 4)
+        records = [json.loads(sns_line(index, f"2026-10-18T06:{index:02d}:00Z"))["Records"][0] for index in range(20)]
+
+        assert len(partitioner.split(records)) == 1
+
+    def test_keys_follow_stream_and_route(self):
+        config = Config.from_env({
+            "LOG_GROUP": "g", "WRITER_MODE": "batch", "EVENT_TIMESTAMP": "sns",
+            "ROUTING_TABLE": '[{"topic_arn": "*:alerts", "log_group": "alerts"}]',
+        })
+        partitioner = Partitioner(config, 4)
+
+        def key(timestamp, topic="arn:aws:sns:us-east-1:1:app"):
+            return partitioner.key(json.loads(sns_line(1, timestamp, topic))["Records"][0])
+
+        assert key("2026-10-18T06:00:00Z") == "g\n2026-10-18/0600"
+        assert key("2026-10-18T07:00:00Z") == "g\n2026-10-18/0700"
+        assert key("2026-10-18T06:00:00Z", "arn:aws:sns:us-east-1:1:alerts") == "alerts\n2026-10-18/0600"
+
+    def test_ingestion_time_shares_a_stream(self):
+        partitioner = Partitioner(Config(log_level=20, log_group="g"), 4)
+
+        assert partitioner.key(json.loads(sns_line(1))["Records"][0]) == "g\n"
+
+    def test_message_id_shards(self):
+        config = Config(log_level=20, log_group="g", stream_sharding="message_id", stream_shards=8)
+        records = [json.loads(sns_line(index))["Records"][0] for index in range(50)]
+
+        assert len({Partitioner(config, 4).key(record) for record in records}) == 8
+
+    def test_invalid_record(self):
+        assert Partitioner(Config(log_level=20, log_group="g"), 4).key({"EventSource": "aws:s3"}) == ""
+
+
+class TestCheckpoint:
+    """Test cases for Checkpoint."""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        checkpoint = Checkpoint(path)
+        checkpoint.advance("events.jsonl", 1000)
+        checkpoint.save()
+
+        assert Checkpoint(path).done("events.jsonl") == 1000
+        assert Checkpoint(path).done("other.jsonl") == 0
+        assert os.listdir(tmp_path) == ["checkpoint.json"]
+
+    def test_without_file(self):
+        checkpoint = Checkpoint()
+        checkpoint.advance("-", 5)
+        checkpoint.save()
+
+        assert checkpoint.done("-") == 5
+
+
+class TestReplay:
+    """Test cases for Replay."""
+
+    def make(self, write, tmp_path, workers=1, chunk_lines=3):
+        config = Config(log_level=20, log_group="g")
+        pool = InlinePool(write) if workers == 1 else ProcessPool(workers, write)
+        checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+        return Replay(Partitioner(config, workers), pool, checkpoint, chunk_lines)
+
+    def test_replays_every_line(self, events_file, tmp_path):
+        replay = self.make(count_records, tmp_path)
+
+        replay.run([str(events_file)])
+
+        assert replay.lines == 10
+        assert replay.totals["RecordsProcessed"] == 10
+        assert replay.error is None
+        assert Checkpoint(str(tmp_path / "checkpoint.json")).done(str(events_file)) == 10
+
+    def test_gzip_input(self, tmp_path):
+        path = tmp_path / "events.jsonl.gz"
+        with gzip.open(path, "wt") as events:
+            events.write("".join(sns_line(index) + "\n" for index in range(4)))
+        replay = self.make(count_records, tmp_path)
+
+        replay.run([str(path)])
+
+        assert replay.totals["RecordsProcessed"] == 4
+
+    def test_stdin(self, tmp_path):
+        replay = self.make(count_records, tmp_path)
+
+        with patch("sys.stdin", io.StringIO("one\ntwo\n")):
+            replay.run(["-"])
+
+        assert replay.totals["RecordsProcessed"] == 2
+
+    def test_resumes_from_checkpoint(self, events_file, tmp_path):
+        checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+        checkpoint.advance(str(events_file), 6)
+        checkpoint.save()
+        write = MagicMock(side_effect=count_records)
+
+        self.make(write, tmp_path).run([str(events_file)])
+
+        messages = [record["Sns"]["Message"] for call in write.call_args_list for record in call.args[0]]
+        assert messages == [f"message {index}" for index in range(6, 10)]
+
+    def test_failure_stops_before_checkpoint(self, events_file, tmp_path):
+        replay = self.make(fail_on_five, tmp_path)
+
+        replay.run([str(events_file)])
+
+        assert "throttled" in replay.error
+        # Chunks of 3 lines: lines 0-2 are written, line 5 is in the second chunk
+        assert Checkpoint(str(tmp_path / "checkpoint.json")).done(str(events_file)) == 3
+        assert replay.lines == 6
+
+    def test_process_pool(self, tmp_path):
+        path = tmp_path / "events.jsonl"
+        hours = [f"2026-10-18T{hour:02d}:00:00Z" for hour in range(8)]
+        path.write_text("".join(sns_line(index, hours[index % 8]) + "\n" for index in range(40)))
+        config = Config(log_level=20, log_group="g", event_timestamp="sns")
+        checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+        replay = Replay(Partitioner(config, 3), ProcessPool(3, pid_of_writer), checkpoint, 5)
+
+        replay.run([str(path)])
+
+        assert replay.totals["RecordsProcessed"] == 40
+        assert replay.error is None
+        assert Checkpoint(str(tmp_path / "checkpoint.json")).done(str(path)) == 40
+
+
+class TestMain:
+    """Test cases for the command line."""
+
+    @patch("sns_cloudwatch_gw.BatchWriter")
+    def test_writes_through_handler_pipeline(self, mock_writer_class, events_file, tmp_path, capsys):
+        written = []
+
+        def make_writer(client, log_group, log_stream, streams=None):
+            writer = MagicMock(log_group=log_group, log_stream=log_stream)
+            writer.write.side_effect = lambda events, deadline: written.append((log_stream, events)) or WriteResult(
+                calls=1, bytes=sum(len(e["message"]) for e in events)
+            )
+            return writer
+
+        mock_writer_class.side_effect = make_writer
+
+        with patch("boto3.client"):
+            status = main([str(events_file), "--workers", "1", "--chunk-lines", "3",
+                           "--checkpoint", str(tmp_path / "checkpoint.json")])
+
+        assert status == 0
+        summary = json.loads(capsys.readouterr().out.splitlines()[-1])
+        assert summary["lines"] == 10
+        assert summary["RecordsProcessed"] == 10
+        assert summary["PutLogEventsCalls"] == 4
+        # Each event keeps its SNS time and goes to the stream for it
+        assert {stream for stream, _ in written} == {"2026-10-18/0600"}
+        assert written[0][1][0]["timestamp"] == 1792304100000
+
+    @patch("sns_cloudwatch_gw.BatchWriter")
+    def test_failed_sqs_records_stop_checkpoint(self, mock_writer_class, tmp_path, capsys):
+        path = tmp_path / "sqs.jsonl"
+        record = {"eventSource": "aws:sqs", "messageId": "sqs-1", "body": "archived"}
+        path.write_text(json.dumps(record) + "\n")
+        mock_writer_class.side_effect = lambda client, log_group, log_stream, streams=None: MagicMock(
+            log_group=log_group, log_stream=log_stream, **{"write.side_effect": RuntimeError("unavailable")}
+        )
+        checkpoint = tmp_path / "checkpoint.json"
+
+        with patch("boto3.client"), patch.dict(os.environ, {"DEAD_LETTER_TARGET": "none"}):
+            status = main([str(path), "--workers", "1", "--checkpoint", str(checkpoint)])
+
+        assert status == 1
+        assert "1 SQS message" in json.loads(capsys.readouterr().out.splitlines()[-1])["error"]
+        assert Checkpoint(str(checkpoint)).done(str(path)) == 0
+
+    def test_failure_exit_status(self, events_file, capsys):
+        assert main([str(events_file), "--workers", "1"], write=fail_on_five) == 1
+        assert "throttled" in json.loads(capsys.readouterr().out.splitlines()[-1])["error"]
+
+    def test_missing_file(self, tmp_path, capsys):
+        assert main([str(tmp_path / "missing.jsonl"), "--workers", "1"], write=count_records) == 1
+
+    def test_invalid_workers(self):
+        with pytest.raises(SystemExit):
+            main(["--workers", "0"])
+
+    def test_write_records(self):
+        with patch("sns_cloudwatch_gw.BatchWriter") as mock_writer_class, patch("boto3.client"):
+            mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+            with patch.dict(os.environ, {"WRITER_MODE": "batch"}):
+                metrics = write_records(json.loads(sns_line(1))["Records"])
+
+        assert metrics["RecordsProcessed"] == 1
+        assert metrics["PutLogEventsCalls"] == 1
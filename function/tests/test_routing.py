@@ -0,0 +1,104 @@
+"""Unit tests for the message routing table."""
+
+import json
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.routing import Route, RoutingError, load_routes, match_route, parse_routes
+
+
+def sns_body(topic="arn:aws:sns:us-east-1:123456789012:example-topic", subject="Test", **attributes):
+    return {
+        "TopicArn": topic,
+        "Subject": subject,
+        "Message": "message",
+        "MessageAttributes": {name: {"Type": "String", "Value": value} for name, value in attributes.items()},
+    }
+
+
+class TestRoute:
+    """Test cases for matching a single route."""
+
+    def test_no_conditions_matches_everything(self):
+        assert Route.from_dict({"log_group": "all"}).matches(sns_body())
+
+    def test_exact_topic(self):
+        route = Route.from_dict({"log_group": "g", "topic_arn": "arn:aws:sns:us-east-1:123456789012:example-topic"})
+        assert route.matches(sns_body())
+        assert not route.matches(sns_body(topic="arn:aws:sns:us-east-1:123456789012:example-topic-2"))
+
+    def test_topic_pattern(self):
+        route = Route.from_dict({"log_group": "g", "topic_arn": "arn:aws:sns:*:*:alerts-*"})
+        assert route.matches(sns_body(topic="arn:aws:sns:eu-west-1:123456789012:alerts-prod"))
+        assert not route.matches(sns_body())
+
+    def test_subject_pattern(self):
+        route = Route.from_dict({"log_group": "g", "subject": "ALARM: *"})
+        assert route.matches(sns_body(subject='ALARM: "cpu" in US East'))
+        assert not route.matches(sns_body(subject="OK: cpu"))
+        assert not route.matches({"Message": "no subject"})
+
+    def test_attributes(self):
+        route = Route.from_dict({"log_group": "g", "attributes": {"service": "billing", "env": "prod"}})
+        assert route.matches(sns_body(service="billing", env="prod", extra="x"))
+        assert not route.matches(sns_body(service="billing"))
+        assert not route.matches(sns_body(service="billing", env="dev"))
+        assert not route.matches({"Message": "no attributes"})
+
+    def test_all_conditions_must_match(self):
+        route = Route.from_dict({"log_group": "g", "subject": "Test", "attributes": {"service": "billing"}})
+        assert route.matches(sns_body(service="billing"))
+        assert not route.matches(sns_body(subject="Other", service="billing"))
+
+    def test_null_optional_fields(self):
+        # Terraform jsonencode() writes unset optional attributes as null
+        route = Route.from_dict({
+            "log_group": "g", "log_stream_format": None, "topic_arn": None, "subject": None, "attributes": None,
+        })
+        assert route.log_stream_format is None
+        assert route.matches(sns_body())
+
+    @pytest.mark.parametrize("spec", [
+        {},
+        {"log_group": ""},
+        {"log_group": "g", "bogus": 1},
+        {"log_group": "g", "attributes": ["service"]},
+        "log_group",
+    ])
+    def test_invalid(self, spec):
+        with pytest.raises(RoutingError):
+            Route.from_dict(spec)
+
+
+class TestRoutingTable:
+    """Test cases for loading a table and picking a route."""
+
+    def test_first_match_wins(self):
+        routes = parse_routes(json.dumps([
+            {"attributes": {"service": "billing"}, "log_group": "billing"},
+            {"subject": "Test", "log_group": "tests"},
+        ]))
+        assert match_route(routes, sns_body(service="billing")).log_group == "billing"
+        assert match_route(routes, sns_body()).log_group == "tests"
+        assert match_route(routes, sns_body(subject="Other")) is None
+
+    @pytest.mark.parametrize("document", ["not json", '{"log_group": "g"}'])
+    def test_parse_invalid(self, document):
+        with pytest.raises(RoutingError):
+            parse_routes(document)
+
+    def test_load_inline_and_file(self, tmp_path):
+        path = tmp_path / "routes.json"
+        path.write_text(json.dumps([{"log_group": "from-file"}]))
+
+        routes = load_routes(json.dumps([{"log_group": "inline", "subject": "x"}]), str(path))
+
+        assert [route.log_group for route in routes] == ["inline", "from-file"]
+
+    def test_load_nothing(self):
+        assert load_routes(None, None) == ()
+        assert load_routes("", "") == ()
+
+    def test_load_missing_file(self, tmp_path):
+        with pytest.raises(RoutingError, match="Cannot read"):
+            load_routes(None, str(tmp_path / "missing.json"))
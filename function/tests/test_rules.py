@@ -0,0 +1,152 @@
+"""Unit tests for the filter and transform rules."""
+
+import json
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.rules import (
+    REDACTED,
+    Rule,
+    RuleError,
+    apply_rules,
+    load_rules,
+    parse_rules,
+    truncate,
+)
+
+
+def sns(message, **fields):
+    return dict(fields, Message=message)
+
+
+class TestRule:
+    """Test cases for compiling rules."""
+
+    def test_terraform_nulls_ignored(self):
+        rule = Rule.from_dict({"action": "drop", "subject": None, "rate": None, "json": {"level": "debug"}})
+
+        assert rule.action == "drop"
+        assert rule.subject is None
+
+    @pytest.mark.parametrize("spec", [
+        {"action": "keep"},
+        {"action": "drop", "unknown": 1},
+        {"action": "sample"},
+        {"action": "sample", "rate": 1.5},
+        {"action": "redact"},
+        {"action": "redact", "patterns": ["("]},
+        {"action": "truncate"},
+        {"action": "truncate", "max_bytes": 2},
+        {"action": "drop", "json": ["level"]},
+        {"action": "drop", "json": {"": "x"}},
+        "drop",
+    ])
+    def test_invalid(self, spec):
+        with pytest.raises(RuleError):
+            Rule.from_dict(spec)
+
+    def test_parse_rules(self):
+        rules = parse_rules('[{"action": "drop"}, {"action": "truncate", "max_bytes": 10}]')
+
+        assert [rule.action for rule in rules] == ["drop", "truncate"]
+
+    @pytest.mark.parametrize("document", ["not json", '{"action": "drop"}'])
+    def test_parse_rules_invalid(self, document):
+        with pytest.raises(RuleError):
+            parse_rules(document)
+
+    def test_load_rules_inline_first(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text('[{"action": "truncate", "max_bytes": 10}]')
+
+        rules = load_rules('[{"action": "drop", "subject": "x"}]', str(path))
+
+        assert [rule.action for rule in rules] == ["drop", "truncate"]
+
+    def test_load_rules_missing_file(self, tmp_path):
+        with pytest.raises(RuleError, match="Cannot read"):
+            load_rules(None, str(tmp_path / "missing.json"))
+
+
+class TestApplyRules:
+    """Test cases for apply_rules."""
+
+    def test_no_rules(self):
+        assert apply_rules((), sns("hello")) == "hello"
+
+    def test_drop_by_json_path(self):
+        rules = parse_rules('[{"json": {"level": "debug*", "ctx.env": "dev"}, "action": "drop"}]')
+
+        assert apply_rules(rules, sns('{"level": "debug2", "ctx": {"env": "dev"}}')) is None
+        assert apply_rules(rules, sns('{"level": "debug", "ctx": {"env": "prod"}}')) is not None
+        assert apply_rules(rules, sns('{"level": "info", "ctx": {"env": "dev"}}')) is not None
+        assert apply_rules(rules, sns("level debug")) == "level debug"
+
+    def test_json_match_non_string_values(self):
+        rules = parse_rules('[{"json": {"status": "5*", "ok": "false"}, "action": "drop"}]')
+
+        assert apply_rules(rules, sns('{"status": 503, "ok": false}')) is None
+        assert apply_rules(rules, sns('{"status": 200, "ok": false}')) is not None
+
+    def test_drop_by_subject_and_attributes(self):
+        rules = parse_rules('[{"subject": "DEBUG*", "attributes": {"env": "dev"}, "action": "drop"}]')
+        attributes = {"env": {"Type": "String", "Value": "dev"}}
+
+        assert apply_rules(rules, sns("m", Subject="DEBUG: x", MessageAttributes=attributes)) is None
+        assert apply_rules(rules, sns("m", Subject="DEBUG: x")) == "m"
+        assert apply_rules(rules, sns("m", Subject="INFO", MessageAttributes=attributes)) == "m"
+
+    def test_sample_follows_message_id(self):
+        rules = parse_rules('[{"topic_arn": "*:chatty", "action": "sample", "rate": 0.25}]')
+        records = [sns("m", TopicArn="arn:aws:sns:us-east-1:1:chatty", MessageId=f"id-{i}") for i in range(2000)]
+
+        kept = [record["MessageId"] for record in records if apply_rules(rules, record) is not None]
+
+        assert 400 < len(kept) < 600
+        assert kept == [record["MessageId"] for record in records if apply_rules(rules, record) is not None]
+        assert apply_rules(rules, sns("m", TopicArn="arn:aws:sns:us-east-1:1:quiet", MessageId="x")) == "m"
+
+    def test_sample_rate_bounds(self):
+        keep_all = parse_rules('[{"action": "sample", "rate": 1}]')
+        keep_none = parse_rules('[{"action": "sample", "rate": 0}]')
+
+        assert apply_rules(keep_all, sns("m", MessageId="a")) == "m"
+        assert apply_rules(keep_none, sns("m", MessageId="a")) is None
+        assert apply_rules(keep_none, sns("m")) is None
+
+    def test_redact_fields(self):
+        rules = parse_rules('[{"action": "redact", "fields": ["password", "user.token", "absent.key"]}]')
+        record = sns('{"password": "hunter2", "user": {"name": "ann", "token": "abc"}}')
+
+        message = apply_rules(rules, record)
+
+        assert json.loads(message) == {"password": REDACTED, "user": {"name": "ann", "token": REDACTED}}
+        # The record itself is left alone
+        assert "hunter2" in record["Message"]
+
+    def test_redact_fields_absent_keeps_message(self):
+        rules = parse_rules('[{"action": "redact", "fields": ["password"]}]')
+
+        assert apply_rules(rules, sns('{"user": "ann"}')) == '{"user": "ann"}'
+        assert apply_rules(rules, sns("password=x")) == "password=x"
+
+    def test_redact_patterns(self):
+        rules = parse_rules(r'[{"action": "redact", "patterns": ["\\d{4}-\\d{4}", "secret=\\w+"]}]')
+
+        assert apply_rules(rules, sns("card 1234-5678 secret=abc ok")) == f"card {REDACTED} {REDACTED} ok"
+
+    def test_rules_apply_in_order(self):
+        rules = parse_rules('''[
+            {"action": "redact", "fields": ["token"]},
+            {"action": "truncate", "max_bytes": 20},
+            {"json": {"token": "*"}, "action": "drop"}
+        ]''')
+
+        # The truncated body is no longer JSON, so the drop rule does not match
+        assert apply_rules(rules, sns('{"token": "abc", "data": "0123456789"}')) == '{"token":"[REDACT...'
+
+    def test_truncate(self):
+        assert truncate("hello", 10) == "hello"
+        assert truncate("hello world", 8) == "hello..."
+        # Never ends in part of a character
+        assert truncate("ééééé", 8) == "éé..."
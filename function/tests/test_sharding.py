@@ -0,0 +1,50 @@
+"""Unit tests for log stream sharding."""
+
+from lambda_sns_cloudwatch_logs.sharding import StreamSharder, instance_id, make_sharder
+
+
+class TestInstanceId:
+    """Test cases for instance_id."""
+
+    def test_from_lambda_log_stream(self):
+        env = {"AWS_LAMBDA_LOG_STREAM_NAME": "2025/07/29/[$LATEST]0123456789abcdef0123456789abcdef"}
+
+        assert instance_id(env) == "0123456789abcdef0123456789abcdef"
+
+    def test_outside_lambda(self):
+        first, second = instance_id({}), instance_id({})
+
+        assert len(first) == 32
+        assert first != second
+
+
+class TestStreamSharder:
+    """Test cases for StreamSharder."""
+
+    def test_off(self):
+        assert make_sharder("off") is None
+
+    def test_instance(self):
+        sharder = make_sharder("instance", instance="abc")
+
+        assert sharder.shard("2025-07-29/0600", "msg-1") == "2025-07-29/0600/abc"
+        assert sharder.shard("2025-07-29/0600") == "2025-07-29/0600/abc"
+
+    def test_message_id(self):
+        sharder = StreamSharder("message_id", shards=16, instance="abc")
+
+        streams = {sharder.shard("2025-07-29/0600", f"msg-{i}") for i in range(1000)}
+
+        assert streams == {f"2025-07-29/0600/{shard:02d}" for shard in range(16)}
+
+    def test_message_id_is_stable(self):
+        first = StreamSharder("message_id", shards=8, instance="a")
+        second = StreamSharder("message_id", shards=8, instance="b")
+
+        assert first.shard("s", "msg-42") == second.shard("s", "msg-42")
+        assert first.shard("s") == "s/0"
+
+    def test_shards_share_prefix(self):
+        sharder = StreamSharder("message_id", shards=100, instance="abc")
+
+        assert all(sharder.shard("2025-07-29/0600", f"m{i}").startswith("2025-07-29/0600/") for i in range(50))
@@ -6,14 +6,21 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock
 import pytest
 import datetime
-import pytz
 import json
+import structlog
+import threading
+import time
 
 # Add parent directory to Python path for imports
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import sns_cloudwatch_gw
+from lambda_sns_cloudwatch_logs.batch import MAX_MESSAGE_BYTES
+from lambda_sns_cloudwatch_logs.deadline import DEADLINE_MARGIN_SECONDS
+from lambda_sns_cloudwatch_logs.extension import HandoffServer
+from lambda_sns_cloudwatch_logs.flush import FlushError
+from lambda_sns_cloudwatch_logs.writer import WriteResult
 
 
 def create_mock_logger():
@@ -44,7 +51,7 @@ class TestHandler:
     - Edge cases (empty messages, large messages, JSON messages)
     """
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_sns_event_success(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
         """Test successful processing of SNS event."""
         setup_cloudwatch_handler_mock(mock_cw_handler_class, mock_watchtower_handler)
@@ -65,7 +72,36 @@ class TestHandler:
             
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_handler_json_message_format(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
+        """Test that MESSAGE_FORMAT=json logs the message with its SNS metadata."""
+        setup_cloudwatch_handler_mock(mock_cw_handler_class, mock_watchtower_handler)
+        mock_cw_logger = create_mock_logger()
+
+        with patch.dict(os.environ, {'MESSAGE_FORMAT': 'json'}):
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=mock_cw_logger):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        document = json.loads(mock_cw_logger.info.call_args[0][0])
+        assert document["message"] == "This is a test log message from SNS"
+        assert document["subject"] == "Test Message"
+        assert document["topic_arn"] == sns_event["Records"][0]["Sns"]["TopicArn"]
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_handler_emf_metrics(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler, capsys):
+        """Test that watchtower mode reports its records and bytes as EMF metrics."""
+        setup_cloudwatch_handler_mock(mock_cw_handler_class, mock_watchtower_handler)
+
+        with patch.dict(os.environ, {'METRICS_NAMESPACE': 'SnsLogs'}):
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=create_mock_logger()):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        document = json.loads(capsys.readouterr().out)
+        assert document["RecordsProcessed"] == 1
+        assert document["BytesWritten"] == len("This is a test log message from SNS")
+        assert document["Destinations"] == 1
+
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_multiple_records(self, mock_cw_handler_class, sns_event_multiple_records, lambda_context, mock_watchtower_handler):
         """Test handling of multiple SNS records - should process all records."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
@@ -86,7 +122,7 @@ class TestHandler:
             
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_non_sns_event(self, mock_cw_handler_class, non_sns_event, lambda_context, mock_watchtower_handler):
         """Test handling of non-SNS event."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
@@ -103,7 +139,7 @@ class TestHandler:
             
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_malformed_event(self, mock_cw_handler_class, malformed_event, lambda_context, mock_watchtower_handler):
         """Test handling of malformed event without Records."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
@@ -119,7 +155,7 @@ class TestHandler:
             
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_empty_event(self, mock_cw_handler_class, empty_event, lambda_context, mock_watchtower_handler):
         """Test handling of empty event."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
@@ -134,25 +170,27 @@ class TestHandler:
             
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
-    def test_handler_log_level_from_env(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_handler_log_level_from_env(self, mock_cw_handler_class, non_sns_event, lambda_context, mock_watchtower_handler):
         """Test that log level is correctly set from environment."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
         mock_watchtower_handler.level = logging.INFO
         
         with patch.dict(os.environ, {'LOG_LEVEL': 'DEBUG'}):
-            with patch('sns_cloudwatch_gw.structlog.configure') as mock_configure:
-                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            with patch('structlog.configure') as mock_configure:
+                sns_cloudwatch_gw.handler(non_sns_event, lambda_context)
                 
-                mock_configure.assert_called_once()
+                mock_configure.assert_called_once_with(
+                    wrapper_class=structlog.make_filtering_bound_logger(logging.DEBUG)
+                )
                 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_stream_name_format(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
         """Test CloudWatch log stream name format with default (hourly) format."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
         mock_watchtower_handler.level = logging.INFO
         
-        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=pytz.utc)
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
         
         with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
             mock_datetime.now.return_value = fixed_time
@@ -163,13 +201,13 @@ class TestHandler:
             # Default format should now be hourly
             assert call_args.kwargs['stream_name'] == '2023-06-15/1000'
     
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_custom_stream_name_format(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
         """Test CloudWatch log stream name with custom format from environment."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
         mock_watchtower_handler.level = logging.INFO
         
-        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=pytz.utc)
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
         
         with patch.dict(os.environ, {'LOG_STREAM_FORMAT': '%Y/%m/%d/hour-%H'}):
             with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
@@ -187,7 +225,7 @@ class TestHandler:
                 with pytest.raises(Exception):
                     sns_cloudwatch_gw.handler(sns_event, lambda_context)
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_cloudwatch_handler_exception(self, mock_cw_handler_class, sns_event, lambda_context):
         """Test handler behavior when CloudWatch handler raises exception."""
         mock_cw_handler_class.side_effect = Exception("CloudWatch handler error")
@@ -230,7 +268,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             # Clean up
             os.unlink(temp_file)
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_sns_event_with_json_message(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test processing of SNS event with JSON message."""
         json_message = {"level": "ERROR", "message": "Something went wrong", "timestamp": "2023-01-01T00:00:00Z"}
@@ -254,7 +292,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             mock_cw_logger.info.assert_called_once_with(json.dumps(json_message))
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_empty_sns_message(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of SNS event with empty message."""
         sns_event_empty = {
@@ -278,7 +316,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             mock_watchtower_handler.flush.assert_called_once()
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_large_message(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of SNS event with large message."""
         large_message = "x" * 10000  # 10KB message
@@ -302,7 +340,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             mock_cw_logger.info.assert_called_once_with(large_message)
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')  
+    @patch('watchtower.CloudWatchLogHandler')  
     def test_handler_flush_exception(self, mock_cw_handler_class, sns_event, lambda_context):
         """Test handler behavior when flush() raises exception."""
         mock_handler = MagicMock()
@@ -321,7 +359,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             assert "Flush failed" in str(exc_info.value)
             mock_cw_logger.info.assert_called_once()
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_records_without_eventsource(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of event with Records but missing EventSource."""
         event_no_source = {
@@ -351,19 +389,17 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
         ('CRITICAL', logging.CRITICAL),
         ('INFO', logging.INFO)
     ])
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_different_log_levels(self, mock_cw_handler_class, env_level, expected_level, 
                                          sns_event, lambda_context, mock_watchtower_handler):
         """Test handler with different LOG_LEVEL environment settings."""
         mock_cw_handler_class.return_value = mock_watchtower_handler
         
         with patch.dict(os.environ, {'LOG_LEVEL': env_level}):
-            with patch('sns_cloudwatch_gw.env.log_level') as mock_log_level:
-                mock_log_level.return_value = expected_level
-                
-                sns_cloudwatch_gw.handler(sns_event, lambda_context)
-                
-                mock_log_level.assert_called_with("LOG_LEVEL", logging.INFO)
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            
+            assert sns_cloudwatch_gw._config.log_level == expected_level
+            assert sns_cloudwatch_gw.log._level == expected_level
                 
     @pytest.mark.parametrize("message_content,description", [
         ("Simple text message", "plain text"),
@@ -372,7 +408,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
         ("🚀 Unicode message with emojis 🎉", "unicode characters"),
         ("<xml>HTML/XML content</xml>", "markup content")
     ])
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_various_message_types(self, mock_cw_handler_class, message_content, description,
                                          lambda_context, mock_watchtower_handler):
         """Test handler with various message content types."""
@@ -397,7 +433,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             assert result is None
 
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_mixed_event_sources(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of event with mixed SNS and non-SNS records."""
         mixed_event = {
@@ -445,7 +481,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
                 mock_watchtower_handler.flush.assert_called_once()
                 assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_sns_record_missing_message(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of SNS record missing the Message field."""
         event_no_message = {
@@ -474,7 +510,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
             mock_watchtower_handler.flush.assert_called_once()
             assert result is None
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     @patch('sns_cloudwatch_gw.logging.getLogger')
     def test_handler_no_double_logging(self, mock_get_logger, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
         """Test that SNS messages are not propagated to root logger (no double logging)."""
@@ -508,7 +544,7 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
         # and not inadvertently attached to the root logger, which would cause double logging
         assert len(root_handlers) == 0
 
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
+    @patch('watchtower.CloudWatchLogHandler')
     def test_handler_empty_records_list(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
         """Test handling of event with empty Records list."""
         empty_records_event = {
@@ -524,26 +560,982 @@ with patch('sns_cloudwatch_gw.handler') as mock_handler:
         assert result is None
 
 
+class TestColdStartConfig:
+    """Test cases for resolving configuration once per execution environment."""
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_config_not_reloaded_on_warm_invocation(self, mock_cw_handler_class, non_sns_event, lambda_context,
+                                                    mock_watchtower_handler):
+        """Test that logging is configured once, not on every invocation."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+
+        with patch('structlog.configure') as mock_configure:
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=create_mock_logger()) as mock_get_logger:
+                sns_cloudwatch_gw.handler(non_sns_event, lambda_context)
+                sns_cloudwatch_gw.handler(non_sns_event, lambda_context)
+
+        mock_configure.assert_called_once()
+        mock_get_logger.assert_called_once_with("cloudwatch")
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_config_reloaded_after_reset(self, mock_cw_handler_class, sns_event, lambda_context,
+                                         mock_watchtower_handler):
+        """Test that the environment is only read again once the configuration is reset."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+
+        sns_cloudwatch_gw.handler(sns_event, lambda_context)
+        first = sns_cloudwatch_gw._config
+        with patch.dict(os.environ, {'LOG_GROUP': 'other-log-group'}):
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            assert sns_cloudwatch_gw._config is first
+            sns_cloudwatch_gw.reset_config()
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert first.log_group == 'test-log-group'
+        assert sns_cloudwatch_gw._config.log_group == 'other-log-group'
+        assert mock_cw_handler_class.call_args.kwargs['log_group'] == 'other-log-group'
+
+
+class TestWriterCache:
+    """Test cases for reusing CloudWatch writers across warm invocations."""
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_writer_reused_across_invocations(self, mock_cw_handler_class, sns_event, lambda_context, mock_watchtower_handler):
+        """Test that warm invocations reuse the writer instead of stacking handlers."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+        mock_cw_logger = create_mock_logger()
+
+        with patch('sns_cloudwatch_gw.logging.getLogger', return_value=mock_cw_logger):
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_cw_handler_class.assert_called_once()
+        mock_cw_logger.addHandler.assert_called_once_with(mock_watchtower_handler)
+        assert mock_cw_logger.info.call_count == 2
+        assert mock_watchtower_handler.flush.call_count == 2
+        mock_watchtower_handler.close.assert_not_called()
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_writer_rotated_when_stream_changes(self, mock_cw_handler_class, sns_event, lambda_context):
+        """Test that a new stream bucket closes the old writer and keeps the shared client."""
+        first_writer, second_writer = MagicMock(), MagicMock()
+        mock_cw_handler_class.side_effect = [first_writer, second_writer]
+        mock_cw_logger = create_mock_logger()
+
+        times = [
+            datetime.datetime(2023, 6, 15, 10, 59, 59, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2023, 6, 15, 11, 0, 0, tzinfo=datetime.timezone.utc),
+        ]
+        with patch('sns_cloudwatch_gw.logging.getLogger', return_value=mock_cw_logger):
+            with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                mock_datetime.now.side_effect = times
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        stream_names = [c.kwargs['stream_name'] for c in mock_cw_handler_class.call_args_list]
+        assert stream_names == ['2023-06-15/1000', '2023-06-15/1100']
+        clients = [c.kwargs['boto3_client'] for c in mock_cw_handler_class.call_args_list]
+        assert clients == [sns_cloudwatch_gw._logs_client] * 2
+        first_writer.close.assert_called_once()
+        mock_cw_logger.removeHandler.assert_called_once_with(first_writer)
+        second_writer.close.assert_not_called()
+        assert list(sns_cloudwatch_gw._writers.values()) == [second_writer]
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_known_log_group_not_looked_up_again(self, mock_cw_handler_class, sns_event, lambda_context):
+        """Test that a rotated writer skips watchtower's log group lookup."""
+        mock_cw_handler_class.side_effect = [MagicMock(), MagicMock()]
+
+        times = [
+            datetime.datetime(2023, 6, 15, 10, 59, 59, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2023, 6, 15, 11, 0, 0, tzinfo=datetime.timezone.utc),
+        ]
+        with patch('sns_cloudwatch_gw.logging.getLogger', return_value=create_mock_logger()):
+            with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                mock_datetime.now.side_effect = times
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        create_log_group = [c.kwargs['create_log_group'] for c in mock_cw_handler_class.call_args_list]
+        assert create_log_group == [True, False]
+
+
+class TestBatchMode:
+    """Test cases for the direct PutLogEvents writer mode."""
+
+    @pytest.fixture(autouse=True)
+    def batch_mode(self):
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch'}):
+            yield
+
+    @patch('watchtower.CloudWatchLogHandler')
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_batch_mode_writes_all_messages(self, mock_writer_class, mock_cw_handler_class,
+                                            sns_event_multiple_records, lambda_context):
+        """Test that batch mode hands every message to one writer and bypasses watchtower."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+        mock_client = MagicMock()
+
+        with patch('boto3.client', return_value=mock_client):
+            with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                mock_datetime.now.return_value = fixed_time
+                result = sns_cloudwatch_gw.handler(sns_event_multiple_records, lambda_context)
+
+        mock_writer_class.assert_called_once_with(mock_client, 'test-log-group', '2023-06-15/1000',
+                                                  streams=sns_cloudwatch_gw._streams)
+        timestamp = int(fixed_time.timestamp() * 1000)
+        mock_writer_class.return_value.write.assert_called_once()
+        assert mock_writer_class.return_value.write.call_args[0][0] == [
+            {"timestamp": timestamp, "message": "First test log message"},
+            {"timestamp": timestamp, "message": "Second test log message"},
+        ]
+        mock_cw_handler_class.assert_not_called()
+        assert result is None
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_batch_mode_reuses_client(self, mock_writer_class, sns_event, lambda_context):
+        """Test that the logs client is created once for warm invocations."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        with patch('boto3.client') as mock_boto3_client:
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_boto3_client.assert_called_once()
+        assert mock_boto3_client.call_args.args == ("logs",)
+        assert mock_writer_class.return_value.write.call_count == 2
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_client_rebuilt_when_settings_change(self, mock_writer_class, sns_event, lambda_context):
+        """Test that the shared client follows the client settings and is rebuilt when they change."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        with patch('boto3.client') as mock_boto3_client:
+            with patch.dict(os.environ, {'FLUSH_CONCURRENCY': '8'}):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            sns_cloudwatch_gw.reset_config()
+            with patch.dict(os.environ, {'FLUSH_CONCURRENCY': '8', 'READ_TIMEOUT': '1.5'}):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        configs = [c.kwargs['config'] for c in mock_boto3_client.call_args_list]
+        assert [(c.max_pool_connections, c.read_timeout) for c in configs] == [(8, 10.0), (8, 1.5)]
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_batch_mode_skips_bad_records(self, mock_writer_class, non_sns_event, lambda_context):
+        """Test that no write is made when no record carries an SNS message."""
+        mock_log = MagicMock()
+
+        with patch('sns_cloudwatch_gw.log', mock_log):
+            sns_cloudwatch_gw.handler(non_sns_event, lambda_context)
+
+        mock_log.warn.assert_called_once()
+        mock_writer_class.assert_not_called()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_bad_record_burst_sampled(self, mock_writer_class, lambda_context):
+        """Test that a burst of bad records is logged as a few summaries and a count, not in full."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        payload = "x" * 100_000
+        event = {"Records": [{"EventSource": "aws:sqs", "body": payload} for _ in range(100)] + [
+            {"EventSource": "aws:sns", "Sns": {"Message": "good"}},
+        ]}
+        mock_log = MagicMock()
+
+        with patch('boto3.client'):
+            with patch('sns_cloudwatch_gw.log', mock_log):
+                sns_cloudwatch_gw.handler(event, lambda_context)
+
+        warnings = mock_log.warn.call_args_list
+        assert len(warnings) == 4
+        assert all(w.args[0] == "Skipping non-SNS record" for w in warnings[:3])
+        assert warnings[3].kwargs == {"skipped": {"Skipping non-SNS record": 100}, "not_logged": 97}
+        assert payload not in repr(warnings)
+        assert mock_writer_class.return_value.write.call_args[0][0][0]["message"] == "good"
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_batch_mode_malformed_event(self, mock_writer_class, malformed_event, lambda_context):
+        """Test batch mode handling of an event without Records."""
+        mock_log = MagicMock()
+
+        with patch('sns_cloudwatch_gw.log', mock_log):
+            sns_cloudwatch_gw.handler(malformed_event, lambda_context)
+
+        assert mock_log.warn.call_args[0][0] == "Unexpected event format - missing Records"
+        mock_writer_class.assert_not_called()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_sns_timestamp_routes_by_message_time(self, mock_writer_class, lambda_context):
+        """Test that EVENT_TIMESTAMP=sns stamps events with and routes them by the SNS Timestamp."""
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"Message": "late", "Timestamp": "2023-06-15T09:59:59.500Z"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": "on time", "Timestamp": "2023-06-15T10:00:00.000Z"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": "no timestamp"}},
+        ]}
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+        fromisoformat = datetime.datetime.fromisoformat
+        writers = {}
+
+        def make_writer(client, log_group, log_stream, streams=None):
+            writers[log_stream] = MagicMock()
+            writers[log_stream].write.return_value = WriteResult(calls=1)
+            return writers[log_stream]
+
+        mock_writer_class.side_effect = make_writer
+
+        with patch.dict(os.environ, {'EVENT_TIMESTAMP': 'sns'}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    mock_datetime.fromisoformat.side_effect = fromisoformat
+                    sns_cloudwatch_gw.handler(event, lambda_context)
+
+        assert set(writers) == {'2023-06-15/0900', '2023-06-15/1000'}
+        assert writers['2023-06-15/0900'].write.call_args[0][0] == [
+            {"timestamp": 1686823199500, "message": "late"},
+        ]
+        assert writers['2023-06-15/1000'].write.call_args[0][0] == [
+            {"timestamp": 1686823200000, "message": "on time"},
+            {"timestamp": int(fixed_time.timestamp() * 1000), "message": "no timestamp"},
+        ]
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_ingestion_timestamp_by_default(self, mock_writer_class, sns_event_multiple_records, lambda_context):
+        """Test that the SNS Timestamp is ignored unless EVENT_TIMESTAMP=sns."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        with patch('boto3.client'):
+            sns_cloudwatch_gw.handler(sns_event_multiple_records, lambda_context)
+
+        mock_writer_class.assert_called_once()
+        events = mock_writer_class.return_value.write.call_args[0][0]
+        assert events[0]["timestamp"] == events[1]["timestamp"] != 1672531200000
+
+    def test_unknown_event_timestamp(self, sns_event, lambda_context):
+        """Test that an unknown EVENT_TIMESTAMP is rejected."""
+        with patch.dict(os.environ, {'EVENT_TIMESTAMP': 'sundial'}):
+            with pytest.raises(ValueError, match="EVENT_TIMESTAMP"):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_routing_table_fans_out(self, mock_writer_class, lambda_context):
+        """Test that routed messages get one writer per destination log group and stream."""
+        routes = [
+            {"attributes": {"service": "billing"}, "log_group": "billing-logs"},
+            {"subject": "ALARM*", "log_group": "alarm-logs", "log_stream_format": "%Y-%m-%d"},
+        ]
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {
+                "Message": "invoice", "MessageAttributes": {"service": {"Type": "String", "Value": "billing"}},
+            }},
+            {"EventSource": "aws:sns", "Sns": {"Message": "cpu high", "Subject": "ALARM: cpu"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": "hello"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": "disk high", "Subject": "ALARM: disk"}},
+        ]}
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+        writes = {}
+
+        def make_writer(client, log_group, log_stream, streams=None):
+            def write(events, deadline):
+                writes.setdefault((log_group, log_stream), []).extend(e["message"] for e in events)
+                return WriteResult(calls=1)
+
+            writer = MagicMock(log_group=log_group, log_stream=log_stream)
+            writer.write.side_effect = write
+            return writer
+
+        mock_writer_class.side_effect = make_writer
+
+        with patch.dict(os.environ, {'ROUTING_TABLE': json.dumps(routes)}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    sns_cloudwatch_gw.handler(event, lambda_context)
+
+        assert writes == {
+            ('billing-logs', '2023-06-15/1000'): ["invoice"],
+            ('alarm-logs', '2023-06-15'): ["cpu high", "disk high"],
+            ('test-log-group', '2023-06-15/1000'): ["hello"],
+        }
+
+    def test_flush_executor_created_at_cold_start(self):
+        """Test that the flush pool is sized from FLUSH_CONCURRENCY and kept while it is unchanged."""
+        with patch.dict(os.environ, {'FLUSH_CONCURRENCY': '2'}):
+            sns_cloudwatch_gw._get_config()
+            executor = sns_cloudwatch_gw._flush_executor
+            sns_cloudwatch_gw._get_config()
+            assert sns_cloudwatch_gw._flush_executor is executor
+            assert executor._max_workers == 2
+
+        sns_cloudwatch_gw.reset_config()
+        with patch.dict(os.environ, {'FLUSH_CONCURRENCY': '3'}):
+            sns_cloudwatch_gw._get_config()
+            assert sns_cloudwatch_gw._flush_executor._max_workers == 3
+            assert executor._shutdown
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_flush_failure_propagates(self, mock_writer_class, sns_event, lambda_context):
+        """Test that a failed write fails the invocation so the event is retried."""
+        mock_writer_class.return_value.write.side_effect = Exception("Flush failed")
+
+        with patch('boto3.client'):
+            with pytest.raises(FlushError, match="1 destination"):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_undelivered_events_sent_to_dead_letter_log(self, mock_writer_class, sns_event, lambda_context):
+        """Test that with a dead-letter target a failed write no longer fails the invocation."""
+        mock_writer_class.return_value.write.side_effect = lambda events, deadline: WriteResult(
+            calls=5, failed=events, error=Exception("Throttled")
+        )
+        mock_log = MagicMock()
+
+        with patch.dict(os.environ, {'DEAD_LETTER_TARGET': 'log'}):
+            with patch('boto3.client'):
+                with patch('lambda_sns_cloudwatch_logs.deadletter.log', mock_log):
+                    result = sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert result is None
+        mock_log.error.assert_called_once()
+        assert mock_log.error.call_args.kwargs['message'] == "This is a test log message from SNS"
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_spool_written_by_next_invocation(self, mock_writer_class, sns_event, lambda_context, tmp_path, capsys):
+        """Test that spooled events are written by the next invocation and then removed."""
+        written = []
+        deadlines = []
+
+        def throttled(events, deadline):
+            deadlines.append(deadline)
+            return WriteResult(calls=1, failed=events, error=Exception("Throttled"))
+
+        def accept(events, deadline):
+            written.extend(events)
+            return WriteResult(calls=1)
+
+        write = MagicMock(side_effect=throttled)
+        mock_writer_class.side_effect = lambda client, log_group, log_stream, streams=None: MagicMock(
+            log_group=log_group, log_stream=log_stream, write=write
+        )
+        lambda_context.get_remaining_time_in_millis = lambda: 60_000
+        environment = {'DEAD_LETTER_TARGET': 'spool', 'SPOOL_DIR': str(tmp_path), 'SPOOL_RETRY_TIME': '1',
+                       'METRICS_NAMESPACE': 'SnsLogs'}
+
+        with patch.dict(os.environ, environment):
+            with patch('boto3.client'):
+                started = time.monotonic()
+                assert sns_cloudwatch_gw.handler(sns_event, lambda_context) is None
+                assert os.listdir(tmp_path)
+
+                write.side_effect = accept
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert deadlines[0] < started + 2
+        assert [e["message"] for e in written] == ["This is a test log message from SNS"] * 2
+        assert os.listdir(tmp_path) == []
+        first, second = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"_aws"' in line]
+        assert first["DeadLetterEvents"] == 1
+        assert second["SpoolDrainedEvents"] == 1
+
+    def test_rejected_events_do_not_fail_invocation(self, sns_event, lambda_context, capsys):
+        """Test that events CloudWatch rejects as too old are counted without failing the invocation."""
+        environment = {'DEAD_LETTER_TARGET': 'none', 'METRICS_NAMESPACE': 'SnsLogs'}
+
+        with patch.dict(os.environ, environment):
+            with patch('boto3.client') as mock_client:
+                mock_client.return_value.put_log_events.return_value = {
+                    "rejectedLogEventsInfo": {"tooOldLogEventEndIndex": 1}
+                }
+                result = sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert result is None
+        mock_client.return_value.put_log_events.assert_called_once()
+        line = json.loads(next(line for line in capsys.readouterr().out.splitlines() if '"_aws"' in line))
+        assert line["RejectedEvents"] == 1
+        assert line["DeadLetterEvents"] == 0
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_retry_deadline_from_context(self, mock_writer_class, sns_event, lambda_context):
+        """Test that writes are given a deadline inside the remaining invocation time."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        lambda_context.get_remaining_time_in_millis = lambda: 3000
+
+        with patch('boto3.client'):
+            before = time.monotonic()
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+            after = time.monotonic()
+
+        deadline = mock_writer_class.return_value.write.call_args[0][1]
+        margin = DEADLINE_MARGIN_SECONDS
+        assert before + 3 - margin <= deadline <= after + 3 - margin
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_low_time_skips_sns_timestamp(self, mock_writer_class, lambda_context):
+        """Test that optional SNS timestamp parsing is skipped when the invocation is nearly out of time."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"Message": "hurry", "Timestamp": "2023-06-15T09:59:59.500Z"}},
+        ]}
+        lambda_context.get_remaining_time_in_millis = lambda: 1000
+        mock_log = MagicMock()
+
+        with patch.dict(os.environ, {'EVENT_TIMESTAMP': 'sns'}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.log', mock_log):
+                    sns_cloudwatch_gw.handler(event, lambda_context)
+
+        events = mock_writer_class.return_value.write.call_args[0][0]
+        assert events[0]["timestamp"] != 1686823199500
+        assert mock_log.warn.call_args[0][0] == "Running out of time, skipping optional processing"
+
+    def test_out_of_time_events_sent_to_dead_letter(self, sns_event, lambda_context):
+        """Test that events that cannot be written before the timeout are handed off instead of started."""
+        lambda_context.get_remaining_time_in_millis = lambda: 600
+        mock_log = MagicMock()
+
+        with patch.dict(os.environ, {'DEAD_LETTER_TARGET': 'log'}):
+            with patch('boto3.client') as mock_client:
+                with patch('lambda_sns_cloudwatch_logs.deadletter.log', mock_log):
+                    sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_client.return_value.put_log_events.assert_not_called()
+        mock_log.error.assert_called_once()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_compaction_drops_redelivered_messages(self, mock_writer_class, sns_event, lambda_context):
+        """Test that COMPACTION drops a message redelivered to a warm function."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+
+        with patch.dict(os.environ, {'COMPACTION': 'message_id'}):
+            with patch('boto3.client'):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_writer_class.return_value.write.assert_called_once()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_compaction_keeps_messages_of_failed_invocation(self, mock_writer_class, sns_event, lambda_context):
+        """Test that a message whose write failed is written again when SNS redelivers it."""
+        mock_writer_class.return_value.write.side_effect = [Exception("Throttled"), WriteResult(calls=1)]
+
+        with patch.dict(os.environ, {'COMPACTION': 'message_id'}):
+            with patch('boto3.client'):
+                with pytest.raises(FlushError):
+                    sns_cloudwatch_gw.handler(sns_event, lambda_context)
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert mock_writer_class.return_value.write.call_count == 2
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_content_compaction(self, mock_writer_class, lambda_context):
+        """Test that identical messages in a burst are written once with their repeat count."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"MessageId": str(i), "Message": "CPU high" if i % 2 else "disk full"}}
+            for i in range(5)
+        ] + [
+            {"EventSource": "aws:sns", "Sns": {"MessageId": "1", "Message": "CPU high"}},
+        ]}
+
+        with patch.dict(os.environ, {'COMPACTION': 'content'}):
+            with patch('boto3.client'):
+                sns_cloudwatch_gw.handler(event, lambda_context)
+
+        messages = [e["message"] for e in mock_writer_class.return_value.write.call_args[0][0]]
+        assert messages == ["disk full [repeated 3 times]", "CPU high [repeated 2 times]"]
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_json_message_format(self, mock_writer_class, lambda_context):
+        """Test that MESSAGE_FORMAT=json writes SNS metadata with the message, counting compacted repeats."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {
+                "MessageId": str(i), "TopicArn": "arn:aws:sns:us-east-1:123456789012:alerts",
+                "Message": '{"alarm": "CPU"}',
+            }}
+            for i in range(3)
+        ]}
+
+        with patch.dict(os.environ, {'MESSAGE_FORMAT': 'json', 'COMPACTION': 'content'}):
+            with patch('boto3.client'):
+                sns_cloudwatch_gw.handler(event, lambda_context)
+
+        events = mock_writer_class.return_value.write.call_args[0][0]
+        assert len(events) == 1
+        assert json.loads(events[0]["message"]) == {
+            "topic_arn": "arn:aws:sns:us-east-1:123456789012:alerts",
+            "message_id": "0",
+            "subject": None,
+            "timestamp": None,
+            "repeated": 3,
+            "message": {"alarm": "CPU"},
+        }
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_largest_sns_message_split(self, mock_writer_class, lambda_context):
+        """Test that a 256 KB SNS message is split into parts instead of failing its batch."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        large_message = "x" * 256 * 1024
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"Message": "small"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": large_message}},
+        ]}
+
+        with patch('boto3.client'):
+            sns_cloudwatch_gw.handler(event, lambda_context)
+
+        events = mock_writer_class.return_value.write.call_args[0][0]
+        assert events[0]["message"] == "small"
+        assert len(events) == 3
+        assert all(len(e["message"]) <= MAX_MESSAGE_BYTES for e in events)
+        assert "".join(e["message"].split("] ", 1)[1] for e in events[1:]) == large_message
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_emf_metrics(self, mock_writer_class, lambda_context, capsys):
+        """Test that METRICS_NAMESPACE prints one EMF line with the invocation's counters."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=2, retries=1, bytes=80)
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"TopicArn": "arn:aws:sns:us-east-1:123456789012:alerts", "Message": "a"}},
+            {"EventSource": "aws:sns", "Sns": {"Message": "b"}},
+            {"EventSource": "aws:sqs"},
+            {"Sns": {}},
+        ]}
+
+        with patch.dict(os.environ, {'METRICS_NAMESPACE': 'SnsLogs', 'METRICS_DIMENSIONS': 'log_group,topic'}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.log'):
+                    sns_cloudwatch_gw.handler(event, lambda_context)
+
+        document = json.loads(capsys.readouterr().out)
+        assert document["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "SnsLogs"
+        assert document["LogGroup"] == "test-log-group"
+        assert document["Topic"] == "alerts"
+        assert document["RecordsProcessed"] == 2
+        assert document["RecordsSkipped"] == 2
+        assert document["SkippedNonSns"] == 1
+        assert document["SkippedMissingEventSource"] == 1
+        assert document["PutLogEventsCalls"] == 2
+        assert document["ThrottleRetries"] == 1
+        assert document["BytesWritten"] == 80
+        assert document["Destinations"] == 1
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_emf_metrics_on_failure(self, mock_writer_class, sns_event, lambda_context, capsys):
+        """Test that metrics are still emitted when the invocation fails."""
+        mock_writer_class.return_value.write.side_effect = Exception("Throttled")
+
+        with patch.dict(os.environ, {'METRICS_NAMESPACE': 'SnsLogs'}):
+            with patch('boto3.client'):
+                with pytest.raises(FlushError):
+                    sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        # The EMF line is printed last, after the flush error is logged
+        document = json.loads(capsys.readouterr().out.splitlines()[-1])
+        assert document["RecordsProcessed"] == 1
+        assert document["FlushLatency"] >= 0
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_no_metrics_by_default(self, mock_writer_class, sns_event, lambda_context, capsys):
+        """Test that nothing is printed unless METRICS_NAMESPACE is set."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        with patch('boto3.client'):
+            sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert capsys.readouterr().out == ""
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_profiling_samples_one_in_n(self, mock_writer_class, sns_event, lambda_context):
+        """Test that PROFILE_SAMPLE logs per-stage timings for one invocation in N."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1, build_time=(0.002, 0.001))
+        mock_log = MagicMock()
+
+        with patch.dict(os.environ, {'PROFILE_SAMPLE': '2'}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.log', mock_log):
+                    for _ in range(4):
+                        sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        profiles = [c for c in mock_log.info.call_args_list if c.args == ("Profile",)]
+        assert len(profiles) == 2
+        profile = profiles[0].kwargs
+        assert profile["writer_mode"] == "batch"
+        assert list(profile["stages"]) == ["config", "parse", "encode", "batch", "flush"]
+        assert profile["stages"]["batch"]["wall_ms"] == 2.0
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_no_profiling_by_default(self, mock_writer_class, sns_event, lambda_context):
+        """Test that no profile is logged unless PROFILE_SAMPLE is set."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        mock_log = MagicMock()
+
+        with patch('boto3.client'):
+            with patch('sns_cloudwatch_gw.log', mock_log):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_log.info.assert_not_called()
+
+    def test_unknown_writer_mode(self, sns_event, lambda_context):
+        """Test that an unknown WRITER_MODE is rejected."""
+        with patch.dict(os.environ, {'WRITER_MODE': 'carrier-pigeon'}):
+            with pytest.raises(ValueError, match="WRITER_MODE"):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+
+class TestFilterRules:
+    """Test cases for the filter and transform rule stage."""
+
+    RULES = json.dumps([
+        {"json": {"level": "debug"}, "action": "drop"},
+        {"action": "redact", "fields": ["password"]},
+    ])
+
+    def event(self):
+        messages = ['{"level": "debug", "msg": "noise"}', '{"level": "info", "password": "hunter2"}', "plain"]
+        return {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"MessageId": f"msg-{i}", "Message": message}}
+            for i, message in enumerate(messages)
+        ]}
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_batch_mode(self, mock_writer_class, lambda_context, capsys):
+        """Test that dropped messages are not written and redacted ones are written redacted."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch', 'FILTER_RULES': self.RULES, 'MESSAGE_FORMAT': 'json',
+                                     'METRICS_NAMESPACE': 'SnsLogs'}):
+            with patch('boto3.client'):
+                sns_cloudwatch_gw.handler(self.event(), lambda_context)
+
+        events = mock_writer_class.return_value.write.call_args[0][0]
+        documents = [json.loads(e["message"]) for e in events]
+        assert [d["message_id"] for d in documents] == ["msg-1", "msg-2"]
+        assert documents[0]["message"] == {"level": "info", "password": "[REDACTED]"}
+        assert documents[1]["message"] == "plain"
+        metrics = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert metrics["RecordsFiltered"] == 1
+        assert metrics["RecordsProcessed"] == 3
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_watchtower_mode(self, mock_cw_handler_class, lambda_context, mock_watchtower_handler):
+        """Test that watchtower mode applies the same rules."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+        mock_cw_logger = create_mock_logger()
+
+        with patch.dict(os.environ, {'FILTER_RULES': self.RULES}):
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=mock_cw_logger):
+                sns_cloudwatch_gw.handler(self.event(), lambda_context)
+
+        assert [c.args[0] for c in mock_cw_logger.info.call_args_list] == [
+            '{"level":"info","password":"[REDACTED]"}', "plain",
+        ]
+
+
+class TestStreamSharding:
+    """Test cases for STREAM_SHARDING."""
+
+    LAMBDA_LOG_STREAM = {'AWS_LAMBDA_LOG_STREAM_NAME': '2023/06/15/[$LATEST]0123abcd'}
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_message_id_shards(self, mock_writer_class, lambda_context):
+        """Test that batch mode spreads messages over shards by MessageId."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        event = {"Records": [
+            {"EventSource": "aws:sns", "Sns": {"MessageId": f"msg-{i}", "Message": f"m{i}"}} for i in range(20)
+        ]}
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch', 'STREAM_SHARDING': 'message_id', 'STREAM_SHARDS': '4'}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    sns_cloudwatch_gw.handler(event, lambda_context)
+
+        streams = {c.args[2] for c in mock_writer_class.call_args_list}
+        assert streams == {f'2023-06-15/1000/{shard}' for shard in range(4)}
+        written = [e["message"] for c in mock_writer_class.return_value.write.call_args_list for e in c.args[0]]
+        assert sorted(written) == sorted(f"m{i}" for i in range(20))
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_instance_shard_batch_mode(self, mock_writer_class, sns_event, lambda_context):
+        """Test that instance sharding writes to this instance's own stream."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch', 'STREAM_SHARDING': 'instance', **self.LAMBDA_LOG_STREAM}):
+            with patch('boto3.client'):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert mock_writer_class.call_args.args[2] == '2023-06-15/1000/0123abcd'
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_instance_shard_watchtower_mode(self, mock_cw_handler_class, sns_event, lambda_context,
+                                            mock_watchtower_handler):
+        """Test that watchtower mode writes to this instance's own stream."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+
+        with patch.dict(os.environ, {'STREAM_SHARDING': 'instance', **self.LAMBDA_LOG_STREAM}):
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=create_mock_logger()):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert mock_cw_handler_class.call_args.kwargs['stream_name'] == '2023-06-15/1000/0123abcd'
+
+
+class TestSqsBatching:
+    """Test cases for SNS messages delivered in batches through SQS."""
+
+    @pytest.fixture(autouse=True)
+    def batch_mode(self):
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch'}):
+            yield
+
+    @staticmethod
+    def make_writers(writes, failing=()):
+        def make_writer(client, log_group, log_stream, streams=None):
+            def write(events, deadline):
+                if log_group in failing:
+                    return WriteResult(calls=1, failed=list(events), error=RuntimeError("throttled"))
+                writes.setdefault(log_group, []).extend(e["message"] for e in events)
+                return WriteResult(calls=1)
+
+            writer = MagicMock(log_group=log_group, log_stream=log_stream)
+            writer.write.side_effect = write
+            return writer
+
+        return make_writer
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_sqs_batch_written(self, mock_writer_class, sqs_event, lambda_context):
+        """Test that the SNS messages are unwrapped and written with one writer."""
+        writes = {}
+        mock_writer_class.side_effect = self.make_writers(writes)
+
+        with patch('boto3.client'):
+            result = sns_cloudwatch_gw.handler(sqs_event, lambda_context)
+
+        assert result == {"batchItemFailures": []}
+        mock_writer_class.assert_called_once()
+        assert writes == {'test-log-group': ["Queued message 0", "Queued message 1", "Queued message 2"]}
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_failed_destination_fails_its_messages(self, mock_writer_class, sqs_event, lambda_context):
+        """Test that only the messages sent to a failed destination are returned for retry."""
+        routes = [{"topic_arn": "arn:aws:sns:*:*:alerts", "log_group": "alert-logs"}]
+        writes = {}
+        mock_writer_class.side_effect = self.make_writers(writes, failing=("alert-logs",))
+
+        with patch.dict(os.environ, {'ROUTING_TABLE': json.dumps(routes), 'COMPACTION': 'message_id'}):
+            with patch('boto3.client'):
+                result = sns_cloudwatch_gw.handler(sqs_event, lambda_context)
+                # The retried message is not dropped as a duplicate
+                retry = {"Records": [sqs_event["Records"][2]]}
+                mock_writer_class.side_effect = self.make_writers(writes)
+                retried = sns_cloudwatch_gw.handler(retry, lambda_context)
+
+        assert result == {"batchItemFailures": [{"itemIdentifier": "sqs-2"}]}
+        assert retried == {"batchItemFailures": []}
+        assert writes == {
+            'test-log-group': ["Queued message 0", "Queued message 1"],
+            'alert-logs': ["Queued message 2"],
+        }
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_sns_event_failure_still_raises(self, mock_writer_class, sns_event, lambda_context):
+        """Test that SNS deliveries keep failing the whole invocation."""
+        mock_writer_class.side_effect = self.make_writers({}, failing=("test-log-group",))
+
+        with patch('boto3.client'):
+            with pytest.raises(FlushError):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_watchtower_mode(self, mock_cw_handler_class, sqs_event, lambda_context, mock_watchtower_handler):
+        """Test that watchtower mode also unwraps SQS records."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+        mock_cw_logger = create_mock_logger()
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'watchtower'}):
+            with patch('sns_cloudwatch_gw.logging.getLogger', return_value=mock_cw_logger):
+                result = sns_cloudwatch_gw.handler(sqs_event, lambda_context)
+
+        assert result == {"batchItemFailures": []}
+        assert [c.args[0] for c in mock_cw_logger.info.call_args_list] == [
+            "Queued message 0", "Queued message 1", "Queued message 2",
+        ]
+
+
+class TestBackgroundFlush:
+    """Test cases for handing events off to the flusher extension."""
+
+    @pytest.fixture
+    def extension(self):
+        server = HandoffServer(0)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        environment = {'WRITER_MODE': 'batch', 'BACKGROUND_FLUSH': 'true',
+                       'EXTENSION_PORT': str(server.server_address[1])}
+        with patch.dict(os.environ, environment):
+            yield server
+        server.shutdown()
+        server.server_close()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_events_handed_off(self, mock_writer_class, extension, sns_event, lambda_context, capsys):
+        """Test that the events go to the extension instead of being written."""
+        with patch.dict(os.environ, {'METRICS_NAMESPACE': 'SnsLogs'}):
+            assert sns_cloudwatch_gw.handler(sns_event, lambda_context) is None
+
+        mock_writer_class.assert_not_called()
+        assert extension.wait_for("test-request-id", 1)
+        (events,) = extension.take().values()
+        assert [e["message"] for e in events] == ["This is a test log message from SNS"]
+        (line,) = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"_aws"' in line]
+        assert line["HandedOffEvents"] == 1
+        assert line["PutLogEventsCalls"] == 0
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_written_here_without_extension(self, mock_writer_class, extension, sns_event, lambda_context):
+        """Test that the handler writes the events itself when the extension does not take them."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        extension.shutdown()
+        extension.server_close()
+
+        sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        mock_writer_class.return_value.write.assert_called_once()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_empty_invocation_released(self, mock_writer_class, extension, lambda_context):
+        """Test that an invocation without events still lets the extension move on."""
+        sns_cloudwatch_gw.handler({"Records": []}, lambda_context)
+
+        assert extension.wait_for("test-request-id", 1)
+        assert extension.take() == {}
+
+    def test_warmer_ping_released(self, extension, lambda_context):
+        """Test that a warmer ping lets the extension move on."""
+        sns_cloudwatch_gw._prewarmed = True
+
+        sns_cloudwatch_gw.handler({"Records": [{"EventSource": "aws:events"}]}, lambda_context)
+
+        assert extension.wait_for("test-request-id", 1)
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_failed_invocation_released(self, mock_writer_class, extension, sns_event, lambda_context):
+        """Test that an invocation that raises still lets the extension move on."""
+        with patch('sns_cloudwatch_gw._write_batch', side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert extension.wait_for("test-request-id", 1)
+
+    def test_requires_batch_mode(self):
+        """Test that background flushing is refused in watchtower mode."""
+        with patch.dict(os.environ, {'WRITER_MODE': 'watchtower', 'BACKGROUND_FLUSH': 'true'}):
+            with pytest.raises(ValueError, match="BACKGROUND_FLUSH"):
+                sns_cloudwatch_gw.handler({"Records": []}, None)
+
+
+class TestWarmup:
+    """Test cases for warmer pings and init-phase priming."""
+
+    WARMER_EVENT = {"Records": [{"EventSource": "aws:events"}]}
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_warmer_ping_short_circuits(self, mock_cw_handler_class, lambda_context):
+        """Test that a primed instance answers a warmer ping without touching CloudWatch."""
+        sns_cloudwatch_gw._prewarmed = True
+        mock_log = MagicMock()
+
+        with patch('sns_cloudwatch_gw.log', mock_log):
+            result = sns_cloudwatch_gw.handler(self.WARMER_EVENT, lambda_context)
+
+        assert result is None
+        mock_cw_handler_class.assert_not_called()
+        mock_log.warn.assert_not_called()
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_warmer_ping_primes_unprimed_instance(self, mock_writer_class, lambda_context):
+        """Test that a ping primes the default stream when the init phase did not."""
+        fixed_time = datetime.datetime(2023, 6, 15, 10, 30, 45, tzinfo=datetime.timezone.utc)
+        mock_client = MagicMock()
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch'}):
+            with patch('boto3.client', return_value=mock_client):
+                with patch('sns_cloudwatch_gw.datetime.datetime') as mock_datetime:
+                    mock_datetime.now.return_value = fixed_time
+                    sns_cloudwatch_gw.handler(self.WARMER_EVENT, lambda_context)
+                    sns_cloudwatch_gw.handler(self.WARMER_EVENT, lambda_context)
+
+        mock_writer_class.assert_called_once_with(mock_client, 'test-log-group', '2023-06-15/1000',
+                                                  streams=sns_cloudwatch_gw._streams)
+        mock_writer_class.return_value.ensure_stream.assert_called_once()
+        mock_writer_class.return_value.write.assert_not_called()
+        assert sns_cloudwatch_gw._prewarmed
+
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_warmer_ping_without_prewarm(self, mock_writer_class, lambda_context):
+        """Test that PREWARM=false leaves the ping with nothing to do."""
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch', 'PREWARM': 'false'}):
+            with patch('boto3.client') as mock_boto3_client:
+                sns_cloudwatch_gw.handler(self.WARMER_EVENT, lambda_context)
+
+        mock_boto3_client.assert_not_called()
+        mock_writer_class.assert_not_called()
+
+    @patch('watchtower.CloudWatchLogHandler')
+    def test_prewarm_watchtower_reuses_writer(self, mock_cw_handler_class, sns_event, lambda_context,
+                                              mock_watchtower_handler):
+        """Test that watchtower mode primes the writer the first message then uses."""
+        mock_cw_handler_class.return_value = mock_watchtower_handler
+        config = sns_cloudwatch_gw._get_config()
+
+        with patch('sns_cloudwatch_gw.BatchWriter') as mock_writer_class:
+            sns_cloudwatch_gw._prewarm(config)
+        sns_cloudwatch_gw.handler(sns_event, lambda_context)
+
+        assert mock_writer_class.call_args[0][0] is sns_cloudwatch_gw._logs_client
+        assert mock_cw_handler_class.call_args.kwargs['boto3_client'] is sns_cloudwatch_gw._logs_client
+        mock_writer_class.return_value.ensure_stream.assert_called_once()
+        mock_cw_handler_class.assert_called_once()
+        mock_watchtower_handler.flush.assert_called_once()
+
+    def test_prewarm_failure_is_logged(self):
+        """Test that priming errors never fail the init phase."""
+        mock_log = MagicMock()
+
+        with patch.dict(os.environ, {'WRITER_MODE': 'batch'}):
+            config = sns_cloudwatch_gw._get_config()
+            with patch('boto3.client', side_effect=RuntimeError("no credentials")):
+                with patch('sns_cloudwatch_gw.log', mock_log):
+                    sns_cloudwatch_gw._prewarm(config)
+
+        assert mock_log.warn.call_args[0][0] == "Could not prewarm"
+        assert mock_log.warn.call_args.kwargs["error"] == "no credentials"
+        assert not sns_cloudwatch_gw._prewarmed
+
+
 class TestMainExecution:
     """Test cases for direct script execution."""
     
     @patch.dict(os.environ, {'LOG_GROUP': 'test-log-group', 'LOG_LEVEL': 'INFO'})
-    @patch('sns_cloudwatch_gw.watchtower.CloudWatchLogHandler')
-    @patch('sns_cloudwatch_gw.logging.getLogger')
-    def test_direct_execution(self, mock_get_logger, mock_cw_handler_class):
-        """Test running the module directly with __main__ block."""
-        # Set up mocks
-        mock_logger = create_mock_logger()
-        mock_get_logger.return_value = mock_logger
-        mock_handler = MagicMock()
-        mock_cw_handler_class.return_value = mock_handler
-        
+    @patch('sns_cloudwatch_gw.BatchWriter')
+    def test_direct_execution(self, mock_writer_class, tmp_path, capsys):
+        """Test that running the module directly replays the files given on the command line."""
+        mock_writer_class.return_value.write.return_value = WriteResult(calls=1)
+        events = tmp_path / 'events.jsonl'
+        events.write_text('first message\nsecond message\n')
+
         # Import and execute the module's main block
         import runpy
-        
+
         module_path = Path(__file__).parent.parent / 'sns_cloudwatch_gw.py'
-        runpy.run_path(str(module_path), run_name='__main__')
-        
-        # Verify the handler was created and logger configured
-        mock_cw_handler_class.assert_called_once()
-        mock_logger.setLevel.assert_called_once_with(logging.INFO)
\ No newline at end of file
+        with patch.object(sys, 'argv', ['sns_cloudwatch_gw.py', str(events), '--workers', '1']):
+            with patch('boto3.client'):
+                with pytest.raises(SystemExit) as exit_info:
+                    runpy.run_path(str(module_path), run_name='__main__')
+
+        assert exit_info.value.code == 0
+        (events_written, _), _ = mock_writer_class.return_value.write.call_args
+        assert [e["message"] for e in events_written] == ["first message", "second message"]
+        assert json.loads(capsys.readouterr().out.splitlines()[-1])["RecordsProcessed"] == 2
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Unit tests for the /tmp write-ahead spool."""
+
+import os
+import time
+from unittest.mock import patch
+
+from lambda_sns_cloudwatch_logs.spool import MAX_EVENT_AGE_MS, Spool, decode_blocks, encode_block
+
+NOW = 1_686_823_845_000
+
+
+def events(count, size=10, timestamp=NOW):
+    return [{"timestamp": timestamp + i, "message": f"{i:0{size}d}"} for i in range(count)]
+
+
+class TestBlocks:
+    """Test cases for the spool block format."""
+
+    def test_round_trip(self):
+        written = [{"timestamp": NOW, "message": "héllo"}, {"timestamp": NOW + 1, "message": ""}]
+        data = encode_block("group", "2023-06-15/1000", written) + encode_block("other", "s", events(2))
+
+        assert decode_blocks(data) == [(("group", "2023-06-15/1000"), written), (("other", "s"), events(2))]
+
+    def test_truncated_block_ignored(self):
+        first = encode_block("group", "stream", events(2))
+        second = encode_block("group", "stream", events(3))
+
+        for cut in range(1, len(second)):
+            assert decode_blocks(first + second[:cut]) == [(("group", "stream"), events(2))]
+
+
+class TestSpool:
+    """Test cases for Spool."""
+
+    def test_send_drain_commit(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        spool.send("group", "a", events(2))
+        spool.send("group", "b", events(1))
+
+        drained = spool.drain(now_millis=NOW)
+
+        assert drained.events == {("group", "a"): events(2), ("group", "b"): events(1)}
+        assert len(drained) == 3
+        spool.commit(drained)
+        assert os.listdir(tmp_path) == []
+        assert len(spool.drain(now_millis=NOW)) == 0
+
+    def test_sends_after_drain_are_kept(self, tmp_path):
+        """Test that events spooled again while draining survive the commit."""
+        spool = Spool(str(tmp_path))
+        spool.send("group", "a", events(2))
+
+        drained = spool.drain(now_millis=NOW)
+        spool.send("group", "a", events(1))
+        spool.commit(drained)
+
+        assert spool.drain(now_millis=NOW).events == {("group", "a"): events(1)}
+
+    def test_uncommitted_drain_read_again(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        spool.send("group", "a", events(2))
+
+        spool.drain(now_millis=NOW)
+
+        assert spool.drain(now_millis=NOW).events == {("group", "a"): events(2)}
+
+    def test_survives_restart(self, tmp_path):
+        Spool(str(tmp_path)).send("group", "a", events(2))
+
+        spool = Spool(str(tmp_path))
+
+        assert spool.size > 0
+        assert spool.drain(now_millis=NOW).events == {("group", "a"): events(2)}
+
+    def test_drain_reads_segments_of_other_spools(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        Spool(str(tmp_path)).send("group", "a", events(2))
+
+        drained = spool.drain(now_millis=NOW)
+        spool.commit(drained)
+
+        assert drained.events == {("group", "a"): events(2)}
+        assert os.listdir(tmp_path) == []
+
+    def test_stale_segment_not_appended_after_other_drain(self, tmp_path):
+        """Test that a send cannot add to a segment another spool has drained and will delete."""
+        handler, extension = Spool(str(tmp_path)), Spool(str(tmp_path))
+        handler.send("group", "a", events(1))
+
+        drained = extension.drain(now_millis=NOW)
+        handler.send("group", "b", events(2))
+        extension.commit(drained)
+
+        assert drained.events == {("group", "a"): events(1)}
+        assert extension.drain(now_millis=NOW).events == {("group", "b"): events(2)}
+
+    def test_segments_of_exited_drainer_read_again(self, tmp_path):
+        Spool(str(tmp_path)).send("group", "a", events(2))
+        # Left by a process that drained the segment and exited before committing
+        (segment,) = os.listdir(tmp_path)
+        os.rename(tmp_path / segment, tmp_path / f"{segment}.999999999")
+
+        with patch("lambda_sns_cloudwatch_logs.spool._is_running", return_value=False):
+            assert Spool(str(tmp_path)).drain(now_millis=NOW).events == {("group", "a"): events(2)}
+
+    def test_segments_of_running_drainer_skipped(self, tmp_path):
+        Spool(str(tmp_path)).send("group", "a", events(2))
+        (segment,) = os.listdir(tmp_path)
+        os.rename(tmp_path / segment, tmp_path / f"{segment}.{os.getppid()}")
+
+        assert len(Spool(str(tmp_path)).drain(now_millis=NOW)) == 0
+
+    def test_oldest_segments_evicted(self, tmp_path):
+        spool = Spool(str(tmp_path), max_bytes=4000)
+        for index in range(10):
+            spool.send("group", "a", [{"timestamp": NOW + index, "message": "x" * 500}])
+
+        assert spool.size <= 4000
+        timestamps = [e["timestamp"] for e in spool.drain(now_millis=NOW).events[("group", "a")]]
+        assert timestamps == list(range(NOW + 10 - len(timestamps), NOW + 10))
+
+    def test_drain_limit(self, tmp_path):
+        spool = Spool(str(tmp_path), max_bytes=4000)
+        for index in range(3):
+            spool.send("group", "a", [{"timestamp": NOW + index, "message": "x" * 1000}])
+
+        drained = spool.drain(max_bytes=2500, now_millis=NOW)
+
+        assert [e["timestamp"] for e in drained.events[("group", "a")]] == [NOW, NOW + 1]
+
+    def test_expired_events_dropped(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        spool.send("group", "a", events(1, timestamp=NOW - MAX_EVENT_AGE_MS - 1) + events(1))
+
+        drained = spool.drain(now_millis=NOW)
+
+        assert drained.events == {("group", "a"): events(1)}
+        assert drained.expired == 1
+
+    def test_deadline(self, tmp_path):
+        spool = Spool(str(tmp_path), retry_seconds=1.0)
+        now = time.monotonic()
+
+        assert now + 1 < spool.deadline(None) < now + 2
+        assert spool.deadline(now + 0.5) == now + 0.5
@@ -0,0 +1,55 @@
+"""Unit tests for unwrapping SNS messages delivered through SQS."""
+
+import json
+
+from lambda_sns_cloudwatch_logs.sqs import SQS_MESSAGE_ID, batch_item_failures, is_sqs_event, unwrap
+
+
+class TestUnwrap:
+    """Test cases for unwrap."""
+
+    def test_sns_envelope(self, sqs_event):
+        sns = unwrap(sqs_event["Records"][0])
+
+        assert sns["Message"] == "Queued message 0"
+        assert sns["MessageId"] == "msg-0"
+        assert sns["TopicArn"] == "arn:aws:sns:us-east-1:123456789012:example-topic"
+        assert sns[SQS_MESSAGE_ID] == "sqs-0"
+
+    def test_raw_message_delivery(self):
+        record = {"eventSource": "aws:sqs", "messageId": "sqs-1", "body": '{"level": "info"}'}
+
+        sns = unwrap(record)
+
+        assert sns == {"Message": '{"level": "info"}', "MessageId": "sqs-1", SQS_MESSAGE_ID: "sqs-1"}
+
+    def test_invalid_json_body(self):
+        sns = unwrap({"eventSource": "aws:sqs", "messageId": "sqs-1", "body": "{not json"})
+
+        assert sns["Message"] == "{not json"
+
+    def test_envelope_without_message(self):
+        body = json.dumps({"Type": "SubscriptionConfirmation", "Token": "abc"})
+
+        sns = unwrap({"eventSource": "aws:sqs", "messageId": "sqs-1", "body": body})
+
+        assert sns["Message"] == body
+
+    def test_missing_body(self):
+        assert unwrap({"eventSource": "aws:sqs", "messageId": "sqs-1"}) is None
+
+
+class TestSqsEvent:
+    """Test cases for is_sqs_event and batch_item_failures."""
+
+    def test_is_sqs_event(self, sqs_event, sns_event):
+        assert is_sqs_event(sqs_event)
+        assert not is_sqs_event(sns_event)
+        assert not is_sqs_event({"Records": []})
+        assert not is_sqs_event({})
+
+    def test_batch_item_failures(self):
+        assert batch_item_failures(["a", "b"]) == {
+            "batchItemFailures": [{"itemIdentifier": "a"}, {"itemIdentifier": "b"}]
+        }
+        assert batch_item_failures([]) == {"batchItemFailures": []}
@@ -0,0 +1,70 @@
+"""Unit tests for the cache of existing log groups and streams."""
+
+from lambda_sns_cloudwatch_logs.streams import StreamCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStreamCache:
+    """Test cases for StreamCache."""
+
+    def test_add_stream_records_group(self):
+        cache = StreamCache()
+
+        cache.add_stream("group", "stream")
+
+        assert cache.has_stream("group", "stream")
+        assert cache.has_group("group")
+        assert not cache.has_stream("group", "other")
+        assert not cache.has_group("other")
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = StreamCache(ttl=60, clock=clock)
+        cache.add_stream("group", "stream")
+
+        clock.now = 59
+        assert cache.has_stream("group", "stream")
+        clock.now = 60
+        assert not cache.has_stream("group", "stream")
+        assert not cache.has_group("group")
+
+    def test_discard_stream(self):
+        cache = StreamCache()
+        cache.add_stream("group", "stream")
+
+        cache.discard_stream("group", "stream")
+
+        assert not cache.has_stream("group", "stream")
+        assert not cache.has_group("group")
+
+    def test_zero_ttl_disables(self):
+        cache = StreamCache(ttl=0)
+
+        cache.add_stream("group", "stream")
+        cache.add_group("group")
+
+        assert len(cache) == 0
+        assert not cache.has_stream("group", "stream")
+
+    def test_bounded(self):
+        clock = FakeClock()
+        cache = StreamCache(ttl=60, max_size=4, clock=clock)
+        cache.add_group("expired")
+        clock.now = 100
+        for index in range(4):
+            cache.add_group(f"group-{index}")
+
+        # The expired entry goes first, then the oldest
+        assert len(cache) == 4
+        assert cache.has_group("group-0")
+        cache.add_group("group-4")
+        assert len(cache) == 4
+        assert not cache.has_group("group-0")
+        assert cache.has_group("group-4")
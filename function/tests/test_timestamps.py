@@ -0,0 +1,33 @@
+"""Unit tests for SNS timestamp conversion."""
+
+import datetime
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.timestamps import parse_sns_timestamp, to_epoch_millis
+
+
+class TestParseSnsTimestamp:
+    """Test cases for parse_sns_timestamp."""
+
+    def test_sns_format(self):
+        parsed = parse_sns_timestamp("2023-01-01T10:30:45.123Z")
+        assert parsed == datetime.datetime(2023, 1, 1, 10, 30, 45, 123000, tzinfo=datetime.timezone.utc)
+
+    def test_offset_converted_to_utc(self):
+        parsed = parse_sns_timestamp("2023-01-01T12:30:45+02:00")
+        assert parsed == datetime.datetime(2023, 1, 1, 10, 30, 45, tzinfo=datetime.timezone.utc)
+        assert parsed.tzinfo is datetime.timezone.utc
+
+    def test_naive_treated_as_utc(self):
+        parsed = parse_sns_timestamp("2023-01-01T10:30:45")
+        assert parsed == datetime.datetime(2023, 1, 1, 10, 30, 45, tzinfo=datetime.timezone.utc)
+
+    @pytest.mark.parametrize("value", [None, "", "yesterday", 1672531200])
+    def test_unusable_values(self, value):
+        assert parse_sns_timestamp(value) is None
+
+
+def test_to_epoch_millis():
+    value = datetime.datetime(2023, 1, 1, 0, 0, 1, 500000, tzinfo=datetime.timezone.utc)
+    assert to_epoch_millis(value) == 1672531201500
@@ -0,0 +1,29 @@
+"""Unit tests for warmer ping detection."""
+
+import pytest
+
+from lambda_sns_cloudwatch_logs.warmup import is_warmer_ping
+
+
+class TestIsWarmerPing:
+    """Test cases for is_warmer_ping."""
+
+    @pytest.mark.parametrize("event", [
+        {"Records": [{"EventSource": "aws:events"}]},
+        {"Records": [{"EventSource": "aws:events"}, {"EventSource": "aws:events"}]},
+        {"source": "aws.events", "detail-type": "Scheduled Event", "detail": {}},
+    ])
+    def test_warmer_pings(self, event):
+        assert is_warmer_ping(event)
+
+    @pytest.mark.parametrize("event", [
+        {},
+        None,
+        {"Records": []},
+        {"Records": "aws:events"},
+        {"Records": [{"EventSource": "aws:sns", "Sns": {"Message": "hello"}}]},
+        {"Records": [{"EventSource": "aws:events"}, {"EventSource": "aws:sns", "Sns": {"Message": "hello"}}]},
+        {"Records": [None]},
+    ])
+    def test_deliveries(self, event):
+        assert not is_warmer_ping(event)
@@ -0,0 +1,218 @@
+"""Unit tests for the direct PutLogEvents writer."""
+
+import time
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from lambda_sns_cloudwatch_logs import batch, writer
+from lambda_sns_cloudwatch_logs.deadline import MIN_CALL_SECONDS, DeadlineExceeded
+from lambda_sns_cloudwatch_logs.streams import StreamCache
+from lambda_sns_cloudwatch_logs.writer import BatchWriter
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Operation")
+
+
+@pytest.fixture
+def logs_client():
+    client = MagicMock()
+    client.put_log_events.return_value = {}
+    return client
+
+
+class TestBatchWriter:
+    """Test cases for BatchWriter."""
+
+    def test_write_single_batch(self, logs_client):
+        events = [{"timestamp": 2, "message": "b"}, {"timestamp": 1, "message": "a"}]
+
+        result = BatchWriter(logs_client, "group", "stream").write(events)
+
+        assert result.calls == 1
+        assert result.ok
+        logs_client.put_log_events.assert_called_once_with(
+            logGroupName="group",
+            logStreamName="stream",
+            logEvents=[{"timestamp": 1, "message": "a"}, {"timestamp": 2, "message": "b"}],
+        )
+        logs_client.create_log_stream.assert_not_called()
+
+    def test_write_multiple_batches(self, logs_client):
+        events = [{"timestamp": i, "message": "m"} for i in range(batch.MAX_BATCH_EVENTS * 2 + 1)]
+
+        result = BatchWriter(logs_client, "group", "stream").write(events)
+
+        assert result.calls == 3
+        assert logs_client.put_log_events.call_count == 3
+
+    def test_creates_missing_stream(self, logs_client):
+        logs_client.put_log_events.side_effect = [client_error("ResourceNotFoundException"), {}]
+
+        BatchWriter(logs_client, "group", "stream").write([{"timestamp": 1, "message": "a"}])
+
+        logs_client.create_log_stream.assert_called_once_with(logGroupName="group", logStreamName="stream")
+        logs_client.create_log_group.assert_not_called()
+        assert logs_client.put_log_events.call_count == 2
+
+    def test_creates_missing_group(self, logs_client):
+        logs_client.put_log_events.side_effect = [client_error("ResourceNotFoundException"), {}]
+        logs_client.create_log_stream.side_effect = [client_error("ResourceNotFoundException"), {}]
+
+        BatchWriter(logs_client, "group", "stream").write([{"timestamp": 1, "message": "a"}])
+
+        logs_client.create_log_group.assert_called_once_with(logGroupName="group")
+        assert logs_client.create_log_stream.call_args_list == [
+            call(logGroupName="group", logStreamName="stream")
+        ] * 2
+
+    def test_stream_created_concurrently(self, logs_client):
+        logs_client.put_log_events.side_effect = [client_error("ResourceNotFoundException"), {}]
+        logs_client.create_log_stream.side_effect = client_error("ResourceAlreadyExistsException")
+
+        BatchWriter(logs_client, "group", "stream").write([{"timestamp": 1, "message": "a"}])
+
+        assert logs_client.put_log_events.call_count == 2
+
+    def test_ensure_stream_existing(self, logs_client):
+        logs_client.create_log_stream.side_effect = client_error("ResourceAlreadyExistsException")
+
+        BatchWriter(logs_client, "group", "stream").ensure_stream()
+
+        logs_client.create_log_group.assert_not_called()
+        logs_client.put_log_events.assert_not_called()
+
+    def test_known_stream_not_created_again(self, logs_client):
+        streams = StreamCache()
+        logs_client.put_log_events.side_effect = [client_error("ResourceNotFoundException"), {}, {}]
+
+        BatchWriter(logs_client, "group", "stream", streams=streams).write([{"timestamp": 1, "message": "a"}])
+        BatchWriter(logs_client, "group", "stream", streams=streams).ensure_stream()
+        BatchWriter(logs_client, "group", "stream", streams=streams).write([{"timestamp": 2, "message": "b"}])
+
+        logs_client.create_log_stream.assert_called_once()
+        assert logs_client.put_log_events.call_count == 3
+        assert streams.has_stream("group", "stream")
+
+    def test_successful_write_marks_stream_known(self, logs_client):
+        streams = StreamCache()
+
+        BatchWriter(logs_client, "group", "stream", streams=streams).write([{"timestamp": 1, "message": "a"}])
+        BatchWriter(logs_client, "group", "stream", streams=streams).ensure_stream()
+
+        assert streams.has_stream("group", "stream")
+        logs_client.create_log_stream.assert_not_called()
+
+    def test_deleted_known_stream_recreated(self, logs_client):
+        streams = StreamCache()
+        streams.add_stream("group", "stream")
+        logs_client.put_log_events.side_effect = [client_error("ResourceNotFoundException"), {}]
+        logs_client.create_log_stream.side_effect = [client_error("ResourceNotFoundException"), {}]
+
+        result = BatchWriter(logs_client, "group", "stream", streams=streams).write([{"timestamp": 1, "message": "a"}])
+
+        assert result.ok
+        logs_client.create_log_group.assert_called_once_with(logGroupName="group")
+        assert streams.has_stream("group", "stream")
+
+    def test_other_errors_not_retried(self, logs_client):
+        error = client_error("AccessDeniedException")
+        logs_client.put_log_events.side_effect = error
+        sleep = MagicMock()
+        events = [{"timestamp": 1, "message": "a"}]
+
+        result = BatchWriter(logs_client, "group", "stream", sleep=sleep).write(events)
+
+        assert result.calls == 1
+        assert result.failed == events
+        assert result.error is error
+        sleep.assert_not_called()
+        logs_client.create_log_stream.assert_not_called()
+
+
+class TestRetries:
+    """Test cases for retrying failed batches."""
+
+    def test_throttled_batch_retried(self, logs_client):
+        logs_client.put_log_events.side_effect = [
+            client_error("ThrottlingException"),
+            client_error("ServiceUnavailableException"),
+            {},
+        ]
+        sleep = MagicMock()
+
+        result = BatchWriter(logs_client, "group", "stream", sleep=sleep).write([{"timestamp": 1, "message": "a"}])
+
+        assert result.ok
+        assert result.calls == 3
+        assert result.retries == 2
+        assert result.bytes == 1 + batch.EVENT_OVERHEAD_BYTES
+        assert sleep.call_count == 2
+
+    def test_backoff_is_jittered_and_grows(self, logs_client):
+        logs_client.put_log_events.side_effect = client_error("ThrottlingException")
+        sleep = MagicMock()
+
+        with patch("lambda_sns_cloudwatch_logs.writer.random.uniform", side_effect=lambda low, high: high) as uniform:
+            BatchWriter(logs_client, "group", "stream", sleep=sleep).write([{"timestamp": 1, "message": "a"}])
+
+        assert [c.args for c in uniform.call_args_list] == [(0, 0.1), (0, 0.2), (0, 0.4), (0, 0.8)]
+        assert sleep.call_count == writer.MAX_ATTEMPTS - 1
+
+    def test_connection_errors_retried(self, logs_client):
+        logs_client.put_log_events.side_effect = [EndpointConnectionError(endpoint_url="https://logs"), {}]
+
+        result = BatchWriter(logs_client, "group", "stream", sleep=MagicMock()).write([{"timestamp": 1, "message": "a"}])
+
+        assert result.ok
+
+    def test_only_failed_batch_reported(self, logs_client):
+        events = [{"timestamp": i, "message": "m"} for i in range(batch.MAX_BATCH_EVENTS + 1)]
+        logs_client.put_log_events.side_effect = [{}] + [client_error("ThrottlingException")] * writer.MAX_ATTEMPTS
+
+        result = BatchWriter(logs_client, "group", "stream", sleep=MagicMock()).write(events)
+
+        assert result.failed == events[batch.MAX_BATCH_EVENTS:]
+        assert result.calls == 1 + writer.MAX_ATTEMPTS
+
+    def test_stops_retrying_at_deadline(self, logs_client):
+        error = client_error("ThrottlingException")
+        logs_client.put_log_events.side_effect = error
+        sleep = MagicMock()
+
+        # Time for one call, but not for a backoff and another call
+        with patch("lambda_sns_cloudwatch_logs.writer.random.uniform", return_value=0.1):
+            result = BatchWriter(logs_client, "group", "stream", sleep=sleep).write(
+                [{"timestamp": 1, "message": "a"}], deadline=time.monotonic() + MIN_CALL_SECONDS + 0.05
+            )
+
+        assert result.calls == 1
+        assert result.error is error
+        sleep.assert_not_called()
+
+    def test_no_call_started_without_time(self, logs_client):
+        events = [{"timestamp": 1, "message": "a"}]
+
+        result = BatchWriter(logs_client, "group", "stream").write(events, deadline=time.monotonic())
+
+        assert result.calls == 0
+        assert result.failed == events
+        assert isinstance(result.error, DeadlineExceeded)
+        logs_client.put_log_events.assert_not_called()
+
+    def test_rejected_events_counted_not_failed(self, logs_client):
+        events = [{"timestamp": i, "message": str(i)} for i in range(6)]
+        logs_client.put_log_events.return_value = {
+            "rejectedLogEventsInfo": {"tooOldLogEventEndIndex": 1, "expiredLogEventEndIndex": 2, "tooNewLogEventStartIndex": 5}
+        }
+
+        result = BatchWriter(logs_client, "group", "stream").write(events)
+
+        # Sending them again would only be rejected again
+        assert result.ok
+        assert result.rejected == 3
+        assert result.bytes == sum(map(batch.event_size, events[2:5]))
+        assert result.error is None
+        assert result.calls == 1
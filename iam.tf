@@ -42,10 +42,45 @@ data "aws_iam_policy_document" "lambda_cloudwatch_logs_policy" {
       "logs:PutLogEvents",
     ]
 
-    resources = [
-      local.log_group_arn,
-      "${local.log_group_arn}:*"
-    ]
+    resources = concat(
+      [
+        local.log_group_arn,
+        "${local.log_group_arn}:*"
+      ],
+      local.routed_log_group_arns,
+      [for arn in local.routed_log_group_arns : "${arn}:*"]
+    )
+  }
+
+  dynamic "statement" {
+    for_each = local.dead_letter_queue_arn != "" ? [local.dead_letter_queue_arn] : []
+
+    content {
+      actions   = ["sqs:SendMessage"]
+      resources = [statement.value]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.oversized_messages == "offload" && var.offload_bucket != "" ? [var.offload_bucket] : []
+
+    content {
+      actions   = ["s3:PutObject"]
+      resources = ["arn:aws:s3:::${statement.value}/${var.offload_prefix}*"]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.sqs_batching ? [aws_sqs_queue.batching[0].arn] : []
+
+    content {
+      actions = [
+        "sqs:ReceiveMessage",
+        "sqs:DeleteMessage",
+        "sqs:GetQueueAttributes",
+      ]
+      resources = [statement.value]
+    }
   }
 
 }
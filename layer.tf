@@ -11,3 +11,41 @@ resource "aws_lambda_layer_version" "logging_base" {
 
   compatible_runtimes = [local.lambda_runtime]
 }
+
+# -----------------------------------------------------------------
+# CREATE LAMBDA EXTENSION LAYER THAT WRITES EVENTS AFTER THE RESPONSE
+# -----------------------------------------------------------------
+
+# the extension executable and its own copy of the support package
+data "archive_file" "flusher_extension" {
+  count = var.background_flush ? 1 : 0
+
+  type             = "zip"
+  output_path      = "${path.module}/flusher_extension.zip"
+  output_file_mode = "0755"
+
+  source {
+    content  = file("${path.module}/function/extension/sns-cloudwatch-flusher")
+    filename = "extensions/sns-cloudwatch-flusher"
+  }
+
+  dynamic "source" {
+    for_each = fileset("${path.module}/function", "lambda_sns_cloudwatch_logs/**/*.py")
+    content {
+      content  = file("${path.module}/function/${source.value}")
+      filename = "sns-cloudwatch-flusher/${source.value}"
+    }
+  }
+}
+
+resource "aws_lambda_layer_version" "flusher_extension" {
+  count = var.background_flush ? 1 : 0
+
+  filename         = data.archive_file.flusher_extension[0].output_path
+  source_code_hash = data.archive_file.flusher_extension[0].output_base64sha256
+
+  layer_name  = "sns-cloudwatch-flusher-${replace(local.lambda_runtime, ".", "")}"
+  description = "extension writing log events after the function responds"
+
+  compatible_runtimes = [local.lambda_runtime]
+}
@@ -22,5 +22,13 @@ locals {
 
   log_group_arn = var.create_log_group ? aws_cloudwatch_log_group.sns_logged_item_group[0].arn : data.aws_cloudwatch_log_group.sns_logged_item_group[0].arn
 
+  # log groups messages can be routed to in addition to log_group_arn
+  routed_log_group_arns = distinct([
+    for route in var.routing_table : "arn:aws:logs:${local.region}:${data.aws_caller_identity.current.account_id}:log-group:${route.log_group}"
+  ])
+
+  # SQS queue undelivered log events are sent to, if any
+  dead_letter_queue_arn = can(regex("^arn:", var.dead_letter_target)) ? var.dead_letter_target : ""
+
   lambda_arn = var.lambda_publish_func ? aws_lambda_function.sns_cloudwatchlog.qualified_arn : aws_lambda_function.sns_cloudwatchlog.arn
 }
@@ -56,3 +56,13 @@ output "cloudwatch_event_rule_arn" {
   description = "ARN of CloudWatch Trigger Event created to prevent hibernation."
   value       = var.create_warmer_event ? aws_cloudwatch_event_rule.warmer[0].arn : ""
 }
+
+output "sqs_queue_arn" {
+  description = "ARN of the SQS queue batching SNS messages for the function, if sqs_batching is set."
+  value       = var.sqs_batching ? aws_sqs_queue.batching[0].arn : ""
+}
+
+output "sqs_dead_letter_queue_arn" {
+  description = "ARN of the SQS queue receiving messages that repeatedly failed, if sqs_batching is set."
+  value       = var.sqs_batching ? aws_sqs_queue.batching_dlq[0].arn : ""
+}
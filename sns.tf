@@ -22,8 +22,16 @@ data "aws_sns_topic" "sns_log_topic" {
 # SUBSCRIBE LAMBDA FUNCTION TO SNS TOPIC
 # -----------------------------------------------------------------
 
+# not created when messages are batched through SQS (see sqs.tf)
 resource "aws_sns_topic_subscription" "lambda" {
+  count = var.sqs_batching ? 0 : 1
+
   topic_arn = local.sns_topic_arn
   protocol  = "lambda"
   endpoint  = local.lambda_arn
 }
+
+moved {
+  from = aws_sns_topic_subscription.lambda
+  to   = aws_sns_topic_subscription.lambda[0]
+}
@@ -0,0 +1,89 @@
+# -----------------------------------------------------------------
+# SQS BATCHING
+#   optionally deliver SNS messages to the function in batches through
+#   an SQS queue instead of one invocation per message
+# -----------------------------------------------------------------
+
+locals {
+  # SQS requires a batching window of at least 1 second for batches over 10
+  sqs_batching_window = var.sqs_batch_size > 10 ? max(1, var.sqs_batching_window) : var.sqs_batching_window
+
+  # AWS recommends six times the function timeout, plus the batching window
+  sqs_visibility_timeout = 6 * var.lambda_timeout + local.sqs_batching_window
+}
+
+# messages that keep failing end up here after sqs_max_receive_count attempts
+resource "aws_sqs_queue" "batching_dlq" {
+  count = var.sqs_batching ? 1 : 0
+
+  name                      = "sns-logger-${var.sns_topic_name}-dlq"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "batching" {
+  count = var.sqs_batching ? 1 : 0
+
+  name                       = "sns-logger-${var.sns_topic_name}"
+  visibility_timeout_seconds = local.sqs_visibility_timeout
+  sqs_managed_sse_enabled    = true
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.batching_dlq[0].arn
+    maxReceiveCount     = var.sqs_max_receive_count
+  })
+
+  tags = var.tags
+}
+
+# allow the topic to send to the queue
+resource "aws_sqs_queue_policy" "batching" {
+  count = var.sqs_batching ? 1 : 0
+
+  queue_url = aws_sqs_queue.batching[0].id
+  policy    = data.aws_iam_policy_document.sqs_batching[0].json
+}
+
+data "aws_iam_policy_document" "sqs_batching" {
+  count = var.sqs_batching ? 1 : 0
+
+  statement {
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.batching[0].arn]
+
+    principals {
+      type        = "Service"
+      identifiers = ["sns.amazonaws.com"]
+    }
+
+    condition {
+      test     = "ArnEquals"
+      variable = "aws:SourceArn"
+      values   = [local.sns_topic_arn]
+    }
+  }
+}
+
+# the function unwraps the SNS envelope, so raw message delivery stays off
+resource "aws_sns_topic_subscription" "sqs" {
+  count = var.sqs_batching ? 1 : 0
+
+  topic_arn = local.sns_topic_arn
+  protocol  = "sqs"
+  endpoint  = aws_sqs_queue.batching[0].arn
+}
+
+resource "aws_lambda_event_source_mapping" "sqs" {
+  count = var.sqs_batching ? 1 : 0
+
+  event_source_arn                   = aws_sqs_queue.batching[0].arn
+  function_name                      = local.lambda_arn
+  batch_size                         = var.sqs_batch_size
+  maximum_batching_window_in_seconds = local.sqs_batching_window
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # the role must be allowed to read the queue before the mapping is created
+  depends_on = [aws_iam_role_policy.lambda_cloudwatch_logs_policy]
+}
@@ -92,6 +92,341 @@ variable "log_stream_format" {
   description = "Python strftime format string for CloudWatch log stream names. Default creates hourly streams (e.g., 2025-07-29/0600)."
 }
 
+variable "writer_mode" {
+  type        = string
+  default     = "watchtower"
+  description = "How messages are written to CloudWatch Logs: 'watchtower' (Python logging handler) or 'batch' (direct batched PutLogEvents calls)."
+  validation {
+    condition     = contains(["watchtower", "batch"], var.writer_mode)
+    error_message = "The writer_mode must be one of: watchtower, batch."
+  }
+}
+
+variable "event_timestamp" {
+  type        = string
+  default     = "ingestion"
+  description = "Timestamp given to CloudWatch events and used to pick their log stream: 'ingestion' (time the Lambda ran) or 'sns' (the SNS message Timestamp). 'sns' requires writer_mode 'batch'."
+  validation {
+    condition     = contains(["ingestion", "sns"], var.event_timestamp)
+    error_message = "The event_timestamp must be one of: ingestion, sns."
+  }
+}
+
+variable "routing_table" {
+  type = list(object({
+    log_group         = string
+    log_stream_format = optional(string)
+    topic_arn         = optional(string)
+    subject           = optional(string)
+    attributes        = optional(map(string))
+  }))
+  default     = []
+  description = "Routes sending matching messages to other log groups, tried in order; unmatched messages go to log_group_name. topic_arn and subject are shell-style patterns, attributes are exact MessageAttribute values. Requires writer_mode 'batch'. The log groups must already exist or be creatable by the function."
+}
+
+variable "flush_concurrency" {
+  type        = number
+  default     = 4
+  description = "Maximum number of log streams or groups written in parallel at the end of an invocation. Only applies when writer_mode is 'batch'."
+  validation {
+    condition     = var.flush_concurrency >= 1 && var.flush_concurrency == floor(var.flush_concurrency)
+    error_message = "The flush_concurrency must be a whole number of at least 1."
+  }
+}
+
+variable "dead_letter_target" {
+  type        = string
+  default     = "none"
+  description = "Where log events are sent when CloudWatch Logs still refuses them after retries: 'none' (fail the invocation so SNS retries it), 'log' (the function's own log), 'spool' (kept in /tmp and written by later invocations) or an SQS queue ARN. Only applies when writer_mode is 'batch'."
+  validation {
+    condition     = contains(["none", "log", "spool"], var.dead_letter_target) || can(regex("^arn:aws[a-z-]*:sqs:", var.dead_letter_target))
+    error_message = "The dead_letter_target must be 'none', 'log', 'spool' or an SQS queue ARN."
+  }
+}
+
+variable "compaction" {
+  type        = string
+  default     = "off"
+  description = "Collapse repeated messages before writing: 'off', 'message_id' (drop SNS redeliveries of messages already written) or 'content' (also write identical messages to the same log stream once, with a repeat count). Requires writer_mode 'batch'."
+  validation {
+    condition     = contains(["off", "message_id", "content"], var.compaction)
+    error_message = "The compaction must be one of: off, message_id, content."
+  }
+}
+
+variable "dedupe_cache_size" {
+  type        = number
+  default     = 10000
+  description = "Number of written SNS MessageIds each warm Lambda instance remembers to drop redeliveries when compaction is on."
+  validation {
+    condition     = var.dedupe_cache_size >= 1 && var.dedupe_cache_size == floor(var.dedupe_cache_size)
+    error_message = "The dedupe_cache_size must be a whole number of at least 1."
+  }
+}
+
+variable "message_format" {
+  type        = string
+  default     = "raw"
+  description = "What is written for each message: 'raw' (the message body) or 'json' (a JSON document with the message and its SNS TopicArn, MessageId, Subject, Timestamp and MessageAttributes, queryable in CloudWatch Logs Insights)."
+  validation {
+    condition     = contains(["raw", "json"], var.message_format)
+    error_message = "The message_format must be one of: raw, json."
+  }
+}
+
+variable "oversized_messages" {
+  type        = string
+  default     = "split"
+  description = "What happens to messages over the 256 KB CloudWatch Logs event limit: 'split' (written as numbered parts), 'gzip' (written gzipped and base64 encoded, split if still too large) or 'offload' (stored in offload_bucket with a pointer event written instead). Only applies when writer_mode is 'batch'."
+  validation {
+    condition     = contains(["split", "gzip", "offload"], var.oversized_messages)
+    error_message = "The oversized_messages must be one of: split, gzip, offload."
+  }
+}
+
+variable "offload_bucket" {
+  type        = string
+  default     = ""
+  description = "Name of an existing S3 bucket oversized messages are stored in when oversized_messages is 'offload'."
+}
+
+variable "offload_prefix" {
+  type        = string
+  default     = "oversized/"
+  description = "Key prefix for messages stored in offload_bucket."
+}
+
+variable "metrics_namespace" {
+  type        = string
+  default     = ""
+  description = "CloudWatch metrics namespace for per-invocation metrics (records processed and skipped, bytes written, PutLogEvents calls, retries, flush latency), written as Embedded Metric Format log lines. Empty disables them."
+}
+
+variable "metrics_dimensions" {
+  type        = list(string)
+  default     = ["log_group"]
+  description = "Dimensions of the invocation metrics: any of 'log_group' and 'topic'."
+  validation {
+    condition     = alltrue([for dimension in var.metrics_dimensions : contains(["log_group", "topic"], dimension)])
+    error_message = "The metrics_dimensions may only contain: log_group, topic."
+  }
+}
+
+variable "profile_sample" {
+  type        = number
+  default     = 0
+  description = "Log per-stage wall and CPU timings for one invocation in this many on each Lambda instance, starting with the cold start. 0 disables profiling."
+  validation {
+    condition     = var.profile_sample >= 0 && var.profile_sample == floor(var.profile_sample)
+    error_message = "The profile_sample must be a whole number of at least 0."
+  }
+}
+
+variable "profile_memory" {
+  type        = bool
+  default     = false
+  description = "Whether profiled invocations also trace memory allocations and report their peak. Tracing slows the invocation down."
+}
+
+variable "prewarm" {
+  type        = bool
+  default     = true
+  description = "Whether the function creates its CloudWatch Logs client and the current default log stream during the init phase, so the first message after a cold start skips those calls."
+}
+
+variable "stream_cache_ttl" {
+  type        = number
+  default     = 3600
+  description = "Seconds the function remembers that a log group or stream exists before checking or creating it again. 0 turns the cache off."
+
+  validation {
+    condition     = var.stream_cache_ttl >= 0 && floor(var.stream_cache_ttl) == var.stream_cache_ttl
+    error_message = "stream_cache_ttl must be a whole number of seconds, 0 or more."
+  }
+}
+
+variable "sqs_batching" {
+  type        = bool
+  default     = false
+  description = "Whether SNS messages reach the function in batches through an SQS queue, instead of one invocation per message. The function reports failed messages individually (batchItemFailures), and messages failing sqs_max_receive_count times move to a dead-letter queue."
+}
+
+variable "sqs_batch_size" {
+  type        = number
+  default     = 100
+  description = "Maximum number of messages per invocation when sqs_batching is set (1 to 10000). Raise lambda_timeout to match."
+
+  validation {
+    condition     = var.sqs_batch_size >= 1 && var.sqs_batch_size <= 10000 && floor(var.sqs_batch_size) == var.sqs_batch_size
+    error_message = "sqs_batch_size must be a whole number between 1 and 10000."
+  }
+}
+
+variable "sqs_batching_window" {
+  type        = number
+  default     = 5
+  description = "Seconds to wait for a batch to fill when sqs_batching is set (0 to 300). At least 1 second is used for batches over 10."
+
+  validation {
+    condition     = var.sqs_batching_window >= 0 && var.sqs_batching_window <= 300 && floor(var.sqs_batching_window) == var.sqs_batching_window
+    error_message = "sqs_batching_window must be a whole number of seconds between 0 and 300."
+  }
+}
+
+variable "sqs_max_receive_count" {
+  type        = number
+  default     = 5
+  description = "Deliveries of a message that fails to be written before it moves to the dead-letter queue, when sqs_batching is set."
+
+  validation {
+    condition     = var.sqs_max_receive_count >= 1 && floor(var.sqs_max_receive_count) == var.sqs_max_receive_count
+    error_message = "sqs_max_receive_count must be a whole number of 1 or more."
+  }
+}
+
+variable "filter_rules" {
+  type = list(object({
+    action     = string
+    topic_arn  = optional(string)
+    subject    = optional(string)
+    attributes = optional(map(string))
+    json       = optional(map(string))
+    rate       = optional(number)
+    fields     = optional(list(string))
+    patterns   = optional(list(string))
+    max_bytes  = optional(number)
+  }))
+  default     = []
+  description = "Rules applied to each message before it is routed and written: 'drop', 'sample' (keep a rate share, chosen by MessageId), 'redact' (JSON fields and regex patterns) or 'truncate' (to max_bytes). topic_arn, subject and attributes match as in routing_table; json maps dotted paths of a JSON message to shell-style patterns."
+
+  validation {
+    condition     = alltrue([for rule in var.filter_rules : contains(["drop", "sample", "redact", "truncate"], rule.action)])
+    error_message = "Each filter_rules action must be one of: drop, sample, redact, truncate."
+  }
+}
+
+variable "client_pool_size" {
+  type        = number
+  default     = 0
+  description = "Connections the CloudWatch Logs client keeps open. 0 sizes the pool to flush_concurrency."
+
+  validation {
+    condition     = var.client_pool_size >= 0 && floor(var.client_pool_size) == var.client_pool_size
+    error_message = "client_pool_size must be a whole number, 0 or more."
+  }
+}
+
+variable "client_connect_timeout" {
+  type        = number
+  default     = 2
+  description = "Seconds the CloudWatch Logs client waits for a connection before the attempt fails."
+
+  validation {
+    condition     = var.client_connect_timeout > 0
+    error_message = "client_connect_timeout must be a positive number of seconds."
+  }
+}
+
+variable "client_read_timeout" {
+  type        = number
+  default     = null
+  description = "Seconds the CloudWatch Logs client waits for a response before the attempt fails. Defaults to half of lambda_timeout, at most 10, so a slow endpoint fails one attempt rather than the invocation."
+
+  validation {
+    condition     = var.client_read_timeout == null ? true : var.client_read_timeout > 0
+    error_message = "client_read_timeout must be a positive number of seconds."
+  }
+}
+
+variable "client_retry_mode" {
+  type        = string
+  default     = "adaptive"
+  description = "botocore retry mode of the CloudWatch Logs client: 'legacy', 'standard' or 'adaptive' (also rate limits the client while it is throttled)."
+
+  validation {
+    condition     = contains(["legacy", "standard", "adaptive"], var.client_retry_mode)
+    error_message = "client_retry_mode must be one of: legacy, standard, adaptive."
+  }
+}
+
+variable "client_max_attempts" {
+  type        = number
+  default     = 2
+  description = "Attempts botocore makes for each CloudWatch Logs call, including the first. Batch mode retries failed batches again within the invocation's time limit."
+
+  validation {
+    condition     = var.client_max_attempts >= 1 && floor(var.client_max_attempts) == var.client_max_attempts
+    error_message = "client_max_attempts must be a whole number of 1 or more."
+  }
+}
+
+variable "client_tcp_keepalive" {
+  type        = bool
+  default     = true
+  description = "Whether the CloudWatch Logs client sets TCP keepalive on its connections, so pooled connections survive idle time between invocations."
+}
+
+variable "stream_sharding" {
+  type        = string
+  default     = "off"
+  description = "Shard appended to log stream names so concurrent instances stop sharing one stream's write limit: 'off', 'instance' (one stream per execution environment) or 'message_id' (stream_shards streams chosen by MessageId; requires writer_mode 'batch'). Shards share the unsharded name plus '/' as prefix."
+
+  validation {
+    condition     = contains(["off", "instance", "message_id"], var.stream_sharding)
+    error_message = "stream_sharding must be one of: off, instance, message_id."
+  }
+}
+
+variable "stream_shards" {
+  type        = number
+  default     = 8
+  description = "Number of log streams each stream is spread over when stream_sharding is 'message_id'."
+
+  validation {
+    condition     = var.stream_shards >= 1 && floor(var.stream_shards) == var.stream_shards
+    error_message = "stream_shards must be a whole number of 1 or more."
+  }
+}
+
+variable "spool_max_bytes" {
+  type        = number
+  default     = 67108864
+  description = "Most bytes of undelivered events kept in /tmp when dead_letter_target is 'spool'; the oldest are dropped first. Keep it well under the function's ephemeral storage (512 MB by default)."
+
+  validation {
+    condition     = var.spool_max_bytes >= 1 && floor(var.spool_max_bytes) == var.spool_max_bytes
+    error_message = "spool_max_bytes must be a whole number of 1 or more."
+  }
+}
+
+variable "spool_retry_seconds" {
+  type        = number
+  default     = 2
+  description = "Seconds a failed write is retried before its events are spooled, when dead_letter_target is 'spool'."
+
+  validation {
+    condition     = var.spool_retry_seconds > 0
+    error_message = "spool_retry_seconds must be a positive number of seconds."
+  }
+}
+
+variable "background_flush" {
+  type        = bool
+  default     = false
+  description = "Whether a Lambda extension, added as a second layer, writes the events after the function has responded. Requires writer_mode 'batch'. Pair it with dead_letter_target 'spool': events the extension cannot write no longer fail the invocation."
+}
+
+variable "extension_port" {
+  type        = number
+  default     = 9009
+  description = "Local port the background flush extension listens on for the function's events, when background_flush is on."
+
+  validation {
+    condition     = var.extension_port >= 1024 && var.extension_port <= 65535 && floor(var.extension_port) == var.extension_port
+    error_message = "extension_port must be a whole number between 1024 and 65535."
+  }
+}
+
 variable "tags" {
   type        = map(string)
   description = "Map of tags to assign to all created resources."